@@ -1,8 +1,13 @@
 import logging
+import os
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.tools import FunctionTool
 
+from adk_shared.history import history_compactor_from_env
+from adk_shared.model_client import llm_client_from_env
+from adk_shared.tool_cache import ToolCachePolicy, tool_cache_from_env
+
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
@@ -36,13 +41,30 @@ logger.debug("Initializing Weather tool")
 weather_tool = FunctionTool(get_current_weather)
 logger.debug("Weather tool initialized")
 
+# Repeated questions about a city, from any session, reuse the last answer for a while.
+tool_cache = tool_cache_from_env({
+    "get_current_weather": ToolCachePolicy(
+        ttl_s=float(os.getenv("TOOL_CACHE_WEATHER_TTL_S", "600")),
+        args=("city",),
+        normalize=lambda args: {"city": str(args["city"]).strip().lower()},
+    ),
+})
+
 api_base_url = "http://meta-service:8000/v1"
 logger.debug(f"Connecting to vLLM at: {api_base_url}")
 
+# Old tool results are summarized, and then dropped, to keep prompts within the vLLM context.
+history_compactor = history_compactor_from_env(default_max_model_len=4096)
+
+# Calls are spread over LLM_ENDPOINTS (default: api_base_url) on pooled connections,
+# skipping endpoints that keep failing.
+llm_client = llm_client_from_env(default_endpoint=api_base_url)
+
 root_agent = Agent(
     model=LiteLlm(
         model="hosted_vllm/meta-llama/Llama-3.1-8B-Instruct",
-        api_base=api_base_url
+        api_base=api_base_url,
+        **({"llm_client": llm_client} if llm_client else {}),
     ),
     name="weather_agent",
     instruction="""You are a weather assistant that provides current weather information for different cities.
@@ -56,5 +78,8 @@ User: "What's the weather like in Seattle?"
 </tool>
 
 If the user provides a city not in the database, apologize and suggest they try another major city like Seattle, San Francisco, New York, Miami, or Chicago.""",
-    tools=[weather_tool]
+    tools=[weather_tool],
+    before_model_callback=history_compactor.before_model if history_compactor else None,
+    before_tool_callback=tool_cache.before_tool if tool_cache else None,
+    after_tool_callback=tool_cache.after_tool if tool_cache else None,
 )
@@ -1,14 +1,24 @@
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from google.adk.cli.fast_api import get_fast_api_app
 
+from adk_shared.session_store import check_session_service, session_service_from_env, use_session_service
+
 # Get the directory where main.py is located
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Example session DB URL (e.g., SQLite)
-SESSION_DB_URL = "sqlite:///./sessions.db"
+# Example session DB URL (e.g., SQLite), used with SESSION_STORE=adk
+SESSION_SERVICE_URI = "sqlite:///./sessions.db"
+
+# Sessions go to the store SESSION_STORE selects (memory, sqlite or redis, see adk_shared.session_store),
+# which writes each event as it's appended and batches concurrent sessions' writes.
+session_service = session_service_from_env(default_store="sqlite")
+if session_service is not None:
+    use_session_service(session_service)
+    SESSION_SERVICE_URI = ""  # get_fast_api_app then builds its in-memory service, which is ours
 
 # Example allowed origins for CORS
 ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8080", "*"]
@@ -16,14 +26,56 @@ ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8080", "*"]
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = True
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if session_service is not None:
+        await session_service.close()  # writes out what is still queued
+
+
 # Call the function to get the FastAPI app instance
 # Ensure the agent directory name ('capital_agent') matches your agent folder
 app: FastAPI = get_fast_api_app(
-    agent_dir=AGENT_DIR,
-    session_db_url=SESSION_DB_URL,
+    agents_dir=AGENT_DIR,
+    session_service_uri=SESSION_SERVICE_URI,
+    lifespan=lifespan,
     allow_origins=ALLOWED_ORIGINS,
     web=SERVE_WEB_INTERFACE,
 )
+if session_service is not None:
+    check_session_service(session_service)
+
+
+@app.get("/-/tool-cache")
+async def tool_cache_stats():
+    """Hit and miss counters of the agent's tool-result cache."""
+    from weather_agent.agent import tool_cache
+
+    return tool_cache.stats() if tool_cache else {"enabled": False}
+
+
+@app.get("/-/history")
+async def history_stats():
+    """How often the agent had to compact the conversation to fit the model's context."""
+    from weather_agent.agent import history_compactor
+
+    return history_compactor.stats() if history_compactor else {"enabled": False}
+
+
+@app.get("/-/sessions")
+async def session_store_stats():
+    """Appends, batches and pending writes of the session store."""
+    return session_service.stats() if session_service is not None else {"store": "adk"}
+
+
+@app.get("/-/llm")
+async def llm_client_stats():
+    """Requests in flight, failures and latency of each LLM endpoint the agent balances over."""
+    from weather_agent.agent import llm_client
+
+    return llm_client.stats() if llm_client else {"enabled": False}
+
 
 # You can add more FastAPI routes or configurations below if needed
 # Example:
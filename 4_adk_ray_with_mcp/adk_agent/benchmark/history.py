@@ -0,0 +1,208 @@
+"""
+Replay a 50-turn weather conversation with and without history compaction.
+
+Every turn makes the two LLM calls an ADK agent makes: one that decides to
+call a tool and one that answers from the tool's (full-length) result. For
+each call the benchmark reports the prompt tokens (estimated like the
+compactor does), whether it would overflow `--max-model-len`, and a modeled
+TTFT: `--ttft-base-ms` plus prefill, at `--prefill-tok-s`, of only the tokens
+after the prefix shared with the previous request, which vLLM's prefix cache
+serves. With `--endpoint` every request is also sent to an OpenAI-compatible
+server (e.g. the Ray Serve app) to measure its real TTFT.
+
+    python -m benchmark.history --turns 50 --max-model-len 8192
+    python -m benchmark.history --endpoint http://localhost:8000 --model meta-llama/Llama-3.1-8B-Instruct
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from adk_shared.history import HistoryCompactor
+
+INSTRUCTION = "You are a specialist AI assistant for weather. Use your available tools to answer questions about weather."
+CITIES = ["Seattle, WA", "Denver, CO", "Miami, FL", "Chicago, IL", "Boston, MA", "Phoenix, AZ", "Portland, OR"]
+TOOLS = [types.Tool(function_declarations=[
+    types.FunctionDeclaration(
+        name=name,
+        description=description,
+        parameters=types.Schema(type="OBJECT", properties={arg: types.Schema(type="STRING")}, required=[arg]),
+    )
+    for name, arg, description in [
+        ("get_forecast_by_place", "place", "Get weather forecast for a US city or town by name."),
+        ("get_alerts", "state", "Get weather alerts for a US state."),
+        ("get_alert_detail", "alert_id", "Get the full text of one weather alert."),
+    ]
+])]
+
+
+def forecast(rng: random.Random) -> Dict[str, Any]:
+    periods = []
+    for name in ["Today", "Tonight", "Saturday", "Saturday Night", "Sunday"]:
+        temperature = rng.randint(40, 90)
+        periods.append({
+            "name": name,
+            "temperature": temperature,
+            "temperatureUnit": "F",
+            "windSpeed": f"{rng.randint(5, 15)} to {rng.randint(16, 30)} mph",
+            "shortForecast": "Chance Showers And Thunderstorms",
+            "detailedForecast": (
+                f"A chance of showers and thunderstorms after noon. Mostly cloudy, with a high near {temperature}. "
+                "South southwest wind around 15 mph, with gusts as high as 25 mph. Chance of precipitation is 40%. "
+                "New rainfall amounts between a tenth and quarter of an inch possible, higher in thunderstorms."
+            ),
+        })
+    return {"result": json.dumps(periods)}
+
+
+def conversation(turns: int, seed: int) -> List[List[types.Content]]:
+    """The contents each turn adds: question, tool call, tool result and answer."""
+    rng = random.Random(seed)
+    added = []
+    for turn in range(turns):
+        city = CITIES[turn % len(CITIES)]
+        call_id = f"call-{turn}"
+        added.append([
+            types.Content(role="user", parts=[types.Part(text=f"What's the forecast for {city} this weekend?")]),
+            types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+                id=call_id, name="get_forecast_by_place", args={"place": city}))]),
+            types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+                id=call_id, name="get_forecast_by_place", response=forecast(rng)))]),
+            types.Content(role="model", parts=[types.Part(text=(
+                f"Here is the weekend forecast for {city}: showers are possible on Saturday afternoon, "
+                "with highs in the 60s and gusty south winds. Sunday looks drier. " * 2
+            ))]),
+        ])
+    return added
+
+
+def to_messages(request: LlmRequest) -> List[Dict[str, Any]]:
+    """The request as OpenAI chat messages, as LiteLLM sends it."""
+    messages = [{"role": "system", "content": request.config.system_instruction}]
+    for content in request.contents:
+        for part in content.parts:
+            if part.text:
+                messages.append({"role": "user" if content.role == "user" else "assistant", "content": part.text})
+            elif part.function_call:
+                messages.append({"role": "assistant", "content": None, "tool_calls": [{
+                    "id": part.function_call.id, "type": "function",
+                    "function": {"name": part.function_call.name, "arguments": json.dumps(part.function_call.args)},
+                }]})
+            elif part.function_response:
+                messages.append({"role": "tool", "tool_call_id": part.function_response.id,
+                                 "content": json.dumps(part.function_response.response)})
+    return messages
+
+
+def common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+async def measure_ttft(client: httpx.AsyncClient, model: str, messages: List[Dict[str, Any]]) -> Optional[float]:
+    body = {"model": model, "messages": messages, "max_tokens": 1, "stream": True}
+    start = time.perf_counter()
+    async with client.stream("POST", "/v1/chat/completions", json=body) as response:
+        if response.status_code != 200:
+            return None
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                return round((time.perf_counter() - start) * 1000, 1)
+    return None
+
+
+async def replay(args: argparse.Namespace, compactor: Optional[HistoryCompactor], client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
+    estimator = HistoryCompactor()
+    fixed = estimator.text_tokens(INSTRUCTION) + sum(estimator.text_tokens(t.model_dump_json(exclude_none=True)) for t in TOOLS)
+    history: List[types.Content] = []
+    context = SimpleNamespace(state={})  # stands in for the session's CallbackContext
+    previous = ""
+    calls = []
+    for turn in conversation(args.turns, args.seed):
+        # Call 1 sees the question; call 2 also the tool call and its result.
+        for visible in (turn[:1], turn[:3]):
+            request = LlmRequest(
+                contents=history + visible,
+                config=types.GenerateContentConfig(system_instruction=INSTRUCTION, tools=TOOLS),
+            )
+            start = time.perf_counter()
+            if compactor is not None:
+                compactor.before_model(callback_context=context, llm_request=request)
+            compact_us = (time.perf_counter() - start) * 1e6
+            prompt = fixed + sum(estimator.content_tokens(c) for c in request.contents)
+            serialized = json.dumps(to_messages(request))
+            cached = int(prompt * common_prefix(previous, serialized) / len(serialized))
+            previous = serialized
+            call = {
+                "prompt_tokens": prompt,
+                "prefix_cached_tokens": cached,
+                "overflows": prompt > args.max_model_len - args.reserve_tokens,
+                "modeled_ttft_ms": round(args.ttft_base_ms + (prompt - cached) / args.prefill_tok_s * 1000, 1),
+                "compaction_us": round(compact_us, 1),
+            }
+            if client is not None:
+                call["measured_ttft_ms"] = await measure_ttft(client, args.model, to_messages(request))
+            calls.append(call)
+        history.extend(turn)
+
+    return {
+        "max_prompt_tokens": max(c["prompt_tokens"] for c in calls),
+        "overflowing_calls": sum(c["overflows"] for c in calls),
+        "mean_modeled_ttft_ms": round(statistics.mean(c["modeled_ttft_ms"] for c in calls), 1),
+        "prefix_cache_share": round(sum(c["prefix_cached_tokens"] for c in calls) / sum(c["prompt_tokens"] for c in calls), 3),
+        "mean_compaction_us": round(statistics.mean(c["compaction_us"] for c in calls), 1),
+        "stats": compactor.stats() if compactor is not None else None,
+        "prompt_tokens_per_turn": [c["prompt_tokens"] for c in calls[1::2]],
+        "modeled_ttft_ms_per_turn": [c["modeled_ttft_ms"] for c in calls[1::2]],
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    client = httpx.AsyncClient(base_url=args.endpoint, timeout=120.0) if args.endpoint else None
+    try:
+        return {
+            "max_model_len": args.max_model_len,
+            "full_history": await replay(args, None, client),
+            "compacted": await replay(args, HistoryCompactor(
+                max_model_len=args.max_model_len, reserve_tokens=args.reserve_tokens,
+                keep_turns=args.keep_turns, chunk_turns=args.chunk_turns, low_watermark=args.low_watermark,
+            ), client),
+        }
+    finally:
+        if client is not None:
+            await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--max-model-len", type=int, default=int(os.getenv("MAX_MODEL_LEN", "8192")))
+    parser.add_argument("--reserve-tokens", type=int, default=1024)
+    parser.add_argument("--keep-turns", type=int, default=4)
+    parser.add_argument("--chunk-turns", type=int, default=4)
+    parser.add_argument("--low-watermark", type=float, default=0.8)
+    parser.add_argument("--prefill-tok-s", type=float, default=8000.0, help="Modeled prefill throughput")
+    parser.add_argument("--ttft-base-ms", type=float, default=25.0, help="Modeled TTFT of an empty prompt")
+    parser.add_argument("--endpoint", default=None, help="OpenAI-compatible server to measure real TTFT against")
+    parser.add_argument("--model", default="meta-llama/Llama-3.1-8B-Instruct")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
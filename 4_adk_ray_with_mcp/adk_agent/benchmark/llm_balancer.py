@@ -0,0 +1,126 @@
+"""
+Measure LLM call latency with one endpoint and with BalancedLLMClient over several.
+
+Starts `--servers` local OpenAI-compatible stubs (benchmark.openai_stub),
+the last `--slow` of them `--slow-latency-ms` slower than the rest, and
+sends `--requests` chat completions, `--concurrency` at a time, the way
+LiteLlm does. Halfway through, the first server is stopped. Compared:
+
+- single: ADK's default client, every call to the first server
+- round_robin, least_outstanding, ewma: BalancedLLMClient's policies
+
+Each policy gets freshly started servers.
+
+    python -m benchmark.llm_balancer --servers 3 --slow 1 --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Any, Dict, List
+
+import litellm
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+from adk_shared.model_client import POLICIES, BalancedLLMClient
+from benchmark.mcp_pool import free_port, wait_ready
+
+MODEL = "hosted_vllm/meta-llama/Llama-3.1-8B-Instruct"
+MESSAGES = [{"role": "user", "content": "What's the weather in Seattle?"}]
+
+
+def start_servers(args: argparse.Namespace) -> List[tuple]:
+    servers = []
+    for i in range(args.servers):
+        port = free_port()
+        latency = args.latency_ms + (args.slow_latency_ms if i >= args.servers - args.slow else 0)
+        servers.append((port, subprocess.Popen([
+            sys.executable, "-m", "benchmark.openai_stub", "--port", str(port),
+            "--latency-ms", str(latency), "--per-request-ms", str(args.per_request_ms),
+        ])))
+    return servers
+
+
+async def call(client: Any, api_base: str, stream: bool) -> None:
+    response = await client.acompletion(model=MODEL, messages=MESSAGES, tools=None, api_base=api_base, stream=stream)
+    if stream:
+        async for _ in response:
+            pass
+
+
+async def measure(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    servers = start_servers(args)
+    try:
+        for port, process in servers:
+            await wait_ready(port, process)
+        urls = [f"http://127.0.0.1:{port}/v1" for port, _ in servers]
+        client = LiteLLMClient() if name == "single" else BalancedLLMClient(urls, policy=name, eject_s=2.0)
+        latencies: List[float] = []
+        errors = 0
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(args.requests):
+            queue.put_nowait(i)
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                if i == args.requests // 2:
+                    servers[0][1].terminate()
+                start = time.perf_counter()
+                try:
+                    await call(client, urls[0], args.stream)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except Exception:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+        report = {
+            "requests_per_s": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(q[49], 1),
+            "p99_ms": round(q[98], 1),
+            "errors": errors,
+        }
+        if isinstance(client, BalancedLLMClient):
+            report["stats"] = client.stats()
+            await client.close()
+        return report
+    finally:
+        for _, process in servers:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    return {name: await measure(name, args) for name in args.policies}
+
+
+def main():
+    litellm.suppress_debug_info = True  # it prints a help banner for every failed call
+    logging.getLogger("LiteLLM").setLevel(logging.ERROR)
+    logging.getLogger("adk_shared.model_client").setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", type=int, default=3)
+    parser.add_argument("--slow", type=int, default=1, help="How many of the servers are slow")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--slow-latency-ms", type=float, default=200.0, help="Added to the slow servers' latency")
+    parser.add_argument("--per-request-ms", type=float, default=2.0, help="Added per other request in flight")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--policies", nargs="+", default=["single", *POLICIES])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure the MCP overhead of an agent turn with ADK's MCPToolset and with PooledMCPToolset.
+
+Before every LLM call ADK asks the agent's toolsets for their tools, and a
+turn that uses a tool then calls it over an MCP session. This replays
+`--turns` such turns against a local MCP stub (benchmark.mcp_stub) in a
+subprocess and reports their latency for each toolset:
+
+- first_turn_ms: the first turn of a new process, connecting included
+- steady: the following turns
+- after_break_ms: the turn right after one MCP session broke
+
+    python -m benchmark.mcp_pool --turns 200 --latency-ms 5 --transport sse
+"""
+import argparse
+import asyncio
+import json
+import logging
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from typing import Any, Dict, List
+
+from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams, StreamableHTTPConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+
+from weather_agent.mcp_pool import PooledMCPToolset, is_disconnected
+
+ARGS = {"latitude": 47.6062, "longitude": -122.3321}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(port: int, process: subprocess.Popen, timeout_s: float = 30.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"MCP stub exited with {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError("MCP stub did not start")
+
+
+async def turn(toolset) -> float:
+    """One turn's MCP work: list the tools, then call get_forecast."""
+    start = time.perf_counter()
+    tools = {tool.name: tool for tool in await toolset.get_tools()}
+    result = await tools["get_forecast"]._run_async_impl(args=ARGS, tool_context=None, credential=None)
+    assert not result.isError, result
+    return (time.perf_counter() - start) * 1000
+
+
+async def break_a_session(toolset):
+    if isinstance(toolset, PooledMCPToolset):
+        session = next(slot.session for slot in toolset.pool._slots if slot.session is not None)
+    else:
+        session, _ = next(iter(toolset._mcp_session_manager._sessions.values()))
+    await session._write_stream.aclose()
+    assert is_disconnected(session)
+
+
+async def measure(toolset, turns: int) -> Dict[str, Any]:
+    first = await turn(toolset)
+    steady: List[float] = [await turn(toolset) for _ in range(turns)]
+    await break_a_session(toolset)
+    after_break = await turn(toolset)
+    q = statistics.quantiles(steady, n=100)
+    report = {
+        "first_turn_ms": round(first, 2),
+        "steady": {"mean_ms": round(statistics.mean(steady), 2), "p50_ms": round(q[49], 2), "p99_ms": round(q[98], 2)},
+        "after_break_ms": round(after_break, 2),
+    }
+    if isinstance(toolset, PooledMCPToolset):
+        await asyncio.sleep(0.5)  # let the broken session reconnect in the background
+        report["stats"] = toolset.stats()
+    await toolset.close()
+    return report
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmark.mcp_stub",
+        "--port", str(port), "--transport", args.transport, "--latency-ms", str(args.latency_ms),
+    ])
+    try:
+        await wait_ready(port, process)
+        if args.transport == "sse":
+            params = SseServerParams(url=f"http://127.0.0.1:{port}/sse")
+        else:
+            params = StreamableHTTPConnectionParams(url=f"http://127.0.0.1:{port}/mcp/")
+        return {
+            "transport": args.transport,
+            "latency_ms": args.latency_ms,
+            "MCPToolset": await measure(MCPToolset(connection_params=params), args.turns),
+            "PooledMCPToolset": await measure(PooledMCPToolset(connection_params=params, pool_size=2), args.turns),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    logging.getLogger("google_adk").setLevel(logging.ERROR)  # MCPTool warns about missing auth on creation
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Delay of every HTTP request to the MCP stub")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default="sse")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
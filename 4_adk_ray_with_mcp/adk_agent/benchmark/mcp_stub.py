@@ -0,0 +1,108 @@
+"""
+Local stand-in for the weather MCP server, for the agent benchmarks.
+
+It exposes the weather server's tool names with small fixed answers, over SSE
+or streamable HTTP. Every HTTP request is delayed by `--latency-ms` to stand in
+for the network hop between the agent and MCP server pods.
+
+    python -m benchmark.mcp_stub --port 50061 --transport sse --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from mcp.server.fastmcp import FastMCP
+
+FORECAST = [{"name": "Today", "temperature": 61, "temperatureUnit": "F", "shortForecast": "Partly Sunny"}]
+
+mcp = FastMCP(instance_name="weather_mcp_stub", stateless_http=True)
+
+
+@mcp.tool()
+async def get_alerts(state: str) -> str:
+    """Get weather alerts for a US state.
+
+    Args:
+        state: Two-letter US state code (e.g. CA, NY)
+    """
+    return f"No active alerts for {state}."
+
+
+@mcp.tool()
+async def get_forecast(latitude: float, longitude: float) -> str:
+    """Get weather forecast for a location. Returns data as a JSON string.
+
+    Args:
+        latitude: Latitude of the location
+        longitude: Longitude of the location
+    """
+    return json.dumps(FORECAST)
+
+
+@mcp.tool()
+async def get_forecast_by_place(place: str) -> str:
+    """Get weather forecast for a US city or town by name. Returns data as a JSON string.
+
+    Args:
+        place: Place name, optionally with its state (e.g. "Portland, OR", "Saint Louis")
+    """
+    return json.dumps({"place": place, "forecast": FORECAST})
+
+
+@mcp.tool()
+async def get_alerts_multi(states: list[str]) -> str:
+    """Get weather alerts for several US states in one call.
+
+    Args:
+        states: Two-letter US state codes (e.g. ["CA", "NV", "OR"])
+    """
+    return json.dumps({state: [] for state in states})
+
+
+@mcp.tool()
+async def get_alert_detail(alert_id: str) -> str:
+    """Get the full text of one weather alert.
+
+    Args:
+        alert_id: The alert `id` from get_alerts or get_alerts_multi
+    """
+    return "Unable to fetch this alert; it may have expired."
+
+
+@mcp.tool()
+async def get_forecast_period(latitude: float, longitude: float, index: int) -> str:
+    """Get one forecast period of a location in full.
+
+    Args:
+        latitude: Latitude of the location
+        longitude: Longitude of the location
+        index: Position of the period in the forecast, starting at 0
+    """
+    return json.dumps(FORECAST[0])
+
+
+def with_latency(app, latency_s: float):
+    async def delayed(scope, receive, send):
+        if scope["type"] == "http" and latency_s > 0:
+            await asyncio.sleep(latency_s)
+        await app(scope, receive, send)
+
+    return delayed
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=50061)
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default="sse")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    app = mcp.sse_app() if args.transport == "sse" else mcp.streamable_http_app()
+    uvicorn.run(with_latency(app, args.latency_ms / 1000), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Local stand-in for an OpenAI-compatible model server (e.g. the Ray Serve vLLM app).
+
+/v1/chat/completions answers after `--latency-ms`, plus `--per-request-ms`
+for every other request in flight so that a busy server slows down like a
+saturated one, and fails `--fail-rate` of requests with a 503. Streaming
+requests get their first chunk after that delay. POST /-/slowness changes
+the delays while running, to turn a healthy server into a slow one.
+
+    python -m benchmark.openai_stub --port 50071 --latency-ms 50 --per-request-ms 2
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+config = {"latency_ms": 50.0, "per_request_ms": 0.0, "fail_rate": 0.0}
+in_flight = 0
+
+
+def completion(model: str, text: str) -> dict:
+    return {
+        "id": f"chatcmpl-{random.getrandbits(64):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    }
+
+
+def chunk(model: str, delta: dict, finish_reason=None) -> str:
+    body = {
+        "id": "chatcmpl-stream", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(body)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    global in_flight
+    body = await request.json()
+    model = body.get("model", "stub")
+    in_flight += 1
+    try:
+        await asyncio.sleep((config["latency_ms"] + config["per_request_ms"] * (in_flight - 1)) / 1000)
+    finally:
+        in_flight -= 1
+    if random.random() < config["fail_rate"]:
+        return JSONResponse({"error": {"message": "overloaded", "type": "server_error"}}, status_code=503)
+    if not body.get("stream"):
+        return completion(model, "It is sunny.")
+
+    async def events():
+        for word in ["It ", "is ", "sunny."]:
+            yield chunk(model, {"role": "assistant", "content": word})
+        yield chunk(model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+
+@app.post("/-/slowness")
+async def set_slowness(request: Request):
+    config.update({k: float(v) for k, v in (await request.json()).items() if k in config})
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=50071)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--per-request-ms", type=float, default=0.0, help="Added per other request in flight")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config.update(latency_ms=args.latency_ms, per_request_ms=args.per_request_ms, fail_rate=args.fail_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
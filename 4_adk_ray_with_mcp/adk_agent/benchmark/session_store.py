@@ -0,0 +1,158 @@
+"""
+Measure event appends per second with 1 to 256 sessions appending at once.
+
+Each session does what a runner does for a turn: get the session, then
+append events one after another (a model reply of `--event-chars`, every
+fourth with a state change). Compared stores:
+
+- adk-memory: ADK's InMemorySessionService (nothing persisted)
+- adk-sqlite: ADK's DatabaseSessionService on sqlite:///, the agents' old default
+- memory: StoredSessionService served from memory, written behind to SQLite
+- sqlite: StoredSessionService on SQLite in WAL mode, appends return once committed
+- redis: StoredSessionService on Redis, with `--redis-url`
+
+After each run the events are read back through a new service to check none
+were lost.
+
+    python -m benchmark.session_store --sessions 1 4 16 64 256 --appends 4096
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from typing import Any, Callable, Dict, List
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from adk_shared.session_store import RedisSessionBackend, SqliteSessionBackend, StoredSessionService
+
+APP = "weather_agent"
+
+
+def event(invocation_id: str, i: int, chars: int) -> Event:
+    return Event(
+        invocation_id=invocation_id,
+        author="weather_chat_agent",
+        content=types.Content(role="model", parts=[types.Part(text=("Showers likely after noon. " * chars)[:chars])]),
+        actions=EventActions(state_delta={"turns": i, "user:last_city": "Seattle"} if i % 4 == 0 else {}),
+    )
+
+
+async def session_turn(service: Any, user: str, session_id: str, events: List[Event], latencies: List[float]):
+    session = await service.get_session(app_name=APP, user_id=user, session_id=session_id)
+    for e in events:
+        start = time.perf_counter()
+        await service.append_event(session=session, event=e)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def measure(
+    make: Callable[[], Any], reopen: Callable[[], Any], sessions: int, appends: int, chars: int,
+) -> Dict[str, Any]:
+    service = make()
+    ids = []
+    for n in range(sessions):
+        session = await service.create_session(app_name=APP, user_id=f"user-{n % 16}")
+        ids.append((session.user_id, session.id))
+    # Built up front: creating Events costs more than some stores take to append them.
+    events = {sid: [event(f"{sid}-{i // 4}", i, chars) for i in range(appends)] for _, sid in ids}
+    latencies: List[float] = []
+    batches_before = (service.batches, service.batched_ops) if isinstance(service, StoredSessionService) else None
+    start = time.perf_counter()
+    await asyncio.gather(*(session_turn(service, user, sid, events[sid], latencies) for user, sid in ids))
+    elapsed = time.perf_counter() - start
+    report = {
+        "appends_per_s": round(sessions * appends / elapsed),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(statistics.quantiles(latencies, n=100)[98], 3),
+    }
+    if isinstance(service, StoredSessionService):
+        start = time.perf_counter()
+        await service.flush()
+        report["flush_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        batches, ops = service.batches - batches_before[0], service.batched_ops - batches_before[1]
+        report["appends_per_commit"] = round(ops / batches, 1) if batches else None
+        await service.close()
+    readback = reopen() or service
+    stored = [await readback.get_session(app_name=APP, user_id=user, session_id=sid) for user, sid in ids]
+    report["lost_events"] = sum(appends - len(s.events) for s in stored)
+    if isinstance(readback, StoredSessionService) and readback is not service:
+        await readback.close()
+    return report
+
+
+def stores(args: argparse.Namespace, directory: str) -> Dict[str, tuple]:
+    from google.adk.sessions import DatabaseSessionService
+
+    def path(name: str) -> str:
+        return os.path.join(directory, f"{name}-{time.monotonic_ns()}.db")
+
+    def fresh(kind: str):
+        # One database file per run; `reopen` reads back the one `make` wrote.
+        current: Dict[str, str] = {}
+
+        def make():
+            current["path"] = path(kind)
+            if kind == "adk-sqlite":
+                return DatabaseSessionService(db_url=f"sqlite:///{current['path']}")
+            backend = SqliteSessionBackend(current["path"])
+            if kind == "memory":
+                return StoredSessionService(backend, write_behind=True, flush_interval_s=args.flush_interval_ms / 1000)
+            return StoredSessionService(backend)
+
+        def reopen():
+            if kind == "adk-sqlite":
+                return DatabaseSessionService(db_url=f"sqlite:///{current['path']}")
+            return StoredSessionService(SqliteSessionBackend(current["path"]))
+
+        return make, reopen
+
+    selected = {
+        "adk-memory": (InMemorySessionService, lambda: None),
+        "adk-sqlite": fresh("adk-sqlite"),
+        "memory": fresh("memory"),
+        "sqlite": fresh("sqlite"),
+    }
+    if args.redis_url:
+        selected["redis"] = (
+            lambda: StoredSessionService(RedisSessionBackend(args.redis_url, prefix=f"bench-{time.monotonic_ns()}:")),
+            lambda: None,
+        )
+    return {name: selected[name] for name in args.stores if name in selected}
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (make, reopen) in stores(args, directory).items():
+            report[name] = {}
+            for sessions in args.sessions:
+                appends = max(args.appends // sessions, args.min_appends)
+                report[name][sessions] = await measure(make, reopen, sessions, appends, args.event_chars)
+    return report
+
+
+def main():
+    logging.getLogger("google_adk").setLevel(logging.ERROR)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--appends", type=int, default=4096, help="Appends per run, split between the sessions")
+    parser.add_argument("--min-appends", type=int, default=8, help="Appends per session at least")
+    parser.add_argument("--event-chars", type=int, default=600)
+    parser.add_argument("--flush-interval-ms", type=float, default=50.0)
+    parser.add_argument("--stores", nargs="+", default=["adk-memory", "adk-sqlite", "memory", "sqlite", "redis"])
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure tool latency and hit ratio with the tool-result cache attached.
+
+Replays `--calls` tool calls the way ADK makes them: before_tool_callback,
+the MCP tool itself on a miss, then after_tool_callback. Calls go to the
+agent's get_forecast_by_place / get_alerts policies against a local MCP stub
+(benchmark.mcp_stub) with `--latency-ms` per request. Places and states are
+drawn Zipf-like from `--distinct` values, with the case and spacing varied
+so only normalization makes them hit. `--max-entries` below `--distinct`
+shows LRU eviction at work.
+
+    python -m benchmark.tool_cache --calls 2000 --distinct 200 --max-entries 100
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams
+
+from benchmark.mcp_pool import free_port, wait_ready
+from weather_agent import agent
+from weather_agent.mcp_pool import PooledMCPToolset
+from adk_shared.tool_cache import ToolResultCache
+
+
+def workload(calls: int, distinct: int, rng: random.Random) -> List[tuple]:
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    spellings = [str.lower, str.upper, str.title, lambda s: f" {s} "]
+    work = []
+    for i in rng.choices(range(distinct), weights=weights, k=calls):
+        if i % 4 == 0:
+            work.append(("get_alerts", {"state": rng.choice(spellings)(f"s{i}")}))
+        else:
+            work.append(("get_forecast_by_place", {"place": rng.choice(spellings)(f"place {i}")}))
+    return work
+
+
+async def replay(tools: Dict[str, Any], cache: ToolResultCache, work: List[tuple]) -> Dict[str, Any]:
+    latencies = []
+    for call_id, (name, args) in enumerate(work):
+        tool = tools[name]
+        context = SimpleNamespace(function_call_id=str(call_id))
+        start = time.perf_counter()
+        response = await cache.before_tool(tool=tool, args=args, tool_context=context)
+        if response is None:
+            response = await tool._run_async_impl(args=args, tool_context=context, credential=None)
+        await cache.after_tool(tool=tool, args=args, tool_context=context, tool_response=response)
+        latencies.append((time.perf_counter() - start) * 1000)
+    q = statistics.quantiles(latencies, n=100)
+    stats = cache.stats()
+    hits = sum(t.get("hits", 0) for t in stats["tools"].values())
+    return {
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(q[49], 3),
+        "p99_ms": round(q[98], 3),
+        "hit_ratio": round(hits / len(work), 3),
+        "cache": stats,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmark.mcp_stub", "--port", str(port), "--latency-ms", str(args.latency_ms),
+    ])
+    try:
+        await wait_ready(port, process)
+        toolset = PooledMCPToolset(connection_params=SseServerParams(url=f"http://127.0.0.1:{port}/sse"))
+        tools = {tool.name: tool for tool in await toolset.get_tools()}
+        work = workload(args.calls, args.distinct, random.Random(args.seed))
+        # No policies: every call goes to the MCP server.
+        report = {
+            "uncached": await replay(tools, ToolResultCache({}), work),
+            "cached": await replay(tools, ToolResultCache(agent.tool_cache.policies, max_entries=args.max_entries), work),
+        }
+        report["uncached"].pop("cache")
+        await toolset.close()
+        return report
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    logging.getLogger("google_adk").setLevel(logging.ERROR)  # MCPTool warns about missing auth on creation
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200, help="Distinct places and states asked about")
+    parser.add_argument("--max-entries", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Delay of every HTTP request to the MCP stub")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
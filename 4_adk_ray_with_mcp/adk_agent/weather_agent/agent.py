@@ -3,9 +3,14 @@ import logging
 
 from google.adk.agents.llm_agent import LlmAgent
 from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
 from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams
 
+from adk_shared.history import history_compactor_from_env
+from adk_shared.model_client import llm_client_from_env
+from adk_shared.tool_cache import ToolCachePolicy, tool_cache_from_env
+
+from .mcp_pool import PooledMCPToolset
+
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
@@ -18,34 +23,93 @@ logger.debug(f"Connecting to LLM at: {api_base_url}")
 # MCP Toolset Configuration
 mcp_weather_host = os.getenv("WEATHER_MCP_SERVER_HOST", "weather-mcp-server")
 mcp_weather_port = int(os.getenv("WEATHER_SERVER_PORT", 8080))
-mcp_weather_path = os.getenv("WEATHER_MCP_PATH", "/sse")
+mcp_weather_transport = os.getenv("WEATHER_MCP_TRANSPORT", "sse")
+mcp_weather_path = os.getenv("WEATHER_MCP_PATH", "/mcp/" if mcp_weather_transport == "streamable-http" else "/sse")
 full_mcp_sse_url = f"http://{mcp_weather_host}:{mcp_weather_port}{mcp_weather_path}"
-logger.info(f"Configuring MCPToolset URL: {full_mcp_sse_url}")
+logger.info(f"Configuring MCPToolset URL: {full_mcp_sse_url} ({mcp_weather_transport})")
 
-connection_params = SseServerParams(
-    url=full_mcp_sse_url,
-    headers={'Accept': 'text/event-stream'}  # Standard for SSE
-)
+if mcp_weather_transport == "streamable-http":
+    # Stateless requests can go to any replica and worker behind the Service.
+    from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+
+    connection_params = StreamableHTTPConnectionParams(url=full_mcp_sse_url)
+else:
+    connection_params = SseServerParams(
+        url=full_mcp_sse_url,
+        headers={'Accept': 'text/event-stream'}  # Standard for SSE
+    )
 
-logger.info(f"Attempting to get tools using MCPToolset.from_server with URL: {full_mcp_sse_url}")
-weather_toolset = MCPToolset(
-    connection_params=connection_params
+# Warm sessions and the tool list are shared by every agent run in this process,
+# so a turn neither reconnects nor lists the tools again.
+weather_toolset = PooledMCPToolset(
+    connection_params=connection_params,
+    pool_size=int(os.getenv("WEATHER_MCP_POOL_SIZE", "2")),
+    schema_ttl_s=float(os.getenv("WEATHER_MCP_SCHEMA_TTL_S", "300")),
+    health_interval_s=float(os.getenv("WEATHER_MCP_HEALTH_INTERVAL_S", "15")),
 )
-logger.info("Weather MCPToolset initialized. It will connect to the MCP server when required.")
+logger.info("Weather MCP toolset initialized. It will connect to the MCP server on the first agent run.")
+
+
+def _rounded_coordinates(args: dict) -> dict:
+    # ~10 m apart is the same place to NWS.
+    return {**args, **{k: round(float(args[k]), 4) for k in ("latitude", "longitude") if k in args}}
+
+
+def _folded(name: str, fold=str.lower):
+    def normalize(args: dict) -> dict:
+        value = args.get(name)
+        if isinstance(value, list):
+            return {**args, name: sorted(fold(str(v).strip()) for v in value)}
+        return {**args, name: fold(str(value).strip())} if value is not None else args
+
+    return normalize
+
+
+# Identical tool calls from any session reuse each other's results for a while.
+FORECAST_TTL_S = float(os.getenv("TOOL_CACHE_FORECAST_TTL_S", "600"))
+ALERTS_TTL_S = float(os.getenv("TOOL_CACHE_ALERTS_TTL_S", "60"))
+# The alert tools report a failed lookup in plain text rather than as an MCP error.
+ALERT_FAILURES = r"(?m)^(Unable to fetch|Invalid alert id|Too many)"
+tool_cache = tool_cache_from_env({
+    "get_forecast": ToolCachePolicy(FORECAST_TTL_S, ("latitude", "longitude"), _rounded_coordinates),
+    "get_forecast_period": ToolCachePolicy(FORECAST_TTL_S, ("latitude", "longitude", "index"), _rounded_coordinates),
+    "get_forecast_by_place": ToolCachePolicy(FORECAST_TTL_S, ("place",), _folded("place")),
+    "get_forecasts": ToolCachePolicy(FORECAST_TTL_S, ("locations",)),
+    "get_alerts": ToolCachePolicy(ALERTS_TTL_S, ("state",), _folded("state", str.upper), ALERT_FAILURES),
+    "get_alerts_multi": ToolCachePolicy(ALERTS_TTL_S, ("states",), _folded("states", str.upper), ALERT_FAILURES),
+    "get_alert_detail": ToolCachePolicy(ALERTS_TTL_S, ("alert_id",), error_text=ALERT_FAILURES),
+})
+
+# Old tool results are summarized, and then dropped, to keep prompts within the vLLM context.
+history_compactor = history_compactor_from_env(default_max_model_len=8192)
+
+# Calls are spread over LLM_ENDPOINTS (default: api_base_url) on pooled connections,
+# skipping endpoints that keep failing.
+llm_client = llm_client_from_env(default_endpoint=api_base_url)
 
 # Agent configuration
 root_agent = LlmAgent(
     name="weather_chat_agent",
     model=LiteLlm(
         model="hosted_vllm/meta-llama/Llama-3.1-8B-Instruct",
-        api_base=api_base_url
+        api_base=api_base_url,
+        **({"llm_client": llm_client} if llm_client else {}),
     ),
     instruction="""You are a specialist AI assistant for weather.
 
 Use your available tools to answer questions about weather.
+For a US city or town, use get_forecast_by_place with its name rather than
+guessing its coordinates.
+When a question covers several locations or states, look them all up in one
+call with get_forecasts or get_alerts_multi instead of one call per location.
+Tool results may shorten long text; only call get_alert_detail or
+get_forecast_period when the user needs the full text.
 Format your answers clearly using Markdown.
 If you cannot find specific information, say so.""",
     tools=[weather_toolset],
+    before_model_callback=history_compactor.before_model if history_compactor else None,
+    before_tool_callback=tool_cache.before_tool if tool_cache else None,
+    after_tool_callback=tool_cache.after_tool if tool_cache else None,
 )
 logger.info(f"ADK Agent '{root_agent.name}' created and configured with Weather MCP Toolset. "
             f"The toolset will connect to {full_mcp_sse_url} to fetch tool schemas.")
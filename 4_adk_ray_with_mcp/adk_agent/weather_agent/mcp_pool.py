@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import random
+import time
+
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.mcp_tool.mcp_session_manager import SseServerParams
+from google.adk.tools.mcp_tool.mcp_tool import MCPTool
+from mcp import ClientSession, types
+from mcp.client.sse import sse_client
+
+try:
+    from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
+    from mcp.client.streamable_http import streamablehttp_client
+except ImportError:  # google-adk before 1.2
+    StreamableHTTPConnectionParams = None
+
+logger = logging.getLogger(__name__)
+
+
+def is_disconnected(session: ClientSession) -> bool:
+    """Whether the session's streams are closed (the check MCPSessionManager uses too)."""
+    return session._read_stream._closed or session._write_stream._closed
+
+
+class _Slot:
+    def __init__(self, index: int):
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.reconnect = asyncio.Event()
+        self.connects = 0
+        self.failures = 0
+
+
+class MCPSessionPool:
+    """
+    Keeps `size` initialized MCP client sessions open for every agent run in the process.
+
+    Each session is owned by a background task that connects it, pings it every
+    `health_interval_s` and reconnects it with backoff once it breaks, so a
+    broken session is replaced off the turn's critical path. Turns only wait
+    for a connection while no session at all is healthy.
+
+    `create_session` has MCPSessionManager's signature, so MCPTool can call
+    tools through the pool.
+    """
+
+    def __init__(
+        self,
+        connection_params: Any,
+        size: int = 2,
+        health_interval_s: float = 15.0,
+        connect_timeout_s: float = 10.0,
+        max_backoff_s: float = 30.0,
+        on_tools_changed: Optional[Callable[[], None]] = None,
+    ):
+        self.connection_params = connection_params
+        self.size = size
+        self.health_interval_s = health_interval_s
+        self.connect_timeout_s = connect_timeout_s
+        self.max_backoff_s = max_backoff_s
+        self.on_tools_changed = on_tools_changed
+        self.server_version: Optional[str] = None
+        self._slots = [_Slot(i) for i in range(size)]
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Event] = None
+        self._next = 0
+        self._closed = False
+        self.waits = 0
+
+    def start(self):
+        """Start connecting the sessions; needs a running event loop, so it happens on first use."""
+        if self._tasks or self._closed:
+            return
+        self._changed = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run_slot(slot)) for slot in self._slots]
+
+    async def create_session(self, headers: Optional[Dict[str, str]] = None) -> ClientSession:
+        """A healthy pooled session, round robin; waits up to `connect_timeout_s` if none is."""
+        if headers:
+            raise ValueError("Pooled MCP sessions are shared and can't carry per-call headers")
+        self.start()
+        deadline = time.monotonic() + self.connect_timeout_s
+        waited = False
+        while True:
+            healthy = []
+            for slot in self._slots:
+                if slot.session is None:
+                    continue
+                if is_disconnected(slot.session):
+                    slot.reconnect.set()
+                else:
+                    healthy.append(slot.session)
+            if healthy:
+                self._next += 1
+                return healthy[self._next % len(healthy)]
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise ConnectionError(f"No healthy MCP session to {self.connection_params.url} "
+                                      f"within {self.connect_timeout_s}s")
+            if not waited:
+                waited = True
+                self.waits += 1
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": sum(1 for s in self._slots if s.session is not None and not is_disconnected(s.session)),
+            "size": self.size,
+            "connects": sum(s.connects for s in self._slots),
+            "failures": sum(s.failures for s in self._slots),
+            "turns_waited": self.waits,
+            "server_version": self.server_version,
+        }
+
+    def _client(self):
+        params = self.connection_params
+        if StreamableHTTPConnectionParams is not None and isinstance(params, StreamableHTTPConnectionParams):
+            return streamablehttp_client(
+                url=params.url,
+                headers=params.headers,
+                timeout=timedelta(seconds=params.timeout),
+                sse_read_timeout=timedelta(seconds=params.sse_read_timeout),
+            )
+        if isinstance(params, SseServerParams):
+            return sse_client(
+                url=params.url,
+                headers=params.headers,
+                timeout=params.timeout,
+                sse_read_timeout=params.sse_read_timeout,
+            )
+        raise ValueError(f"MCPSessionPool supports SSE and streamable HTTP connections, not {type(params).__name__}")
+
+    async def _run_slot(self, slot: _Slot):
+        backoff = 0.5
+        while not self._closed:
+            connected = False
+            try:
+                async with AsyncExitStack() as stack:
+                    transports = await stack.enter_async_context(self._client())
+                    session = await stack.enter_async_context(
+                        ClientSession(*transports[:2], message_handler=self._on_message)
+                    )
+                    result = await asyncio.wait_for(session.initialize(), self.connect_timeout_s)
+                    self._check_server_version(result.serverInfo.version)
+                    slot.session = session
+                    slot.connects += 1
+                    slot.reconnect.clear()
+                    connected = True
+                    self._changed.set()
+                    logger.debug(f"MCP session {slot.index} connected to {self.connection_params.url}")
+                    await self._watch(slot, session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                slot.failures += 1
+                logger.warning(f"MCP session {slot.index} to {self.connection_params.url} failed: {e!r}")
+            finally:
+                slot.session = None
+            if connected:
+                backoff = 0.5
+                continue
+            await asyncio.sleep(random.uniform(backoff / 2, backoff))
+            backoff = min(backoff * 2, self.max_backoff_s)
+
+    async def _watch(self, slot: _Slot, session: ClientSession):
+        """Return once the session is broken or a turn found it disconnected."""
+        while True:
+            try:
+                await asyncio.wait_for(slot.reconnect.wait(), self.health_interval_s)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if is_disconnected(session):
+                return
+            try:
+                await asyncio.wait_for(session.send_ping(), self.connect_timeout_s)
+            except Exception as e:
+                logger.warning(f"MCP session {slot.index} failed its health check: {e!r}")
+                return
+
+    def _check_server_version(self, version: str):
+        if self.server_version is not None and version != self.server_version:
+            logger.info(f"MCP server version changed from {self.server_version} to {version}")
+            if self.on_tools_changed is not None:
+                self.on_tools_changed()
+        self.server_version = version
+
+    async def _on_message(self, message: Any):
+        if (
+            isinstance(message, types.ServerNotification)
+            and isinstance(message.root, types.ToolListChangedNotification)
+            and self.on_tools_changed is not None
+        ):
+            logger.info("MCP server announced a changed tool list")
+            self.on_tools_changed()
+
+
+class PooledMCPToolset(BaseToolset):
+    """
+    Drop-in for MCPToolset that calls tools over an MCPSessionPool and caches the tool list.
+
+    MCPToolset lists the server's tools on every LLM turn. Here the list is
+    fetched once and served for `schema_ttl_s`; after that it is refreshed in
+    the background while the cached tools keep being served. A tools/list_changed
+    notification, or a reconnect that finds another server version, drops the
+    cache so the next turn fetches the new list.
+    """
+
+    def __init__(
+        self,
+        *,
+        connection_params: Any,
+        pool_size: int = 2,
+        schema_ttl_s: float = 300.0,
+        health_interval_s: float = 15.0,
+        connect_timeout_s: float = 10.0,
+        tool_filter: Optional[Union[Callable, List[str]]] = None,
+    ):
+        super().__init__(tool_filter=tool_filter)
+        self.pool = MCPSessionPool(
+            connection_params,
+            size=pool_size,
+            health_interval_s=health_interval_s,
+            connect_timeout_s=connect_timeout_s,
+            on_tools_changed=self.invalidate,
+        )
+        self.schema_ttl_s = schema_ttl_s
+        self._tools: Optional[List[MCPTool]] = None
+        self._fetched_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.schema_fetches = 0
+        self.schema_hits = 0
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        if self._tools is None:
+            await self._refresh()
+        else:
+            self.schema_hits += 1
+            if time.monotonic() - self._fetched_at >= self.schema_ttl_s and (
+                self._refresh_task is None or self._refresh_task.done()
+            ):
+                self._refresh_task = asyncio.create_task(self._refresh_in_background())
+        return [tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)]
+
+    def invalidate(self):
+        self._tools = None
+
+    async def _refresh(self):
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Another turn may have refreshed the list while this one waited.
+            if self._tools is not None and time.monotonic() - self._fetched_at < self.schema_ttl_s:
+                return
+            session = await self.pool.create_session()
+            result = await session.list_tools()
+            self._tools = [MCPTool(mcp_tool=tool, mcp_session_manager=self.pool) for tool in result.tools]
+            self._fetched_at = time.monotonic()
+            self.schema_fetches += 1
+            logger.debug(f"Fetched {len(self._tools)} MCP tool schemas")
+
+    async def _refresh_in_background(self):
+        try:
+            await self._refresh()
+        except Exception as e:
+            logger.warning(f"Refreshing MCP tool schemas failed; serving the cached ones: {e!r}")
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        await self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"schema_fetches": self.schema_fetches, "schema_hits": self.schema_hits, "pool": self.pool.stats()}
@@ -0,0 +1,211 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+import httpx
+
+from nws_client import NWSClient
+
+logger = logging.getLogger(__name__)
+
+
+def _expired(feature: Dict[str, Any], now: float) -> bool:
+    expires = feature["properties"].get("expires") or feature["properties"].get("ends")
+    if not expires:
+        return False
+    try:
+        return datetime.fromisoformat(expires).timestamp() <= now
+    except ValueError:
+        return False
+
+
+class AlertIndex:
+    """
+    Active alerts indexed by state, UGC zone and severity.
+
+    `apply` takes a full snapshot of the national feed and only touches the
+    alerts that were added, removed or re-sent since the previous snapshot.
+    """
+
+    def __init__(self):
+        self.alerts: Dict[str, Dict[str, Any]] = {}
+        self.by_state: Dict[str, Set[str]] = {}
+        self.by_zone: Dict[str, Set[str]] = {}
+        self.by_severity: Dict[str, Set[str]] = {}
+        self.updated_at: Optional[float] = None
+
+    def apply(self, features: List[Dict[str, Any]], now: float) -> Dict[str, int]:
+        snapshot = {
+            feature.get("id") or feature["properties"]["id"]: feature
+            for feature in features
+            if not _expired(feature, now)
+        }
+        removed = [alert_id for alert_id in self.alerts if alert_id not in snapshot]
+        for alert_id in removed:
+            self._remove(alert_id)
+
+        added = updated = 0
+        for alert_id, feature in snapshot.items():
+            current = self.alerts.get(alert_id)
+            if current is None:
+                added += 1
+            elif current["properties"].get("sent") != feature["properties"].get("sent"):
+                self._remove(alert_id)
+                updated += 1
+            else:
+                continue
+            self._add(alert_id, feature)
+        self.updated_at = now
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def expire(self, now: float) -> int:
+        expired = [
+            alert_id for alert_id, feature in self.alerts.items()
+            if _expired(feature, now)
+        ]
+        for alert_id in expired:
+            self._remove(alert_id)
+        return len(expired)
+
+    def for_state(self, state: str, severity: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Alerts touching a state (or marine area) code, newest first."""
+        ids = self.by_state.get(state.upper(), set())
+        if severity is not None:
+            ids = ids & self.by_severity.get(severity, set())
+        now = time.time()
+        alerts = [
+            self.alerts[alert_id] for alert_id in ids
+            if not _expired(self.alerts[alert_id], now)
+        ]
+        return sorted(alerts, key=lambda feature: feature["properties"].get("sent") or "", reverse=True)
+
+    def for_zone(self, zone: str) -> List[Dict[str, Any]]:
+        return [self.alerts[alert_id] for alert_id in self.by_zone.get(zone.upper(), set())]
+
+    def _keys(self, feature: Dict[str, Any]) -> Dict[str, Set[str]]:
+        zones = set(feature["properties"].get("geocode", {}).get("UGC", []))
+        return {
+            "zone": zones,
+            "state": {zone[:2] for zone in zones},
+            "severity": {feature["properties"].get("severity") or "Unknown"},
+        }
+
+    def _add(self, alert_id: str, feature: Dict[str, Any]):
+        self.alerts[alert_id] = feature
+        keys = self._keys(feature)
+        for index, kind in ((self.by_state, "state"), (self.by_zone, "zone"), (self.by_severity, "severity")):
+            for key in keys[kind]:
+                index.setdefault(key, set()).add(alert_id)
+
+    def _remove(self, alert_id: str):
+        feature = self.alerts.pop(alert_id)
+        keys = self._keys(feature)
+        for index, kind in ((self.by_state, "state"), (self.by_zone, "zone"), (self.by_severity, "severity")):
+            for key in keys[kind]:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(alert_id)
+                    if not ids:
+                        del index[key]
+
+
+class AlertIngestor:
+    """
+    Polls the national active-alerts feed in the background and keeps an AlertIndex current.
+
+    Polls are conditional (ETag / Last-Modified), so an unchanged feed costs a
+    304 and no parsing. The index is only used while the last successful poll
+    is at most `max_staleness_s` old; callers fall back to NWS otherwise.
+    """
+
+    def __init__(self, client: NWSClient, url: str, poll_interval_s: float = 30.0, max_staleness_s: float = 300.0):
+        self.client = client
+        self.url = url
+        self.poll_interval_s = poll_interval_s
+        self.max_staleness_s = max_staleness_s
+        self.index = AlertIndex()
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sessions = 0
+        self.polls = 0
+        self.not_modified = 0
+        self.failures = 0
+
+    def fresh(self) -> bool:
+        return self.index.updated_at is not None and time.time() - self.index.updated_at <= self.max_staleness_s
+
+    def as_of(self) -> Optional[str]:
+        if self.index.updated_at is None:
+            return None
+        return datetime.fromtimestamp(self.index.updated_at, timezone.utc).isoformat(timespec="seconds")
+
+    async def poll_once(self):
+        headers: Dict[str, str] = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        response = await self.client.get(self.url, headers=headers or None)
+        now = time.time()
+        self.polls += 1
+        if response.status_code == 304:
+            self.not_modified += 1
+            expired = self.index.expire(now)
+            self.index.updated_at = now
+            if expired:
+                logger.info(f"Alert index: {expired} alerts expired")
+            return
+
+        response.raise_for_status()
+        self._etag = response.headers.get("etag")
+        self._last_modified = response.headers.get("last-modified")
+        diff = self.index.apply(response.json().get("features", []), now)
+        if any(diff.values()):
+            logger.info(f"Alert index updated: {diff} ({len(self.index.alerts)} active)")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except httpx.HTTPError as e:
+                self.failures += 1
+                logger.warning(f"Polling {self.url} failed: {e!r}")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Unexpected error polling {self.url}: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval_s)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["AlertIngestor"]:
+        """Keep the poller running while at least one MCP session is open."""
+        self._sessions += 1
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        try:
+            yield self
+        finally:
+            self._sessions -= 1
+            if self._sessions == 0 and self._task is not None:
+                self._task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self._task
+                self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active_alerts": len(self.index.alerts),
+            "states": len(self.index.by_state),
+            "as_of": self.as_of(),
+            "fresh": self.fresh(),
+            "polls": self.polls,
+            "not_modified": self.not_modified,
+            "failures": self.failures,
+        }
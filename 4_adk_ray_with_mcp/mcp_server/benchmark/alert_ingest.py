@@ -0,0 +1,101 @@
+"""
+Exercise background alert ingestion against a stub national alerts feed.
+
+Adds, removes and expires alerts in the stub between polls and checks that
+`get_alerts` answered from the index follows along, that unchanged polls are
+304s, and compares the latency of index-backed and upstream `get_alerts`.
+
+    python -m benchmark.alert_ingest --poll-s 0.1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from typing import Any, Dict, List
+
+import weather_mcp
+from alert_ingest import AlertIngestor
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher
+
+
+async def latency_us(calls: int, state: str) -> Dict[str, float]:
+    latencies: List[float] = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await weather_mcp.get_alerts(state)
+        latencies.append(time.perf_counter() - start)
+    return {
+        "p50": round(statistics.median(latencies) * 1e6, 1),
+        "p99": round(statistics.quantiles(latencies, n=100)[98] * 1e6, 1),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, None, None)
+    ingestor = AlertIngestor(weather_mcp.nws_client, f"{stub.base_url}/alerts/active", poll_interval_s=args.poll_s)
+
+    async def next_polls(n: int = 2):
+        polls = ingestor.polls
+        while ingestor.polls < polls + n:
+            await asyncio.sleep(args.poll_s / 4)
+
+    report: Dict[str, Any] = {}
+    try:
+        async with weather_mcp.nws_client.session():
+            upstream = await latency_us(args.calls // 10, "CA")
+
+            stub.add_alert("ca-wind", ["CAZ006", "CAZ505"], "Wind Advisory")
+            stub.add_alert("ca-fire", ["CAZ041"], "Red Flag Warning", severity="Severe")
+            stub.add_alert("wa-flood", ["WAZ558"], "Flood Watch")
+            weather_mcp.alert_ingestor = ingestor
+            async with ingestor.session():
+                await next_polls()
+                ca = await weather_mcp.get_alerts("CA")
+                assert "Wind Advisory" in ca and "Red Flag Warning" in ca and "Alerts as of" in ca, ca
+                assert "Flood Watch" not in ca
+                assert ingestor.not_modified >= 1, "unchanged feed was not answered with 304"
+
+                stub.remove_alert("ca-wind")
+                stub.add_alert("tx-heat", ["TXZ213"], "Heat Advisory")
+                stub.add_alert("ca-short", ["CAZ006"], "Dense Fog Advisory", expires_in_s=args.poll_s * 3)
+                await next_polls()
+                ca = await weather_mcp.get_alerts("CA")
+                assert "Wind Advisory" not in ca and "Dense Fog Advisory" in ca, ca
+                assert "Heat Advisory" in await weather_mcp.get_alerts("TX")
+                assert [f["properties"]["id"] for f in ingestor.index.for_zone("CAZ041")] == ["ca-fire"]
+
+                # The stub keeps listing the fog advisory; it must drop out once it expires.
+                await asyncio.sleep(args.poll_s * 3)
+                await next_polls()
+                assert "Dense Fog Advisory" not in await weather_mcp.get_alerts("CA")
+                assert "No active alerts" in await weather_mcp.get_alerts("NY")
+
+                indexed = await latency_us(args.calls, "CA")
+                report = {
+                    "get_alerts_upstream_us": upstream,
+                    "get_alerts_indexed_us": indexed,
+                    "ingestor": ingestor.stats(),
+                }
+    finally:
+        await stub.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--poll-s", type=float, default=0.1)
+    parser.add_argument("--calls", type=int, default=10000)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--response-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
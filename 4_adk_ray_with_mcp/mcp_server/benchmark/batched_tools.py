@@ -0,0 +1,109 @@
+"""
+Compare a five-city weather question answered with per-location tools and with batched tools.
+
+The agent is simulated: every LLM turn costs `--llm-turn-ms` (a prefill plus
+decoding one tool call or the final answer), while tool calls really run
+against a local stub NWS server. With per-location tools the model needs one
+turn per city plus the answer; with `get_forecasts` one tool turn plus the
+answer, and the five lookups run concurrently.
+
+    python -m benchmark.batched_tools --llm-turn-ms 600
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from typing import Any, Dict
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher
+
+CITIES = {
+    "Seattle": (47.6062, -122.3321),
+    "New York": (40.7128, -74.006),
+    "Los Angeles": (34.0522, -118.2437),
+    "Chicago": (41.8781, -87.6298),
+    "Houston": (29.7604, -95.3698),
+}
+STATES = ["WA", "NY", "CA", "IL", "TX"]
+
+
+async def per_location_agent(llm_turn_s: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    turns = 0
+    tool_s = 0.0
+    for latitude, longitude in CITIES.values():
+        await asyncio.sleep(llm_turn_s)
+        turns += 1
+        tool_start = time.perf_counter()
+        result = json.loads(await weather_mcp.get_forecast(latitude, longitude))
+        tool_s += time.perf_counter() - tool_start
+        assert isinstance(result, list), result
+    await asyncio.sleep(llm_turn_s)
+    turns += 1
+    return {"llm_turns": turns, "tool_calls": len(CITIES), "tool_ms": round(tool_s * 1000, 1),
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+async def batched_agent(llm_turn_s: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    await asyncio.sleep(llm_turn_s)
+    tool_start = time.perf_counter()
+    locations = [weather_mcp.Location(latitude=lat, longitude=lon) for lat, lon in CITIES.values()]
+    result = json.loads(await weather_mcp.get_forecasts(locations))
+    tool_s = time.perf_counter() - tool_start
+    assert all("forecast" in entry for entry in result), result
+    await asyncio.sleep(llm_turn_s)
+    return {"llm_turns": 2, "tool_calls": 1, "tool_ms": round(tool_s * 1000, 1),
+            "wall_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    # Every lookup goes upstream, as it would for cities nobody asked about recently.
+    weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, None, None)
+    llm_turn_s = args.llm_turn_ms / 1000
+    try:
+        async with weather_mcp.nws_client.session():
+            report = {
+                "per_location_tools": await per_location_agent(llm_turn_s),
+                "get_forecasts": await batched_agent(llm_turn_s),
+            }
+
+            start = time.perf_counter()
+            for state in STATES:
+                await weather_mcp.get_alerts(state)
+            sequential_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            alerts = await weather_mcp.get_alerts_multi(STATES)
+            assert all(f"=== {state} ===" in alerts for state in STATES)
+            report["alerts_five_states_ms"] = {
+                "get_alerts_sequential": round(sequential_ms, 1),
+                "get_alerts_multi": round((time.perf_counter() - start) * 1000, 1),
+            }
+
+            # One location outside NWS coverage must not fail the others.
+            locations = [weather_mcp.Location(latitude=lat, longitude=lon) for lat, lon in CITIES.values()]
+            locations.append(weather_mcp.Location(latitude=85.0, longitude=0.0))
+            result = json.loads(await weather_mcp.get_forecasts(locations))
+            assert [("error" in entry) for entry in result] == [False] * len(CITIES) + [True], result
+    finally:
+        await stub.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-turn-ms", type=float, default=600.0)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--response-ms", type=float, default=80.0, help="NWS response time per request")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Compare prompt tokens and TTFT per agent turn with full and compact tool output.
+
+Replays a scripted weather conversation: every question costs one LLM turn
+that calls a tool and one that answers from its result, and every turn's
+prompt holds the system prompt, the tool schemas and the conversation so
+far, tool results included. Tools run against a local stub NWS server whose
+alerts and forecasts are as wordy as real ones.
+
+Prompt tokens are estimated at four characters per token and TTFT is modeled
+as `--ttft-base-ms` plus prefill at `--prefill-tok-s`. With `--endpoint` each
+turn's prompt is also sent to an OpenAI-compatible server (e.g. the Ray Serve
+vLLM app) to measure its real prompt tokens and TTFT.
+
+    python -m benchmark.compact_output --budget 400
+    python -m benchmark.compact_output --endpoint http://localhost:8000 --model meta-llama/Llama-3.1-8B-Instruct
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from compact_output import estimate_tokens
+from nws_cache import CachingNWSFetcher
+
+SYSTEM_PROMPT = "You are a specialist AI assistant for weather. Use your available tools to answer questions about weather."
+ANSWER = "Here is a summary of the conditions you asked about, formatted in Markdown. " * 4
+
+
+async def ask_forecasts():
+    locations = [
+        weather_mcp.Location(latitude=47.6062, longitude=-122.3321),
+        weather_mcp.Location(latitude=40.7128, longitude=-74.006),
+        weather_mcp.Location(latitude=41.8781, longitude=-87.6298),
+    ]
+    return await weather_mcp.get_forecasts(locations)
+
+
+SCRIPT = [
+    ("What's the forecast for Seattle, New York and Chicago?", ask_forecasts),
+    ("Any weather alerts in California, Washington or Oregon?", lambda: weather_mcp.get_alerts_multi(["CA", "WA", "OR"])),
+    ("And in Texas?", lambda: weather_mcp.get_alerts("TX")),
+    ("How about Los Angeles?", lambda: weather_mcp.get_forecast(34.0522, -118.2437)),
+]
+
+
+async def measure_ttft(client: httpx.AsyncClient, model: str, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    body = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": 1,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    start = time.perf_counter()
+    ttft_ms = None
+    prompt_tokens = None
+    async with client.stream("POST", "/v1/chat/completions", json=body) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            usage = json.loads(line[len("data: "):]).get("usage")
+            if usage:
+                prompt_tokens = usage["prompt_tokens"]
+    return {"measured_prompt_tokens": prompt_tokens, "measured_ttft_ms": round(ttft_ms or 0.0, 1)}
+
+
+async def conversation(args: argparse.Namespace, client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
+    tools = json.dumps([tool.model_dump(exclude_none=True) for tool in await weather_mcp.mcp.list_tools()])
+    messages = [{"role": "system", "content": f"{SYSTEM_PROMPT}\n\nTools: {tools}"}]
+    turns = []
+    tool_tokens = []
+
+    async def llm_turn():
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        turn = {
+            "turn": len(turns) + 1,
+            "prompt_tokens": prompt_tokens,
+            "modeled_ttft_ms": round(args.ttft_base_ms + prompt_tokens / args.prefill_tok_s * 1000, 1),
+        }
+        if client is not None:
+            turn.update(await measure_ttft(client, args.model, messages))
+        turns.append(turn)
+
+    for question, call in SCRIPT:
+        messages.append({"role": "user", "content": question})
+        await llm_turn()
+        result = await call()
+        tool_tokens.append(estimate_tokens(result))
+        messages.append({"role": "user", "content": f"Tool result: {result}"})
+        await llm_turn()
+        messages.append({"role": "assistant", "content": ANSWER})
+
+    return {
+        "tool_result_tokens": tool_tokens,
+        "final_prompt_tokens": turns[-1]["prompt_tokens"],
+        "mean_modeled_ttft_ms": round(sum(t["modeled_ttft_ms"] for t in turns) / len(turns), 1),
+        "turns": turns,
+    }
+
+
+async def check_detail_round_trip():
+    """Whatever compact output shortened must be retrievable in full."""
+    alerts = json.loads(await weather_mcp.get_alerts("CA"))
+    assert alerts["tokens"] <= weather_mcp.TOOL_TOKEN_BUDGET, alerts
+    fire = next(a for a in alerts["alerts"] if a["event"] == "Red Flag Warning")
+    detail = await weather_mcp.get_alert_detail(fire["id"])
+    assert "poor overnight recovery" in detail, detail
+
+    forecast = json.loads(await weather_mcp.get_forecast(34.0522, -118.2437))
+    assert forecast["tokens"] <= weather_mcp.TOOL_TOKEN_BUDGET and "unit" in forecast, forecast
+    period = json.loads(await weather_mcp.get_forecast_period(34.0522, -118.2437, 1))
+    assert period["name"] == forecast["periods"][1]["name"] and period["detailedForecast"], period
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubNWSServer(handshake_ms=0, response_ms=0)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, None, None)
+    weather_mcp.TOOL_TOKEN_BUDGET = args.budget
+    client = httpx.AsyncClient(base_url=args.endpoint, timeout=120.0) if args.endpoint else None
+    report: Dict[str, Any] = {"budget": args.budget}
+    try:
+        async with weather_mcp.nws_client.session():
+            for mode in ("full", "compact"):
+                weather_mcp.TOOL_OUTPUT = mode
+                report[mode] = await conversation(args, client)
+            await check_detail_round_trip()
+    finally:
+        if client is not None:
+            await client.aclose()
+        await stub.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=400, help="Token budget per tool call in compact mode")
+    parser.add_argument("--prefill-tok-s", type=float, default=8000.0, help="Modeled prefill throughput")
+    parser.add_argument("--ttft-base-ms", type=float, default=25.0, help="Modeled TTFT of an empty prompt")
+    parser.add_argument("--endpoint", default=None, help="OpenAI-compatible server to measure real TTFT against")
+    parser.add_argument("--model", default="meta-llama/Llama-3.1-8B-Instruct")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
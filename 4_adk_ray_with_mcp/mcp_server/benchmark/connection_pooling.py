@@ -0,0 +1,94 @@
+"""
+Compare a new httpx client per NWS request with the shared pooled client.
+
+Calls `get_forecast` (two NWS requests per call) against a local stub NWS
+server and reports tool latency and upstream connections opened per 1,000
+calls, first with the original per-request client and then with NWSClient.
+
+    python -m benchmark.connection_pooling --calls 1000 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from typing import Any, Dict, List
+
+import httpx
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher
+
+
+async def per_request_client(url: str) -> Dict[str, Any]:
+    """make_nws_request as it was: a new AsyncClient, and new connection, per request."""
+    headers = {"User-Agent": weather_mcp.USER_AGENT, "Accept": "application/geo+json"}
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, headers=headers, timeout=30.0)
+        response.raise_for_status()
+        return response.json()
+
+
+async def run(stub: StubNWSServer, calls: int, concurrency: int) -> Dict[str, Any]:
+    stub.reset_counters()
+    latencies: List[float] = []
+    remaining = iter(range(calls))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            result = await weather_mcp.get_forecast(47.6062, -122.3321)
+            latencies.append(time.perf_counter() - start)
+            assert "error" not in result, result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "calls_per_s": round(calls / elapsed, 1),
+        "latency_ms": {
+            "p50": round(statistics.median(latencies) * 1000, 2),
+            "p95": round(quantiles[94] * 1000, 2),
+            "p99": round(quantiles[98] * 1000, 2),
+        },
+        "connections_per_1k_calls": round(stub.connections_opened * 1000 / calls, 1),
+        "upstream_requests_per_1k_calls": round(stub.requests * 1000 / calls, 1),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    # Measure connection reuse alone, with every call going upstream.
+    weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, points=None, responses=None)
+    results = []
+    try:
+        pooled_request = weather_mcp.make_nws_request
+        weather_mcp.make_nws_request = per_request_client
+        results.append({"mode": "client-per-request", **await run(stub, args.calls, args.concurrency)})
+
+        weather_mcp.make_nws_request = pooled_request
+        async with weather_mcp.nws_client.session():
+            results.append({"mode": "pooled", **await run(stub, args.calls, args.concurrency)})
+    finally:
+        await stub.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="Simulated TCP+TLS setup per connection")
+    parser.add_argument("--response-ms", type=float, default=5.0, help="Simulated NWS processing per request")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
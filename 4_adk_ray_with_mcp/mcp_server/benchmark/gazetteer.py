@@ -0,0 +1,173 @@
+"""
+Measure gazetteer lookups and check that popular places' grids are precomputed.
+
+Runs `--queries` lookups split evenly between exact names (with and without
+their state), name prefixes, misspelled names and nearest-place searches at
+random locations near places, and reports the mean and p99 latency of each kind,
+how often misspellings still find the intended place, and the memory the
+loaded gazetteer takes. `--synthetic` pads the bundled places with that many
+generated ones to see how lookups scale to a Census-sized file.
+
+It then prewarms the grids of `--prewarm` places against a local stub NWS
+server and asserts that get_forecast_by_place for them sends no /points
+request.
+
+    python -m benchmark.gazetteer --queries 100000 --synthetic 30000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from typing import Any, Callable, Dict, List
+
+from gazetteer import EARTH_RADIUS_KM, Gazetteer
+
+PLACES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "us_places.tsv")
+CONSONANTS = "bcdfghklmnprstvw"
+VOWELS = "aeiouy"
+
+
+def load_rows(synthetic: int, rng: random.Random) -> List[tuple]:
+    base = Gazetteer.load(PLACES_PATH)
+    rows = [
+        (base.names[i], base.states[i], base.latitudes[i], base.longitudes[i], base.populations[i])
+        for i in range(len(base))
+    ]
+    for _ in range(synthetic):
+        name = "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 5))).title()
+        _, state, latitude, longitude, _ = rng.choice(rows[:len(base)])
+        rows.append((name, state, latitude + rng.uniform(-1, 1), longitude + rng.uniform(-1, 1), rng.randint(500, 20000)))
+    return rows
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(("drop", "swap", "double"))
+    if edit == "drop":
+        return name[:i] + name[i + 1:]
+    if edit == "swap":
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i] + name[i:]
+
+
+def haversine_km(a: tuple, b: tuple) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def timed(queries: List[Any], run: Callable[[Any], Any]) -> Dict[str, Any]:
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(run(query))
+        latencies.append(time.perf_counter() - start)
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "queries": len(queries),
+        "mean_us": round(statistics.mean(latencies) * 1e6, 2),
+        "p99_us": round(q[98] * 1e6, 2),
+        "results": results,
+    }
+
+
+def lookups(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    rows = load_rows(args.synthetic, rng)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    places = Gazetteer(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    per_kind = args.queries // 4
+    # Queries follow population, as real ones would: popular places are asked for most.
+    weights = [1 / (rank + 1) for rank in range(len(places))]
+    picks = rng.choices(range(len(places)), weights=weights, k=per_kind * 3)
+    exact = [places.names[p] if i % 2 else places.label(p) for i, p in enumerate(picks[:per_kind])]
+    prefix = [places.names[p][:max(3, len(places.names[p]) * 2 // 3)] for p in picks[per_kind:2 * per_kind]]
+    typo_targets = [p for p in picks[2 * per_kind:] if len(places.names[p]) >= 5]
+    typos = [misspell(places.names[p], rng) for p in typo_targets]
+    # Locations people ask about are near places, within half a degree of one here.
+    points = [
+        (places.latitudes[p] + rng.uniform(-0.5, 0.5), places.longitudes[p] + rng.uniform(-0.5, 0.5))
+        for p in rng.choices(range(len(places)), k=per_kind)
+    ]
+
+    report: Dict[str, Any] = {
+        "places": len(places),
+        "build_ms": round(build_ms, 1),
+        "memory_kib": round(memory_bytes / 1024, 1),
+    }
+    for kind, queries, run in (
+        ("exact", exact, places.lookup),
+        ("prefix", prefix, places.lookup),
+        ("fuzzy", typos, places.lookup),
+        ("nearest", points, lambda point: places.nearest(*point)),
+    ):
+        report[kind] = timed(queries, run)
+
+    found = report["exact"].pop("results")
+    assert all(found), "an exact name found nothing"
+    report["prefix"].pop("results")
+    fuzzy = report["fuzzy"].pop("results")
+    hits = sum(1 for target, matches in zip(typo_targets, fuzzy) if matches and places.names[matches[0]] == places.names[target])
+    report["fuzzy"]["found_intended_place"] = round(hits / len(typos), 3)
+    nearest = report["nearest"].pop("results")
+    # Brute force agrees with the KD-tree on a sample.
+    for point, (_, km) in list(zip(points, nearest))[:200]:
+        closest = min(haversine_km(point, (places.latitudes[p], places.longitudes[p])) for p in range(len(places)))
+        assert abs(km - closest) < 1e-6, (point, km, closest)
+    report["total_queries"] = sum(report[kind]["queries"] for kind in ("exact", "prefix", "fuzzy", "nearest"))
+    return report
+
+
+async def prewarm(count: int) -> Dict[str, Any]:
+    import weather_mcp
+    from benchmark.stub_nws import StubNWSServer
+
+    stub = StubNWSServer(handshake_ms=0, response_ms=5)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    try:
+        async with weather_mcp.nws_client.session():
+            start = time.perf_counter()
+            await weather_mcp.prewarm_grids(count)
+            prewarm_ms = (time.perf_counter() - start) * 1000
+            stub.reset_counters()
+            names = [weather_mcp.gazetteer.label(place) for place in range(count)]
+            start = time.perf_counter()
+            results = [json.loads(await weather_mcp.get_forecast_by_place(name)) for name in names]
+            call_ms = (time.perf_counter() - start) * 1000 / count
+    finally:
+        await stub.stop()
+    assert all("forecast" in r and r["place"] == name for r, name in zip(results, names)), results[:3]
+    points_requests = sum(n for path, n in stub.paths.items() if path.startswith("/points/"))
+    assert points_requests == 0, stub.paths
+    return {"places": count, "prewarm_ms": round(prewarm_ms, 1), "points_requests_after": points_requests, "mean_tool_call_ms": round(call_ms, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--synthetic", type=int, default=0, help="Generated places added to the bundled ones")
+    parser.add_argument("--prewarm", type=int, default=100, help="Places whose grids are prewarmed (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = {"lookups": lookups(args)}
+    if args.prewarm:
+        report["prewarm"] = asyncio.run(prewarm(args.prewarm))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
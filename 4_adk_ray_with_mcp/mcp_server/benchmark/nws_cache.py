@@ -0,0 +1,105 @@
+"""
+Measure the NWS caches against a local stub NWS server.
+
+Runs a mix of `get_forecast` and `get_alerts` calls over a handful of
+locations, first without caching, then with the points store and response
+cache, and then once more after a simulated restart (a fresh in-memory cache
+over the same points database). The stub serves forecasts and alerts with a
+short max-age plus ETags, so both fresh hits and 304 revalidations show up.
+
+    python -m benchmark.nws_cache --calls 1000 --max-age 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from typing import Any, Dict, List
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher, PointsStore, ResponseCache
+
+# Coordinates as an agent would produce them, more precise than NWS resolves.
+LOCATIONS = [
+    (47.606209, -122.332069),
+    (40.712776, -74.005974),
+    (34.052235, -118.243683),
+    (41.878113, -87.629799),
+    (29.760427, -95.369804),
+    (39.739235, -104.990250),
+]
+STATES = ["WA", "NY", "CA", "IL", "TX", "CO"]
+
+
+async def run(stub: StubNWSServer, calls: int, concurrency: int, think_ms: float, seed: int) -> Dict[str, Any]:
+    stub.reset_counters()
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    remaining = iter(range(calls))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            if rng.random() < 0.7:
+                result = await weather_mcp.get_forecast(*rng.choice(LOCATIONS))
+                assert "error" not in result, result
+            else:
+                await weather_mcp.get_alerts(rng.choice(STATES))
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(think_ms / 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "latency_ms": {
+            "p50": round(statistics.median(latencies) * 1000, 2),
+            "p99": round(statistics.quantiles(latencies, n=100)[98] * 1000, 2),
+        },
+        "upstream_requests_per_1k_calls": round(stub.requests * 1000 / calls, 1),
+        "upstream_304s": stub.not_modified,
+        "upstream_body_bytes": stub.bytes_sent,
+        "cache": weather_mcp.nws_fetcher.stats(),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms, forecast_max_age_s=args.max_age)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    points_path = os.path.join(tempfile.mkdtemp(), "nws_points.sqlite3")
+
+    def fetcher(cached: bool) -> CachingNWSFetcher:
+        if not cached:
+            return CachingNWSFetcher(weather_mcp.nws_client, None, None)
+        return CachingNWSFetcher(weather_mcp.nws_client, PointsStore(points_path), ResponseCache())
+
+    results = []
+    try:
+        async with weather_mcp.nws_client.session():
+            for mode, cached in (("uncached", False), ("cached", True), ("cached-after-restart", True)):
+                weather_mcp.nws_fetcher = fetcher(cached)
+                results.append({"mode": mode, **await run(stub, args.calls, args.concurrency, args.think_ms, args.seed)})
+    finally:
+        await stub.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-age", type=int, default=1, help="max-age the stub sends on forecasts and alerts")
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--response-ms", type=float, default=20.0)
+    parser.add_argument("--think-ms", type=float, default=20.0, help="Pause between one worker's calls")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Check the resilience layer around NWS calls against a fault-injecting stub.
+
+Each scenario asserts one behavior and reports what it measured:
+
+- retries: transient 503s are retried and the tool call still succeeds
+- backoff: retry delays grow exponentially, are jittered and honour Retry-After
+- timeouts: a hung NWS edge costs at most the call deadline, not the 30s client timeout
+- circuit_breaker: an outage opens the circuit, calls then fail fast or get the
+  stale cached answer without touching NWS, and a probe closes it again
+- hedging: with 2% of responses slow, hedged requests cut p99 tool latency
+
+    python -m benchmark.resilience
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from typing import Any, Dict, List
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher, ResponseCache
+from resilience import ResilientNWSClient, RetryPolicy
+
+SEATTLE = (47.6062, -122.3321)
+FAST_RETRIES = RetryPolicy(max_attempts=3, base_delay_s=0.01, max_delay_s=0.05)
+
+
+def use(upstream, responses=None) -> CachingNWSFetcher:
+    weather_mcp.nws_fetcher = CachingNWSFetcher(upstream, None, responses)
+    return weather_mcp.nws_fetcher
+
+
+async def retries(stub: StubNWSServer) -> Dict[str, Any]:
+    use(weather_mcp.nws_client)
+    stub.fail_next = 1
+    without = json.loads(await weather_mcp.get_forecast(*SEATTLE))
+    assert "error" in without, without
+
+    upstream = ResilientNWSClient(weather_mcp.nws_client, retry=FAST_RETRIES)
+    use(upstream)
+    stub.reset_counters()
+    stub.fail_next = 2
+    with_retries = json.loads(await weather_mcp.get_forecast(*SEATTLE))
+    assert isinstance(with_retries, list), with_retries
+    assert stub.errors_injected == 2
+    return {"injected_503s": 2, "succeeded": True, "upstream": upstream.stats()}
+
+
+async def backoff(stub: StubNWSServer) -> Dict[str, Any]:
+    policy = RetryPolicy(max_attempts=5, base_delay_s=0.1, max_delay_s=1.0)
+    delays = {retry: [policy.delay(retry) for _ in range(2000)] for retry in range(5)}
+    for retry, samples in delays.items():
+        cap = min(policy.max_delay_s, policy.base_delay_s * 2 ** retry)
+        assert all(0 <= d <= cap for d in samples), retry
+        assert statistics.pstdev(samples) > cap / 5, "delays are not jittered"
+    assert policy.delay(0, retry_after="0.7") == 0.7 and policy.delay(0, retry_after="30") == 1.0
+    return {f"retry_{retry}_mean_s": round(statistics.mean(samples), 3) for retry, samples in delays.items()}
+
+
+async def timeouts(stub: StubNWSServer) -> Dict[str, Any]:
+    use(ResilientNWSClient(weather_mcp.nws_client, retry=FAST_RETRIES, attempt_timeout_s=0.2, deadline_s=0.5))
+    stub.slow_rate, stub.slow_ms = 1.0, 3000
+    start = time.perf_counter()
+    result = json.loads(await weather_mcp.get_forecast(*SEATTLE))
+    elapsed = time.perf_counter() - start
+    stub.slow_rate = 0.0
+    assert "error" in result and elapsed < 0.8, (result, elapsed)
+    return {"hung_edge_ms": stub.slow_ms, "tool_call_ms": round(elapsed * 1000, 1), "deadline_ms": 500}
+
+
+async def circuit_breaker(stub: StubNWSServer) -> Dict[str, Any]:
+    upstream = ResilientNWSClient(weather_mcp.nws_client, retry=FAST_RETRIES, failure_threshold=3, reset_timeout_s=0.5)
+    fetcher = use(upstream, ResponseCache())
+    healthy = await weather_mcp.get_alerts("CA")
+
+    stub.outage = True
+    for _ in range(3):
+        assert await weather_mcp.get_alerts("CA") == healthy, "stale alerts not served during the outage"
+    endpoint = f"127.0.0.1:{stub.port}/alerts"
+    assert upstream.stats()[endpoint]["circuit"] == "open", upstream.stats()
+
+    stub.reset_counters()
+    start = time.perf_counter()
+    stale = await weather_mcp.get_alerts("CA")
+    uncached = await weather_mcp.get_alerts("NY")
+    open_ms = (time.perf_counter() - start) * 1000
+    assert stale == healthy and "Unable to fetch alerts" in uncached, uncached
+    assert stub.requests == 0, "an open circuit still sent requests"
+
+    stub.outage = False
+    await asyncio.sleep(upstream.reset_timeout_s)
+    assert "Wind Advisory" in await weather_mcp.get_alerts("NY")
+    assert upstream.stats()[endpoint]["circuit"] == "closed", upstream.stats()
+    return {
+        "two_calls_while_open_ms": round(open_ms, 2),
+        "stale_served": fetcher.responses.stats.stale_served,
+        "upstream": upstream.stats()[endpoint],
+    }
+
+
+async def latencies(calls: int, concurrency: int) -> List[float]:
+    slots = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+
+    async def call(i: int):
+        async with slots:
+            start = time.perf_counter()
+            # Distinct points so every call goes upstream twice (points, then forecast).
+            result = json.loads(await weather_mcp.get_forecast(40 + i / 1000, -100.0))
+            samples.append(time.perf_counter() - start)
+            assert isinstance(result, list), result
+
+    await asyncio.gather(*(call(i) for i in range(calls)))
+    return samples
+
+
+def summary(samples: List[float]) -> Dict[str, float]:
+    q = statistics.quantiles(samples, n=100)
+    return {"p50_ms": round(q[49] * 1000, 1), "p95_ms": round(q[94] * 1000, 1), "p99_ms": round(q[98] * 1000, 1)}
+
+
+async def hedging(stub: StubNWSServer, args: argparse.Namespace) -> Dict[str, Any]:
+    stub.slow_rate, stub.slow_ms = args.slow_rate, args.slow_ms
+    report = {}
+    for hedge in (False, True):
+        upstream = ResilientNWSClient(weather_mcp.nws_client, retry=FAST_RETRIES, hedge=hedge)
+        use(upstream)
+        await latencies(300, args.concurrency)  # warm the latency windows (hedging needs 20 samples) and the pool
+        stub.reset_counters()
+        samples = await latencies(args.calls, args.concurrency)
+        report["hedged" if hedge else "plain"] = {
+            **summary(samples),
+            "upstream_requests_per_call": round(stub.requests / args.calls, 3),
+            "hedges": sum(e["hedges"] for e in upstream.stats().values()),
+            "hedge_wins": sum(e["hedge_wins"] for e in upstream.stats().values()),
+        }
+    stub.slow_rate = 0.0
+    assert report["hedged"]["p99_ms"] < report["plain"]["p99_ms"] / 2, report
+    return report
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    report: Dict[str, Any] = {}
+    try:
+        async with weather_mcp.nws_client.session():
+            report["retries"] = await retries(stub)
+            report["backoff"] = await backoff(stub)
+            report["timeouts"] = await timeouts(stub)
+            report["circuit_breaker"] = await circuit_breaker(stub)
+            report["hedging"] = await hedging(stub, args)
+    finally:
+        await stub.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Share of NWS responses that are slow")
+    parser.add_argument("--slow-ms", type=float, default=500.0)
+    parser.add_argument("--handshake-ms", type=float, default=5.0)
+    parser.add_argument("--response-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
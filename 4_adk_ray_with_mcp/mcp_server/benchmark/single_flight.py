@@ -0,0 +1,89 @@
+"""
+Check that concurrent identical tool calls share one upstream NWS request.
+
+Fires `--callers` concurrent `get_alerts("CA")` calls at a stub NWS server,
+with and without the response cache, and checks that exactly one upstream
+request is made. Then repeats the burst while cancelling every other caller
+mid-flight, which must not fail the remaining callers, and finally cancels all
+callers, which must cancel the upstream request so the next call starts afresh.
+
+    python -m benchmark.single_flight --callers 500
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from typing import Any, Dict, List
+
+import weather_mcp
+from benchmark.stub_nws import StubNWSServer
+from nws_cache import CachingNWSFetcher, ResponseCache
+
+ALERTS_PATH = "/alerts/active/area/CA"
+
+
+async def burst(stub: StubNWSServer, callers: int, cancel_every: int = 0) -> Dict[str, Any]:
+    stub.reset_counters()
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(weather_mcp.get_alerts("CA")) for _ in range(callers)]
+    if cancel_every:
+        await asyncio.sleep(stub.response_ms / 2000)
+        for task in tasks[::cancel_every]:
+            task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    cancelled = sum(isinstance(r, asyncio.CancelledError) for r in results)
+    answered = [r for r in results if isinstance(r, str)]
+    assert all("Wind Advisory" in r for r in answered), answered[:1]
+    assert len(answered) + cancelled == callers, results[:3]
+    return {
+        "callers": callers,
+        "cancelled": cancelled,
+        "answered": len(answered),
+        "upstream_requests": stub.paths.get(ALERTS_PATH, 0),
+        "elapsed_ms": round(elapsed * 1000, 2),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms)
+    await stub.start()
+    weather_mcp.NWS_API_BASE = stub.base_url
+    results = []
+    try:
+        async with weather_mcp.nws_client.session():
+            for mode, responses in (("uncached", None), ("cached", ResponseCache())):
+                weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, None, responses)
+                result = await burst(stub, args.callers)
+                assert result["upstream_requests"] == 1, result
+                results.append({"mode": mode, **result})
+
+            weather_mcp.nws_fetcher = CachingNWSFetcher(weather_mcp.nws_client, None, None)
+            result = await burst(stub, args.callers, cancel_every=2)
+            assert result["upstream_requests"] == 1 and result["answered"] == args.callers // 2, result
+            results.append({"mode": "half-cancelled", **result})
+
+            result = await burst(stub, args.callers, cancel_every=1)
+            assert result["answered"] == 0, result
+            assert weather_mcp.nws_fetcher.in_flight.in_flight == 0, "cancelled call still in flight"
+            follow_up = await weather_mcp.get_alerts("CA")
+            assert "Wind Advisory" in follow_up
+            results.append({"mode": "all-cancelled-then-retry", **result, **weather_mcp.nws_fetcher.stats()})
+    finally:
+        await stub.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--response-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Local stand-in for api.weather.gov, served over plain HTTP/1.1 with keep-alive.
+
+Only the endpoints weather_mcp uses are implemented. Every new connection is
+delayed by `handshake_ms` to stand in for the TCP and TLS handshakes a real
+HTTPS connection to NWS costs, and connections and requests are counted.
+The national `/alerts/active` feed is backed by alerts a test adds and
+removes between polls; its ETag changes whenever that set does.
+
+Faults can be injected: the next `fail_next` requests, a random `error_rate`
+share of them or all of them during an `outage` are answered with
+`error_status`, and a random `slow_rate` share is delayed by `slow_ms`.
+"""
+import asyncio
+import json
+import random
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+PERIOD_NAMES = ["Today", "Tonight", "Saturday", "Saturday Night", "Sunday", "Sunday Night", "Monday"]
+
+WIND_DESCRIPTION = (
+    "* WHAT...Southwest winds 25 to 35 mph with gusts up to 50 mph expected. "
+    "* WHERE...Coastal areas and the adjacent valleys, including the major highway passes. "
+    "* WHEN...From 11 AM this morning to 5 AM PDT Saturday. "
+    "* IMPACTS...Gusty winds will blow around unsecured objects. Tree limbs could be blown down "
+    "and a few power outages may result. Travel will be difficult for high profile vehicles."
+)
+FIRE_DESCRIPTION = (
+    "The National Weather Service has issued a Red Flag Warning for wind and low relative humidity, "
+    "which is in effect from noon today to 8 PM PDT this evening. "
+    "* AFFECTED AREA...Fire weather zones in the interior valleys and foothills. "
+    "* WIND...North to northeast 15 to 25 mph with gusts to 45 mph, locally higher over ridges. "
+    "* HUMIDITY...As low as 8 percent during the afternoon, with poor overnight recovery. "
+    "* IMPACTS...Any fires that develop will likely spread rapidly. Outdoor burning is not recommended."
+)
+
+
+class StubNWSServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        handshake_ms: float = 30.0,
+        response_ms: float = 5.0,
+        forecast_max_age_s: int = 0,
+        seed: int = 0,
+    ):
+        self.host = host
+        self.port = port
+        self.handshake_ms = handshake_ms
+        self.response_ms = response_ms
+        self.forecast_max_age_s = forecast_max_age_s
+        self.connections_opened = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.paths: Dict[str, int] = {}
+        self.feed: Dict[str, Dict[str, Any]] = {}
+        self.feed_version = 0
+        self.fail_next = 0
+        self.error_rate = 0.0
+        self.error_status = 503
+        self.outage = False
+        self.slow_rate = 0.0
+        self.slow_ms = 0.0
+        self.errors_injected = 0
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def add_alert(
+        self,
+        alert_id: str,
+        zones: List[str],
+        event: str = "Wind Advisory",
+        severity: str = "Moderate",
+        expires_in_s: float = 3600.0,
+    ):
+        now = datetime.now(timezone.utc)
+        self.feed[alert_id] = {
+            "id": f"https://api.weather.gov/alerts/{alert_id}",
+            "properties": {
+                "id": alert_id,
+                "event": event,
+                "areaDesc": "; ".join(zones),
+                "geocode": {"UGC": zones},
+                "severity": severity,
+                "sent": now.isoformat(),
+                "expires": (now + timedelta(seconds=expires_in_s)).isoformat(),
+                "description": f"{event} in effect.",
+                "instruction": "Monitor local news.",
+            },
+        }
+        self.feed_version += 1
+
+    def remove_alert(self, alert_id: str):
+        del self.feed[alert_id]
+        self.feed_version += 1
+
+    def reset_counters(self):
+        self.connections_opened = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.paths = {}
+        self.errors_injected = 0
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections_opened += 1
+        await asyncio.sleep(self.handshake_ms / 1000)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                self.paths[path] = self.paths.get(path, 0) + 1
+                await asyncio.sleep(self.response_ms / 1000)
+                if self.slow_rate and self._random.random() < self.slow_rate:
+                    await asyncio.sleep(self.slow_ms / 1000)
+                if self._inject_error():
+                    status, body, extra_headers = f"{self.error_status} Injected", {"title": "Injected fault"}, {}
+                else:
+                    status, body, extra_headers = self.respond(path, headers)
+                etag = extra_headers.get("ETag")
+                if etag is not None and headers.get("if-none-match") == etag:
+                    status, body = "304 Not Modified", None
+                    self.not_modified += 1
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.bytes_sent += len(payload)
+                head = [f"HTTP/1.1 {status}", "Content-Type: application/geo+json", f"Content-Length: {len(payload)}"]
+                head.extend(f"{k}: {v}" for k, v in extra_headers.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Still sleeping on a response the client gave up on when the loop shut down.
+            pass
+        finally:
+            writer.close()
+
+    def _inject_error(self) -> bool:
+        if self.fail_next > 0:
+            self.fail_next -= 1
+        elif not self.outage and not (self.error_rate and self._random.random() < self.error_rate):
+            return False
+        self.errors_injected += 1
+        return True
+
+    def respond(self, path: str, headers: Dict[str, str]) -> Tuple[str, Any, Dict[str, str]]:
+        if path.startswith("/points/"):
+            latitude = float(path[len("/points/"):].split(",")[0])
+            if not -90 <= latitude <= 75:
+                # Like NWS for points outside its coverage.
+                return "404 Not Found", {"title": "Data Unavailable For Requested Point"}, {}
+            return "200 OK", {
+                "properties": {
+                    "gridId": "SEW",
+                    "gridX": 124,
+                    "gridY": 67,
+                    "forecast": f"{self.base_url}/gridpoints/SEW/124,67/forecast",
+                },
+            }, {}
+        if path.startswith("/gridpoints/"):
+            periods = [
+                {
+                    "number": i + 1,
+                    "name": PERIOD_NAMES[i % len(PERIOD_NAMES)],
+                    "temperature": 60 + i,
+                    "temperatureUnit": "F",
+                    "windSpeed": "5 to 10 mph",
+                    "windDirection": "SW",
+                    "icon": "https://api.weather.gov/icons/land/day/few?size=medium",
+                    "shortForecast": "Mostly Sunny",
+                    "detailedForecast": (
+                        f"Mostly sunny, with a high near {60 + i}. Patchy fog before 9am, then clearing "
+                        "from the coast inland through the late morning. Southwest wind 5 to 10 mph, "
+                        "with gusts as high as 20 mph in the afternoon. Chance of precipitation is 10%."
+                    ),
+                }
+                for i in range(14)
+            ]
+            return "200 OK", {"properties": {"periods": periods}}, self._cache_headers(path)
+        if path.split("?")[0] == "/alerts/active":
+            return "200 OK", {"type": "FeatureCollection", "features": list(self.feed.values())}, {
+                "Cache-Control": f"public, max-age={self.forecast_max_age_s}",
+                "ETag": f'"feed-{self.feed_version}"',
+            }
+        if path.startswith("/alerts/active/area/"):
+            state = path.rsplit("/", 1)[-1]
+            return "200 OK", {"features": self._area_alerts(state)}, self._cache_headers(path)
+        if path.startswith("/alerts/"):
+            alert_id = path[len("/alerts/"):]
+            state = alert_id.split("-")[1] if alert_id.startswith("area-") else ""
+            for feature in list(self.feed.values()) + self._area_alerts(state):
+                if feature["properties"]["id"] == alert_id:
+                    return "200 OK", feature, self._cache_headers(path)
+        return "404 Not Found", {"detail": "Not Found"}, {}
+
+    def _area_alerts(self, state: str) -> List[Dict[str, Any]]:
+        # Like NWS, the same advisory is issued once per zone group with identical text.
+        alerts = [
+            ("Wind Advisory", "Moderate", f"Coastal areas of {state}", WIND_DESCRIPTION,
+             "Use extra caution when driving, especially if operating a high profile vehicle. Secure outdoor objects."),
+            ("Wind Advisory", "Moderate", f"Northern valleys of {state}", WIND_DESCRIPTION,
+             "Use extra caution when driving, especially if operating a high profile vehicle. Secure outdoor objects."),
+            ("Wind Advisory", "Moderate", f"Southern mountains of {state}", WIND_DESCRIPTION,
+             "Use extra caution when driving, especially if operating a high profile vehicle. Secure outdoor objects."),
+            ("Red Flag Warning", "Severe", f"Interior valleys and foothills of {state}", FIRE_DESCRIPTION,
+             "A Red Flag Warning means that critical fire weather conditions are either occurring now or will "
+             "shortly. A combination of strong winds, low relative humidity, and warm temperatures can "
+             "contribute to extreme fire behavior."),
+        ]
+        return [
+            {
+                "id": f"https://api.weather.gov/alerts/area-{state}-{i}",
+                "properties": {
+                    "id": f"area-{state}-{i}",
+                    "event": event,
+                    "areaDesc": area,
+                    "severity": severity,
+                    "description": description,
+                    "instruction": instruction,
+                },
+            }
+            for i, (event, severity, area, description, instruction) in enumerate(alerts)
+        ]
+
+    def _cache_headers(self, path: str) -> Dict[str, str]:
+        # NWS sends short max-age values plus validators on forecasts and alerts.
+        return {
+            "Cache-Control": f"public, max-age={self.forecast_max_age_s}",
+            "ETag": f'"{abs(hash(path)):x}"',
+            "Last-Modified": "Fri, 17 Oct 2025 12:00:00 GMT",
+        }
@@ -0,0 +1,186 @@
+"""
+Load-test the stateless streamable-HTTP server with 1, 2 and 4 worker processes.
+
+For every worker count the server is started as it is deployed (`python
+weather_mcp.py` with MCP_TRANSPORT=streamable-http and MCP_WORKERS) against a
+local stub NWS server, and `--client-procs` load-generating processes keep
+`--concurrency` `tools/call` requests each in flight for `--duration` seconds.
+Forecasts for `--cities` locations are cached in the workers' shared SQLite
+store, so after warm-up the server rather than NWS is what is measured.
+
+Tool calls per second can only grow with workers up to the number of cores
+the server and the load generators share.
+
+    python -m benchmark.workers --workers 1 2 4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from benchmark.stub_nws import StubNWSServer
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def tool_call(request_id: int, cities: int) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {
+            "name": "get_forecast",
+            "arguments": {"latitude": 40 + (request_id % cities) / 10, "longitude": -100.0},
+        },
+    }
+
+
+def parse_result(response: httpx.Response) -> Dict[str, Any]:
+    """The JSON-RPC response, whether it came as JSON or as a one-event SSE stream."""
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return response.json()
+    for line in response.text.splitlines():
+        if line.startswith("data: "):
+            return json.loads(line[len("data: "):])
+    raise ValueError(f"No JSON-RPC message in response: {response.text[:200]}")
+
+
+async def generate_load(url: str, concurrency: int, duration_s: float, cities: int, seed: int) -> Tuple[int, int, List[float]]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration_s
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+
+        async def loop(worker: int):
+            nonlocal errors
+            request_id = seed * 1_000_000 + worker * 10_000
+            while time.perf_counter() < deadline:
+                request_id += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=tool_call(request_id, cities), headers=HEADERS)
+                    result = parse_result(response)
+                    if "error" in result or result["result"].get("isError"):
+                        errors += 1
+                        continue
+                except (httpx.HTTPError, ValueError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(loop(i) for i in range(concurrency)))
+    return len(latencies), errors, latencies
+
+
+def client_process(args: Tuple[str, int, float, int, int]) -> Tuple[int, int, List[float]]:
+    return asyncio.run(generate_load(*args))
+
+
+async def wait_ready(base_url: str, process: subprocess.Popen, timeout_s: float = 30.0):
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with {process.returncode}")
+            try:
+                if (await client.get(f"{base_url}/-/cache")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Server did not become ready")
+
+
+async def run_workers(stub: StubNWSServer, workers: int, args: argparse.Namespace, cache_dir: str) -> Dict[str, Any]:
+    port = free_port()
+    env = {
+        **os.environ,
+        "MCP_TRANSPORT": "streamable-http",
+        "MCP_WORKERS": str(workers),
+        "MCP_SERVER_HOST": "127.0.0.1",
+        "MCP_SERVER_PORT": str(port),
+        "NWS_API_BASE": stub.base_url,
+        "NWS_POINTS_CACHE_PATH": os.path.join(cache_dir, f"points-{workers}.sqlite3"),
+        "NWS_SHARED_CACHE_PATH": os.path.join(cache_dir, f"responses-{workers}.sqlite3"),
+        "NWS_GAZETTEER_PREWARM": "0",
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen([sys.executable, "weather_mcp.py"], cwd=SERVER_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_ready(base_url, process)
+        url = f"{base_url}/mcp/"
+        loop = asyncio.get_running_loop()
+        # Warm up: every city once, so the measured calls hit the shared cache.
+        async with httpx.AsyncClient() as client:
+            for request_id in range(args.cities):
+                parse_result(await client.post(url, json=tool_call(request_id, args.cities), headers=HEADERS))
+
+        stub.reset_counters()
+        jobs = [(url, args.concurrency, args.duration, args.cities, i + 1) for i in range(args.client_procs)]
+        with multiprocessing.Pool(args.client_procs) as pool:
+            results = await loop.run_in_executor(None, pool.map, client_process, jobs)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    calls = sum(r[0] for r in results)
+    latencies = sorted(l for r in results for l in r[2])
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "workers": workers,
+        "tool_calls_per_s": round(calls / args.duration, 1),
+        "errors": sum(r[1] for r in results),
+        "p50_ms": round(q[49] * 1000, 1),
+        "p99_ms": round(q[98] * 1000, 1),
+        "nws_requests": stub.requests,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubNWSServer(handshake_ms=args.handshake_ms, response_ms=args.response_ms, forecast_max_age_s=3600)
+    await stub.start()
+    report: Dict[str, Any] = {"cpu_count": os.cpu_count(), "runs": []}
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for workers in args.workers:
+                report["runs"].append(await run_workers(stub, workers, args, cache_dir))
+    finally:
+        await stub.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--client-procs", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight per load-generating process")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--response-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
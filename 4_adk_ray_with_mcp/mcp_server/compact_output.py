@@ -0,0 +1,127 @@
+import json
+
+from typing import Any, Dict, List, Optional
+
+# Llama tokenizers average about four characters per token on English and JSON.
+CHARS_PER_TOKEN = 4
+
+# Text field limits tried in turn until a result fits its token budget.
+_TEXT_LIMITS = (240, 120, 60, 0)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate(text: Optional[str], limit: int) -> Optional[str]:
+    """Cut text at a word boundary before `limit` characters, marking the cut with an ellipsis."""
+    if not text:
+        return text
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0] if limit > 0 else ""
+    return f"{cut}..."
+
+
+def _fit(build, count: int, budget: int) -> Dict[str, Any]:
+    """Largest rendering within `budget`: shorten text fields first, then drop trailing items."""
+    for limit in _TEXT_LIMITS:
+        result = build(limit, count)
+        if estimate_tokens(json.dumps(result)) <= budget:
+            break
+    while count > 1 and estimate_tokens(json.dumps(result)) > budget:
+        count -= 1
+        result = build(_TEXT_LIMITS[-1], count)
+    result["tokens"] = 0
+    result["tokens"] = estimate_tokens(json.dumps(result))
+    return result
+
+
+def compact_forecast(periods: List[Dict[str, Any]], budget: int) -> Dict[str, Any]:
+    """
+    Forecast periods as compact JSON within a token budget.
+
+    Fields all periods share (usually the unit, often wind) are stated once,
+    icons are dropped and detailed forecasts are truncated, or dropped when
+    still over budget; `get_forecast_period` returns a period in full.
+    """
+    def build(limit: int, count: int) -> Dict[str, Any]:
+        out = []
+        truncated = False
+        for period in periods[:count]:
+            item = {"name": period.get("name"), "temp": period.get("temperature"), "unit": period.get("temperatureUnit")}
+            wind = " ".join(filter(None, [period.get("windDirection"), period.get("windSpeed")]))
+            if wind:
+                item["wind"] = wind
+            item["sky"] = period.get("shortForecast")
+            detail = period.get("detailedForecast")
+            if detail and limit > 0:
+                item["detail"] = truncate(detail, limit)
+            truncated = truncated or " ".join((detail or "").split()) != (item.get("detail") or "")
+            out.append(item)
+
+        # Fields every period shares are stated once.
+        shared = {
+            key: value for key, value in out[0].items()
+            if key not in ("name", "detail") and all(item.get(key) == value for item in out[1:])
+        } if len(out) > 1 else {}
+        result: Dict[str, Any] = {
+            **shared,
+            "periods": [{k: v for k, v in item.items() if k not in shared} for item in out],
+        }
+        if count < len(periods):
+            result["omitted_periods"] = len(periods) - count
+        if truncated:
+            result["more"] = "get_forecast_period(latitude, longitude, index) returns a period in full"
+        return result
+
+    return _fit(build, len(periods), budget)
+
+
+def compact_alerts(features: List[Dict[str, Any]], budget: int, as_of: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Alerts as compact JSON within a token budget.
+
+    Alerts that only differ by area (NWS issues one per zone group) are merged,
+    long text is truncated and `get_alert_detail(alert_id)` returns an alert in full.
+    """
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for feature in features:
+        props = feature["properties"]
+        key = (props.get("event"), props.get("severity"), props.get("description"), props.get("instruction"))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {"ids": [props.get("id") or feature.get("id")], "areas": [props.get("areaDesc")], "props": props}
+        else:
+            group["ids"].append(props.get("id") or feature.get("id"))
+            group["areas"].append(props.get("areaDesc"))
+    merged = list(groups.values())
+
+    def build(limit: int, count: int) -> Dict[str, Any]:
+        out = []
+        truncated = False
+        for group in merged[:count]:
+            props = group["props"]
+            item = {
+                "id": group["ids"][0] if len(group["ids"]) == 1 else group["ids"],
+                "event": props.get("event"),
+                "severity": props.get("severity"),
+                "area": truncate("; ".join(filter(None, group["areas"])), max(limit, 60)),
+            }
+            for field in ("description", "instruction"):
+                text = props.get(field)
+                if text and limit > 0:
+                    item[field] = truncate(text, limit)
+                truncated = truncated or (" ".join((text or "").split()) != (item.get(field) or ""))
+            out.append(item)
+        result: Dict[str, Any] = {"alerts": out}
+        if as_of:
+            result["as_of"] = as_of
+        if count < len(merged):
+            result["omitted_alerts"] = len(merged) - count
+        if truncated:
+            result["more"] = "get_alert_detail(alert_id) returns an alert in full"
+        return result
+
+    return _fit(build, len(merged), budget)
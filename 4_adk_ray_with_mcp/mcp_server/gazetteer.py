@@ -0,0 +1,198 @@
+import csv
+import math
+import re
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+STATE_NAMES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+STATE_CODES = set(STATE_NAMES.values())
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, without punctuation, with "saint" / "st." spelled "st" and single spaces."""
+    words = _PUNCTUATION.sub(" ", name.lower()).split()
+    return " ".join("st" if word == "saint" else word for word in words)
+
+
+def split_state(query: str) -> Tuple[str, Optional[str]]:
+    """Separate a trailing state ("Portland, OR", "portland oregon") from a normalized place query."""
+    words = normalize_name(query).split()
+    for size in (3, 2, 1):
+        if len(words) > size:
+            tail = " ".join(words[-size:])
+            state = STATE_NAMES.get(tail) or (tail.upper() if size == 1 and tail.upper() in STATE_CODES else None)
+            if state:
+                return " ".join(words[:-size]), state
+    return " ".join(words), None
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+class Gazetteer:
+    """
+    US places in flat arrays, with a name index and a KD-tree over their locations.
+
+    Places are ordered by population, so a lower place id means a more popular
+    place and ties between matches go to it. Names are looked up exactly, then
+    by prefix (both by bisecting one sorted key list) and finally by trigram
+    similarity for misspellings. The KD-tree is implicit: an array of place
+    ids in which each range's middle element splits it on the axis of the
+    places' unit vectors they spread along most, so chord distance orders neighbours like
+    great-circle distance does.
+    """
+
+    def __init__(self, rows: List[Tuple[str, str, float, float, int]]):
+        rows = sorted(rows, key=lambda row: -row[4])
+        self.names = [row[0] for row in rows]
+        self.states = [row[1] for row in rows]
+        self.latitudes = array("d", (row[2] for row in rows))
+        self.longitudes = array("d", (row[3] for row in rows))
+        self.populations = array("q", (row[4] for row in rows))
+
+        keyed = sorted((normalize_name(name), place) for place, name in enumerate(self.names))
+        self._keys = [key for key, _ in keyed]
+        self._key_places = array("l", (place for _, place in keyed))
+
+        postings: Dict[str, List[int]] = {}
+        self._trigram_counts = array("H")
+        for place, name in enumerate(self.names):
+            grams = _trigrams(normalize_name(name))
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(place)
+        self._trigrams = {gram: array("l", places) for gram, places in postings.items()}
+
+        self._xyz = [array("d"), array("d"), array("d")]
+        for latitude, longitude in zip(self.latitudes, self.longitudes):
+            for axis, value in zip(self._xyz, _unit_vector(latitude, longitude)):
+                axis.append(value)
+        self._tree = array("l", range(len(rows)))
+        self._axes = array("b", bytes(len(rows)))
+        self._build(0, len(rows))
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        """Read a TSV with name, state, latitude, longitude and population columns."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls([
+                (row["name"], row["state"], float(row["latitude"]), float(row["longitude"]), int(row["population"]))
+                for row in csv.DictReader(f, delimiter="\t")
+            ])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def label(self, place: int) -> str:
+        return f"{self.names[place]}, {self.states[place]}"
+
+    def lookup(self, query: str, limit: int = 5) -> List[int]:
+        """Places matching `query`, best first; a trailing state restricts the matches to it."""
+        key, state = split_state(query)
+        if not key:
+            return []
+        for candidates in (self._exact(key), self._prefix(key)):
+            matches = [place for place in candidates if state is None or self.states[place] == state]
+            if matches:
+                return sorted(matches)[:limit]
+        return self._fuzzy(key, state, limit)
+
+    def _exact(self, key: str) -> List[int]:
+        i = bisect_left(self._keys, key)
+        places = []
+        while i < len(self._keys) and self._keys[i] == key:
+            places.append(self._key_places[i])
+            i += 1
+        return places
+
+    def _prefix(self, key: str) -> List[int]:
+        if len(key) < 3:
+            return []
+        start = bisect_left(self._keys, key)
+        end = bisect_left(self._keys, key + "￿", start)
+        return list(self._key_places[start:end])
+
+    def _fuzzy(self, key: str, state: Optional[str], limit: int, min_similarity: float = 0.45) -> List[int]:
+        grams = _trigrams(key)
+        shared = Counter(chain.from_iterable(self._trigrams.get(gram, ()) for gram in grams))
+        # Dice similarity 2c / (a + b) with b >= c can only reach min_similarity from this many shared trigrams.
+        needed = min_similarity * len(grams) / (2 - min_similarity)
+        scored = []
+        for place, common in shared.items():
+            if common < needed:
+                continue
+            similarity = 2 * common / (len(grams) + self._trigram_counts[place])
+            if similarity >= min_similarity and (state is None or self.states[place] == state):
+                scored.append((-similarity, place))
+        return [place for _, place in sorted(scored)[:limit]]
+
+    def _build(self, lo: int, hi: int):
+        if hi - lo <= 1:
+            return
+        places = self._tree[lo:hi]
+        # Split on the axis the places spread along most, so the cells stay compact.
+        spreads = [max(map(coords.__getitem__, places)) - min(map(coords.__getitem__, places)) for coords in self._xyz]
+        axis = spreads.index(max(spreads))
+        self._tree[lo:hi] = array("l", sorted(places, key=self._xyz[axis].__getitem__))
+        mid = (lo + hi) // 2
+        self._axes[mid] = axis
+        self._build(lo, mid)
+        self._build(mid + 1, hi)
+
+    def nearest(self, latitude: float, longitude: float, max_km: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        """The place closest to a location and its distance in km, if within `max_km`."""
+        if not self.names:
+            return None
+        target = _unit_vector(latitude, longitude)
+        best = [-1, 4.0 if max_km is None else (2 * math.sin(min(max_km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2]
+        self._search(0, len(self.names), target, best)
+        if best[0] < 0:
+            return None
+        return best[0], 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(best[1]) / 2, 1.0))
+
+    def _search(self, lo: int, hi: int, target: Tuple[float, float, float], best: list):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        place = self._tree[mid]
+        xs, ys, zs = self._xyz
+        distance = (xs[place] - target[0]) ** 2 + (ys[place] - target[1]) ** 2 + (zs[place] - target[2]) ** 2
+        if distance < best[1]:
+            best[0], best[1] = place, distance
+        axis = self._axes[mid]
+        split = self._xyz[axis][place] - target[axis]
+        if split > 0:
+            self._search(lo, mid, target, best)
+            if split * split < best[1]:
+                self._search(mid + 1, hi, target, best)
+        else:
+            self._search(mid + 1, hi, target, best)
+            if split * split < best[1]:
+                self._search(lo, mid, target, best)
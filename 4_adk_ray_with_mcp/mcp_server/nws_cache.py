@@ -0,0 +1,454 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from nws_client import NWSClient
+from resilience import CircuitOpenError, ResilientNWSClient
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# NWS resolves /points with at most four decimal places and redirects anything more precise.
+POINT_PRECISION = 4
+
+
+def normalize_point(latitude: float, longitude: float) -> str:
+    """`lat,lon` at NWS precision, without trailing zeros."""
+    def fmt(value: float) -> str:
+        text = f"{value:.{POINT_PRECISION}f}".rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    return f"{fmt(latitude)},{fmt(longitude)}"
+
+
+def delta_seconds(value: Optional[str]) -> Optional[float]:
+    """An HTTP delta-seconds value (a non-negative integer), or None when it is missing or malformed."""
+    value = (value or "").strip()
+    return float(value) if value.isdigit() else None
+
+
+def freshness_lifetime(headers: httpx.Headers, now: float) -> Tuple[float, bool]:
+    """
+    Seconds the response may be served without revalidation, and whether it may be stored at all.
+
+    Follows Cache-Control max-age (minus Age) and falls back to Expires; `no-cache`
+    stores the response but forces revalidation on every use.
+    """
+    directives: Dict[str, Optional[str]] = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    if "no-store" in directives:
+        return 0.0, False
+    if "no-cache" in directives:
+        return 0.0, True
+
+    age = delta_seconds(headers.get("age")) or 0.0
+    if "max-age" in directives:
+        max_age = delta_seconds(directives["max-age"])
+        return (max(max_age - age, 0.0) if max_age is not None else 0.0), True
+    if "expires" in headers:
+        try:
+            return max(parsedate_to_datetime(headers["expires"]).timestamp() - now, 0.0), True
+        except (TypeError, ValueError):
+            return 0.0, True
+    return 0.0, True
+
+
+def connect_sqlite(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """A connection several worker processes can share the database through."""
+    db = sqlite3.connect(path, timeout=5.0, check_same_thread=check_same_thread)
+    # WAL lets readers in one worker proceed while another worker writes.
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+@dataclass
+class CacheEntry:
+    data: Any
+    size: int
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.stale_served = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 4) if lookups else None,
+            "bytes_saved": self.bytes_saved,
+            "stale_served": self.stale_served,
+        }
+
+
+class SqliteWriter:
+    """
+    A write connection used off the event loop.
+
+    Commits can wait up to the busy timeout for another worker process's
+    write, so they run in a thread, one at a time; reads stay on the loop on
+    their own connection, which WAL never makes wait for a writer.
+    """
+
+    def __init__(self, path: str):
+        self.db = connect_sqlite(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def run(self, write, *args) -> Any:
+        """Run `write(db, *args)` and commit, in the calling thread."""
+        with self._lock:
+            try:
+                result = write(self.db, *args)
+                self.db.commit()
+                return result
+            except BaseException:
+                self.db.rollback()
+                raise
+
+    async def run_async(self, write, *args) -> Any:
+        return await asyncio.to_thread(self.run, write, *args)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+class PointsStore:
+    """
+    Persistent cache of /points lookups, keyed by normalized coordinates.
+
+    A point's grid mapping practically never changes, so entries live on disk
+    (SQLite) for `ttl_s` and survive restarts, up to `max_rows` of the most
+    recently stored; an LRU of `max_entries` in front of it serves repeated
+    lookups without touching the database.
+    """
+
+    def __init__(self, path: str, ttl_s: float = 30 * 24 * 3600, max_entries: int = 4096, max_rows: int = 100_000):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._memory: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._writer = SqliteWriter(path)
+        self._writer.run(lambda db: (
+            db.execute("CREATE TABLE IF NOT EXISTS points "
+                       "(point TEXT PRIMARY KEY, body TEXT NOT NULL, stored_at REAL NOT NULL)"),
+            db.execute("CREATE INDEX IF NOT EXISTS points_stored_at ON points (stored_at)"),
+        ))
+        self._writer.run(self._prune)
+        self._db = connect_sqlite(path)
+        # Pruning orders the table, so it runs once per tenth of `max_rows` puts rather than on each.
+        self._prune_every = max(max_rows // 10, 1)
+        self._puts_since_prune = 0
+        self.evictions = 0
+        self.stats = CacheStats()
+
+    def get(self, point: str) -> Optional[Any]:
+        now = time.time()
+        cached = self._memory.get(point)
+        if cached is None:
+            row = self._db.execute("SELECT body, stored_at FROM points WHERE point = ?", (point,)).fetchone()
+            if row is not None:
+                cached = (json.loads(row[0]), len(row[0]), row[1])
+                self._remember(point, cached)
+        else:
+            self._memory.move_to_end(point)
+        if cached is None or cached[2] + self.ttl_s <= now:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.bytes_saved += cached[1]
+        return cached[0]
+
+    async def put(self, point: str, body: str, data: Any):
+        now = time.time()
+        self._remember(point, (data, len(body), now))
+        self._puts_since_prune += 1
+        prune = self._puts_since_prune >= self._prune_every
+        if prune:
+            self._puts_since_prune = 0
+        await self._writer.run_async(self._insert, point, body, now, prune)
+
+    def _remember(self, point: str, cached: Tuple[Any, int, float]):
+        self._memory[point] = cached
+        self._memory.move_to_end(point)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _insert(self, db: sqlite3.Connection, point: str, body: str, now: float, prune: bool):
+        db.execute("INSERT OR REPLACE INTO points (point, body, stored_at) VALUES (?, ?, ?)", (point, body, now))
+        if prune:
+            self._prune(db)
+
+    def _prune(self, db: sqlite3.Connection):
+        """Drop expired rows, then the oldest beyond `max_rows`."""
+        db.execute("DELETE FROM points WHERE stored_at <= ?", (time.time() - self.ttl_s,))
+        db.execute(
+            "DELETE FROM points WHERE stored_at <= "
+            "(SELECT stored_at FROM points ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    def size(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+        self._writer.close()
+
+
+class ResponseCache:
+    """
+    In-memory LRU of NWS responses that honours HTTP caching headers.
+
+    Fresh entries are served directly. Stale entries with an ETag or
+    Last-Modified are revalidated with a conditional request, and a 304 renews
+    them without downloading the body again. When NWS fails, entries up to
+    `max_stale_s` past their freshness are served instead of an error. The
+    cache is bounded by entry count and by bytes.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024, max_stale_s: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_stale_s = max_stale_s
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.stats = CacheStats()
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    async def store(self, url: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        if url in self._entries:
+            self._bytes -= self._entries.pop(url).size
+        self._entries[url] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def size(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class SharedResponseCache:
+    """
+    ResponseCache counterpart shared by all worker processes of the server.
+
+    Entries live in one SQLite database in WAL mode instead of process memory,
+    so a response fetched by one worker is a hit in every other. Once the entry
+    count or byte bound is exceeded, the entries stored longest ago are evicted.
+    Writes and eviction run off the event loop (see SqliteWriter).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_stale_s: float = 3600.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_stale_s = max_stale_s
+        self._writer = SqliteWriter(path)
+        self._writer.run(lambda db: (
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL NOT NULL, etag TEXT, last_modified TEXT, "
+                "stored_at REAL NOT NULL)"
+            ),
+            db.execute("CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)"),
+        ))
+        self._db = connect_sqlite(path)
+        self.evictions = 0
+        self.stats = CacheStats()
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        row = self._db.execute(
+            "SELECT body, size, expires_at, etag, last_modified FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(data=json.loads(row[0]), size=row[1], expires_at=row[2], etag=row[3], last_modified=row[4])
+
+    async def store(self, url: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        body = json.dumps(entry.data)
+        evicted = await self._writer.run_async(self._insert, url, body, entry)
+        self.evictions += evicted
+
+    def _insert(self, db: sqlite3.Connection, url: str, body: str, entry: CacheEntry) -> int:
+        db.execute(
+            "INSERT OR REPLACE INTO responses (url, body, size, expires_at, etag, last_modified, stored_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, body, entry.size, entry.expires_at, entry.etag, entry.last_modified, time.time()),
+        )
+        count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return 0
+        victims = []
+        for victim, size in db.execute("SELECT url, size FROM responses ORDER BY stored_at"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((victim,))
+            count -= 1
+            total -= size
+        db.executemany("DELETE FROM responses WHERE url = ?", victims)
+        return len(victims)
+
+    def size(self) -> Dict[str, int]:
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "evictions": self.evictions}
+
+    def close(self):
+        self._db.close()
+        self._writer.close()
+
+
+class CachingNWSFetcher:
+    """
+    Fetches NWS JSON through the points store and the response cache.
+
+    /points URLs are normalized to NWS precision (which also avoids the 301 NWS
+    answers more precise coordinates with) and served from the PointsStore;
+    everything else goes through the HTTP-semantics-aware ResponseCache.
+    Whatever has to go upstream is coalesced per normalized URL, so concurrent
+    callers asking for the same thing share a single NWS request.
+    """
+
+    def __init__(
+        self,
+        client: Union[NWSClient, ResilientNWSClient],
+        points: Optional[PointsStore],
+        responses: Optional[Union[ResponseCache, SharedResponseCache]],
+    ):
+        self.client = client
+        self.points = points
+        self.responses = responses
+        self.in_flight = SingleFlight()
+
+    async def get_json(self, url: str) -> Any:
+        parts = urlsplit(url)
+        if parts.path.startswith("/points/"):
+            latitude, _, longitude = parts.path[len("/points/"):].partition(",")
+            point = normalize_point(float(latitude), float(longitude))
+            url = parts._replace(path=f"/points/{point}").geturl()
+            if self.points is not None:
+                data = self.points.get(point)
+                if data is not None:
+                    return data
+                return await self.in_flight.do(url, lambda: self._fetch_point(url, point))
+        if self.responses is not None:
+            entry = self.responses.lookup(url)
+            if entry is not None and entry.expires_at > time.time():
+                self.responses.stats.hits += 1
+                self.responses.stats.bytes_saved += entry.size
+                return entry.data
+            return await self.in_flight.do(url, lambda: self._fetch_cached(url))
+        return await self.in_flight.do(url, lambda: self._fetch(url))
+
+    async def _fetch(self, url: str) -> Any:
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch_point(self, url: str, point: str) -> Any:
+        response = await self.client.get(url)
+        response.raise_for_status()
+        data = response.json()
+        await self.points.put(point, response.text, data)
+        return data
+
+    async def _fetch_cached(self, url: str) -> Any:
+        """Revalidate a stale entry or fetch a missing one."""
+        now = time.time()
+        entry = self.responses.lookup(url)
+        stats = self.responses.stats
+
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        try:
+            response = await self.client.get(url, headers=headers or None)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except (httpx.TransportError, httpx.HTTPStatusError, CircuitOpenError) as e:
+            if entry is None or entry.expires_at + self.responses.max_stale_s <= now:
+                raise
+            logger.warning(f"Serving stale {url} after upstream failure: {e}")
+            stats.stale_served += 1
+            return entry.data
+
+        if response.status_code == 304 and entry is not None:
+            lifetime, _ = freshness_lifetime(response.headers, now)
+            entry.expires_at = now + lifetime
+            entry.etag = response.headers.get("etag", entry.etag)
+            entry.last_modified = response.headers.get("last-modified", entry.last_modified)
+            await self.responses.store(url, entry)
+            stats.revalidated += 1
+            stats.bytes_saved += entry.size
+            return entry.data
+
+        response.raise_for_status()
+        data = response.json()
+        stats.misses += 1
+        lifetime, storable = freshness_lifetime(response.headers, now)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if storable and (lifetime > 0 or etag or last_modified):
+            await self.responses.store(url, CacheEntry(
+                data=data,
+                size=len(response.content),
+                expires_at=now + lifetime,
+                etag=etag,
+                last_modified=last_modified,
+            ))
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"single_flight": self.in_flight.stats()}
+        if self.points is not None:
+            stats["points"] = {
+                **self.points.stats.as_dict(), "entries": self.points.size(), "evictions": self.points.evictions,
+            }
+        if self.responses is not None:
+            stats["responses"] = {**self.responses.stats.as_dict(), **self.responses.size()}
+        return stats
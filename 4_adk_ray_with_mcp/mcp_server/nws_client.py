@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class NWSClient:
+    """
+    One pooled, keep-alive HTTP client shared by every tool call of the process.
+
+    The underlying httpx.AsyncClient is created on first use and closed when the
+    last MCP session using it ends, so connections (and their TLS sessions) are
+    reused across tool calls instead of being set up for every request. Each
+    upstream host additionally gets a concurrency cap, so a burst of tool calls
+    can't open more connections to api.weather.gov than it tolerates.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_s: float = 60.0,
+        max_concurrency_per_host: int = 10,
+        http2: bool = True,
+    ):
+        self.headers = headers or {}
+        self.timeout_s = timeout_s
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_s,
+        )
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._sessions = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            try:
+                self._client = self._create(self.http2)
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+                self.http2 = False
+                self._client = self._create(False)
+            logger.info(f"Created pooled NWS HTTP client (limits: {self.limits}, http2: {self.http2})")
+        return self._client
+
+    def _create(self, http2: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout_s,
+            limits=self.limits,
+            http2=http2,
+        )
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        host = urlsplit(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+        async with slots:
+            return await self.client.get(url, headers=headers)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["NWSClient"]:
+        """Hold the client open for the duration of one MCP session."""
+        self._sessions += 1
+        try:
+            yield self
+        finally:
+            self._sessions -= 1
+            if self._sessions == 0:
+                await self.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Closed pooled NWS HTTP client")
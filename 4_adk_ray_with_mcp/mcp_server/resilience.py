@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import random
+import time
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from nws_client import NWSClient
+
+logger = logging.getLogger(__name__)
+
+# NWS edges answer overload and maintenance with these; anything else is final.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in_s: float):
+        super().__init__(f"Circuit for {endpoint} is open; retrying in {retry_in_s:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in_s = retry_in_s
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay_s: float = 0.2
+    max_delay_s: float = 2.0
+
+    def delay(self, retry: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with full jitter; a Retry-After header is honoured up to `max_delay_s`."""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay_s)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** retry))
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open for `reset_timeout_s`.
+
+    After that one probe request is let through (half-open): its success closes
+    the circuit again, its failure re-opens it for another `reset_timeout_s`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def retry_in_s(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout_s - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        # A probe that never reported back (e.g. its caller was cancelled) doesn't block the next one forever.
+        now = time.monotonic()
+        if self.probe_started_at is None or now - self.probe_started_at >= self.reset_timeout_s:
+            self.probe_started_at = now
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probe_started_at is not None or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                self.times_opened += 1
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+            self.probe_started_at = None
+
+
+class LatencyWindow:
+    """The latencies of the last `size` successful attempts of an endpoint."""
+
+    def __init__(self, size: int = 200):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, latency_s: float):
+        self.samples.append(latency_s)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class _Endpoint:
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.latency = LatencyWindow()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+
+
+class ResilientNWSClient:
+    """
+    Wraps NWSClient.get with retries, per-endpoint circuit breakers and optional hedging.
+
+    An endpoint is a host plus the first path segment (points, gridpoints,
+    alerts), so an outage of one NWS service doesn't trip the others. Every
+    attempt is bounded by `attempt_timeout_s` and a call with all its retries
+    by `deadline_s`. With hedging on, a second identical request is sent once
+    the first has taken longer than the endpoint's recent p95 latency, and the
+    first answer wins.
+    """
+
+    def __init__(
+        self,
+        client: NWSClient,
+        retry: Optional[RetryPolicy] = None,
+        attempt_timeout_s: float = 5.0,
+        deadline_s: float = 12.0,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay_s: float = 0.05,
+    ):
+        self.client = client
+        self.retry = retry or RetryPolicy()
+        self.attempt_timeout_s = attempt_timeout_s
+        self.deadline_s = deadline_s
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self._endpoints: Dict[str, _Endpoint] = {}
+
+    def endpoint(self, url: str) -> _Endpoint:
+        parts = urlsplit(url)
+        key = f"{parts.netloc}/{parts.path.lstrip('/').split('/', 1)[0]}"
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = _Endpoint(CircuitBreaker(key, self.failure_threshold, self.reset_timeout_s))
+        return endpoint
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        endpoint = self.endpoint(url)
+        deadline = time.monotonic() + self.deadline_s
+        endpoint.requests += 1
+        retry = 0
+        while True:
+            if not endpoint.breaker.allow():
+                endpoint.rejected += 1
+                raise CircuitOpenError(endpoint.breaker.name, endpoint.breaker.retry_in_s())
+
+            response: Optional[httpx.Response] = None
+            try:
+                response = await self._attempt(endpoint, url, headers, deadline)
+            except httpx.TransportError as e:
+                error: Optional[Exception] = e
+            else:
+                error = None
+                if response.status_code not in RETRYABLE_STATUS:
+                    endpoint.breaker.record_success()
+                    return response
+            endpoint.breaker.record_failure()
+
+            retry += 1
+            delay = self.retry.delay(retry - 1, response.headers.get("retry-after") if response is not None else None)
+            if retry >= self.retry.max_attempts or time.monotonic() + delay >= deadline:
+                reason = f"status {response.status_code}" if response is not None else repr(error)
+                logger.warning(f"Giving up on {url} after {retry} attempts: {reason}")
+                if response is not None:
+                    return response
+                raise error
+            endpoint.retries += 1
+            logger.info(f"Retrying {url} in {delay:.2f}s (attempt {retry + 1}/{self.retry.max_attempts})")
+            await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, endpoint: _Endpoint, url: str, headers: Optional[Dict[str, str]], deadline: float
+    ) -> httpx.Response:
+        timeout = min(self.attempt_timeout_s, max(deadline - time.monotonic(), 0.0))
+        try:
+            return await self._attempt_within(endpoint, url, headers, timeout)
+        except asyncio.TimeoutError:
+            raise httpx.TimeoutException(f"No response from {url} within {timeout:.2f}s") from None
+
+    async def _attempt_within(
+        self, endpoint: _Endpoint, url: str, headers: Optional[Dict[str, str]], timeout: float
+    ) -> httpx.Response:
+        hedge_after = endpoint.latency.quantile(self.hedge_quantile) if self.hedge else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await asyncio.wait_for(self._timed(endpoint, url, headers), timeout)
+
+        hedge_after = max(hedge_after, self.hedge_min_delay_s)
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(self._timed(endpoint, url, headers))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                endpoint.hedges += 1
+                tasks.append(asyncio.ensure_future(self._timed(endpoint, url, headers)))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = timeout - (time.monotonic() - started)
+                done, pending = await asyncio.wait(pending, timeout=max(remaining, 0.0), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            endpoint.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _timed(self, endpoint: _Endpoint, url: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+        start = time.monotonic()
+        response = await self.client.get(url, headers=headers)
+        if response.status_code not in RETRYABLE_STATUS:
+            endpoint.latency.add(time.monotonic() - start)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {}
+        for key, endpoint in self._endpoints.items():
+            p95 = endpoint.latency.quantile(0.95)
+            stats[key] = {
+                "circuit": endpoint.breaker.state,
+                "times_opened": endpoint.breaker.times_opened,
+                "requests": endpoint.requests,
+                "retries": endpoint.retries,
+                "rejected": endpoint.rejected,
+                "hedges": endpoint.hedges,
+                "hedge_wins": endpoint.hedge_wins,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            }
+        return stats
@@ -1,10 +1,25 @@
 import os
+import asyncio
 import logging
-from typing import Any
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 import json
 
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from alert_ingest import AlertIngestor
+from compact_output import compact_alerts, compact_forecast
+from gazetteer import Gazetteer
+from nws_cache import CachingNWSFetcher, PointsStore, ResponseCache, SharedResponseCache
+from nws_client import NWSClient
+from resilience import CircuitOpenError, ResilientNWSClient, RetryPolicy
 
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO").upper(),
@@ -14,42 +29,179 @@ logger = logging.getLogger(__name__)
 
 MCP_SERVER_HOST = os.getenv("MCP_SERVER_HOST", "0.0.0.0")  # For Uvicorn to bind to all interfaces in the container
 MCP_SERVER_PORT = int(os.getenv("MCP_SERVER_PORT", 50051))
+# "sse" keeps a long-lived session per client in one process; "streamable-http" can run
+# stateless, with every request independent, and so under several worker processes.
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
+MCP_STATELESS_HTTP = os.getenv("MCP_STATELESS_HTTP", "true").lower() == "true"
+MCP_JSON_RESPONSE = os.getenv("MCP_JSON_RESPONSE", "false").lower() == "true"
+MCP_WORKERS = int(os.getenv("MCP_WORKERS", "1"))
 
-NWS_API_BASE = "https://api.weather.gov"
+NWS_API_BASE = os.getenv("NWS_API_BASE", "https://api.weather.gov")
 USER_AGENT = "weather-app/1.0"
 
+# Fan-out of the batched tools: upstream lookups run at most this many at a time.
+BATCH_CONCURRENCY = int(os.getenv("NWS_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("NWS_BATCH_MAX_ITEMS", "20"))
+
+# NWS alert ids, e.g. urn:oid:2.49.0.1.840.0.5f1b...: no slashes, queries or dot segments.
+ALERT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9._:-]*")
+
+# "compact" returns structured JSON trimmed to a token budget per tool call instead of full text.
+TOOL_OUTPUT = os.getenv("NWS_TOOL_OUTPUT", "full").lower()
+TOOL_TOKEN_BUDGET = int(os.getenv("NWS_TOOL_TOKEN_BUDGET", "400"))
+# The batched tools split the budget between their items, but never below this per item,
+# about the smallest useful forecast or alert; a large batch then goes over the budget.
+TOOL_MIN_ITEM_TOKENS = int(os.getenv("NWS_TOOL_MIN_ITEM_TOKENS", "80"))
+# Tokens taken by the location fields around each forecast in get_forecasts.
+_LOCATION_ENTRY_TOKENS = 16
+
+# One pooled client per process; every tool call reuses its keep-alive connections.
+nws_client = NWSClient(
+    headers={"User-Agent": USER_AGENT, "Accept": "application/geo+json"},
+    timeout_s=float(os.getenv("NWS_TIMEOUT_S", "30")),
+    max_connections=int(os.getenv("NWS_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("NWS_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    keepalive_expiry_s=float(os.getenv("NWS_KEEPALIVE_EXPIRY_S", "60")),
+    max_concurrency_per_host=int(os.getenv("NWS_MAX_CONCURRENCY_PER_HOST", "10")),
+    http2=os.getenv("NWS_HTTP2", "true").lower() == "true",
+)
+
+# Retries, per-endpoint circuit breakers and (optionally) hedged requests around every NWS call.
+nws_upstream = ResilientNWSClient(
+    nws_client,
+    retry=RetryPolicy(
+        max_attempts=int(os.getenv("NWS_RETRY_MAX_ATTEMPTS", "3")),
+        base_delay_s=float(os.getenv("NWS_RETRY_BASE_DELAY_S", "0.2")),
+        max_delay_s=float(os.getenv("NWS_RETRY_MAX_DELAY_S", "2")),
+    ),
+    attempt_timeout_s=float(os.getenv("NWS_ATTEMPT_TIMEOUT_S", "5")),
+    deadline_s=float(os.getenv("NWS_DEADLINE_S", "12")),
+    failure_threshold=int(os.getenv("NWS_CIRCUIT_FAILURES", "5")),
+    reset_timeout_s=float(os.getenv("NWS_CIRCUIT_RESET_S", "30")),
+    hedge=os.getenv("NWS_HEDGE", "false").lower() == "true",
+    hedge_quantile=float(os.getenv("NWS_HEDGE_QUANTILE", "0.95")),
+)
+
+# Point-to-grid lookups persist on disk; forecasts and alerts are cached per HTTP headers,
+# in memory or, to share them between worker processes, in SQLite.
+NWS_CACHE_ENABLED = os.getenv("NWS_CACHE_ENABLED", "true").lower() == "true"
+NWS_SHARED_CACHE_PATH = os.getenv("NWS_SHARED_CACHE_PATH") or (
+    os.path.join(tempfile.gettempdir(), "nws_responses.sqlite3") if MCP_WORKERS > 1 else None
+)
+response_cache_limits = dict(
+    max_entries=int(os.getenv("NWS_RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("NWS_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    max_stale_s=float(os.getenv("NWS_STALE_IF_ERROR_S", "3600")),
+)
+nws_fetcher = CachingNWSFetcher(
+    nws_upstream,
+    points=PointsStore(
+        os.getenv("NWS_POINTS_CACHE_PATH", os.path.join(tempfile.gettempdir(), "nws_points.sqlite3")),
+        ttl_s=float(os.getenv("NWS_POINTS_CACHE_TTL_S", str(30 * 24 * 3600))),
+        max_entries=int(os.getenv("NWS_POINTS_CACHE_MAX_ENTRIES", "4096")),
+        max_rows=int(os.getenv("NWS_POINTS_CACHE_MAX_ROWS", "100000")),
+    ) if NWS_CACHE_ENABLED else None,
+    responses=(
+        SharedResponseCache(NWS_SHARED_CACHE_PATH, **response_cache_limits) if NWS_SHARED_CACHE_PATH
+        else ResponseCache(**response_cache_limits)
+    ) if NWS_CACHE_ENABLED else None,
+)
+
+# Offline US places for get_forecast_by_place. The grids of the most populous ones are looked
+# up at startup.
+gazetteer = Gazetteer.load(
+    os.getenv("NWS_GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "us_places.tsv"))
+)
+GAZETTEER_PREWARM = int(os.getenv("NWS_GAZETTEER_PREWARM", "100"))
+_prewarm_task: asyncio.Task | None = None
+
+# Optionally answer get_alerts from a background-polled index of the national feed.
+alert_ingestor = AlertIngestor(
+    nws_client,
+    f"{NWS_API_BASE}/alerts/active",
+    poll_interval_s=float(os.getenv("NWS_ALERTS_POLL_S", "30")),
+    max_staleness_s=float(os.getenv("NWS_ALERTS_MAX_STALENESS_S", "300")),
+) if os.getenv("NWS_ALERTS_INGEST", "false").lower() == "true" else None
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Keep the shared NWS client (and alert poller) running while any MCP session is open."""
+    global _prewarm_task
+    if _prewarm_task is None and GAZETTEER_PREWARM > 0 and nws_fetcher.points is not None:
+        _prewarm_task = asyncio.create_task(prewarm_grids(GAZETTEER_PREWARM))
+    async with nws_client.session():
+        if alert_ingestor is None:
+            yield
+        else:
+            async with alert_ingestor.session():
+                yield
+
+
 # Initialize FastMCP server
 mcp = FastMCP(
     instance_name="weather_mcp_server",
     instructions="This MCP server provides tools to query information about weather.",
     host=MCP_SERVER_HOST,
     port=MCP_SERVER_PORT,
+    lifespan=server_lifespan,
+    stateless_http=MCP_STATELESS_HTTP,
+    json_response=MCP_JSON_RESPONSE,
     # sse_path="/sse", # Default, can be overridden if needed
     # message_path="/messages/", # Default, can be overridden if needed
 )
 logging.info(f"Weather MCP server starting on {MCP_SERVER_HOST}:{MCP_SERVER_PORT}")
 
+
+def http_app() -> Starlette:
+    """
+    The streamable-HTTP app of one worker process.
+
+    In stateless mode every request runs the MCP lifespan on its own, so the
+    app holds the shared NWS client and alert poller open for the life of the
+    worker instead of setting them up and tearing them down per request.
+    """
+    app = mcp.streamable_http_app()
+    run_session_manager = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with server_lifespan(mcp):
+            async with run_session_manager(app):
+                yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+@mcp.custom_route("/-/cache", methods=["GET"])
+async def cache_stats(request: Request) -> JSONResponse:
+    """Hit ratios and bytes saved of the NWS caches, and the state of the upstream circuits."""
+    return JSONResponse({
+        "enabled": NWS_CACHE_ENABLED,
+        **nws_fetcher.stats(),
+        "alert_index": alert_ingestor.stats() if alert_ingestor is not None else None,
+        "upstream": nws_upstream.stats(),
+    })
+
+
 # --- NWS API Interaction ---
 async def make_nws_request(url: str) -> dict[str, Any] | None:
     """Make a request to the NWS API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/geo+json"
-    }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except httpx.TimeoutException:
-            logger.error(f"Request timeout for URL: {url}")
-            return None
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code} for URL: {url}")
-            return None
-        except Exception as e:
-            logger.error(f"An unexpected error occurred in make_nws_request: {e}", exc_info=True)
-            return None
+    try:
+        return await nws_fetcher.get_json(url)
+    except httpx.TimeoutException:
+        logger.error(f"Request timeout for URL: {url}")
+        return None
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error {e.response.status_code} for URL: {url}")
+        return None
+    except CircuitOpenError as e:
+        logger.warning(f"Not requesting {url}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"An unexpected error occurred in make_nws_request: {e}", exc_info=True)
+        return None
 
 
 def format_alert(feature: dict) -> str:
@@ -63,55 +215,74 @@ Description: {props.get('description', 'No description available')}
 Instructions: {props.get('instruction', 'No specific instructions provided')}
 """
 
-# --- MCP Tools ---
-@mcp.tool()
-async def get_alerts(state: str) -> str:
-    """Get weather alerts for a US state.
+async def fetch_alert_features(state: str) -> tuple[list[dict] | None, str | None]:
+    """Active alerts of one state and, when answered from the alert index, its as-of time."""
+    if alert_ingestor is not None and alert_ingestor.fresh():
+        return alert_ingestor.index.for_state(state), alert_ingestor.as_of()
 
-    Args:
-        state: Two-letter US state code (e.g. CA, NY)
-    """
     points_url = f"{NWS_API_BASE}/alerts/active/area/{state}"
     points_data = await make_nws_request(points_url)
 
     if not points_data or "features" not in points_data:
+        return None, None
+    return points_data["features"], None
+
+
+async def fetch_alerts(state: str) -> str:
+    """Alerts of one state as text, from the alert index when it is fresh."""
+    features, as_of = await fetch_alert_features(state)
+    if features is None:
         return "Unable to fetch alerts or no alerts found."
 
-    if not points_data["features"]:
-        return "No active alerts for this state."
+    text = "\n---\n".join(format_alert(f) for f in features) if features else "No active alerts for this state."
+    return f"{text}\n\nAlerts as of {as_of}." if as_of else text
 
-    alerts = [format_alert(feature) for feature in points_data["features"]]
-    return "\n---\n".join(alerts)
 
+async def fetch_alerts_compact(state: str, budget: int) -> dict:
+    """Alerts of one state as compact JSON within `budget` tokens, or `{"error": ...}`."""
+    features, as_of = await fetch_alert_features(state)
+    if features is None:
+        return {"error": "Unable to fetch alerts or no alerts found."}
+    return compact_alerts(features, budget, as_of)
 
-@mcp.tool()
-async def get_forecast(latitude: float, longitude: float) -> str:
-    """Get weather forecast for a location. Returns data as a JSON string.
 
-    Args:
-        latitude: Latitude of the location
-        longitude: Longitude of the location
-    """
+async def prewarm_grids(count: int):
+    """Look up the forecast grids of the `count` most populous gazetteer places, once per process."""
+    places = range(min(count, len(gazetteer)))
+
+    async def lookup(place: int):
+        return await make_nws_request(f"{NWS_API_BASE}/points/{gazetteer.latitudes[place]},{gazetteer.longitudes[place]}")
+
+    try:
+        async with nws_client.session():
+            results = await fan_out(list(places), lookup, None)
+        logger.info(f"Prewarmed forecast grids of {sum(1 for r in results if isinstance(r, dict))}/{len(places)} places")
+    except Exception as e:
+        logger.warning(f"Prewarming forecast grids failed: {e}")
+
+
+async def fetch_forecast(latitude: float, longitude: float) -> list[dict] | dict:
+    """The next five forecast periods of a location, or `{"error": ...}`."""
     # First get the forecast grid endpoint
     points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
     points_data = await make_nws_request(points_url)
 
     if not points_data:
-        return json.dumps({"error": "Unable to fetch forecast grid data for this location."})
+        return {"error": "Unable to fetch forecast grid data for this location."}
 
     # Get the forecast URL from the points response
     forecast_url = points_data.get("properties", {}).get("forecast")
     if not forecast_url:
-        return json.dumps({"error": "Could not determine forecast URL from point data."}) 
+        return {"error": "Could not determine forecast URL from point data."}
 
     forecast_data = await make_nws_request(forecast_url)
 
     if not forecast_data or "properties" not in forecast_data:
-        return json.dumps({"error": "Unable to fetch detailed forecast."})
+        return {"error": "Unable to fetch detailed forecast."}
 
     periods_from_api = forecast_data["properties"].get("periods")
     if not periods_from_api:
-        return json.dumps({"error": "No forecast periods available."})
+        return {"error": "No forecast periods available."}
 
     # Format the periods into a list of dictionaries
     output_periods = []
@@ -126,13 +297,215 @@ async def get_forecast(latitude: float, longitude: float) -> str:
             "shortForecast": period_data.get("shortForecast"),
             "detailedForecast": period_data.get("detailedForecast")
         })
-    return json.dumps(output_periods)
+    return output_periods
+
+
+async def fan_out(items: list, fetch, ctx: Context | None) -> list:
+    """Run `fetch` for every item, BATCH_CONCURRENCY at a time, reporting progress as items finish."""
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    done = 0
+
+    async def run(item):
+        nonlocal done
+        async with slots:
+            try:
+                result = await fetch(item)
+            except Exception as e:
+                logger.error(f"Batched lookup for {item!r} failed: {e}", exc_info=True)
+                result = e
+        done += 1
+        if ctx is not None:
+            await ctx.report_progress(done, len(items))
+        return result
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+class Location(BaseModel):
+    latitude: float
+    longitude: float
+
+
+def compact_mode() -> bool:
+    return TOOL_OUTPUT == "compact"
+
+
+def item_budget(items: int, overhead: int = 0) -> int:
+    """One batched item's share of TOOL_TOKEN_BUDGET, at least TOOL_MIN_ITEM_TOKENS."""
+    return max(TOOL_TOKEN_BUDGET // max(items, 1) - overhead, TOOL_MIN_ITEM_TOKENS)
 
 
+# --- MCP Tools ---
+@mcp.tool()
+async def get_alerts(state: str) -> str:
+    """Get weather alerts for a US state.
+
+    Args:
+        state: Two-letter US state code (e.g. CA, NY)
+    """
+    if compact_mode():
+        return json.dumps(await fetch_alerts_compact(state, TOOL_TOKEN_BUDGET))
+    return await fetch_alerts(state)
+
+
+@mcp.tool()
+async def get_forecast(latitude: float, longitude: float) -> str:
+    """Get weather forecast for a location. Returns data as a JSON string.
+
+    Args:
+        latitude: Latitude of the location
+        longitude: Longitude of the location
+    """
+    forecast = await fetch_forecast(latitude, longitude)
+    if compact_mode() and isinstance(forecast, list):
+        forecast = compact_forecast(forecast, TOOL_TOKEN_BUDGET)
+    return json.dumps(forecast)
+
+
+@mcp.tool()
+async def get_forecast_by_place(place: str) -> str:
+    """Get weather forecast for a US city or town by name. Returns data as a JSON string.
+
+    Prefer this over get_forecast when you know the place but not its coordinates.
+
+    Args:
+        place: Place name, optionally with its state (e.g. "Portland, OR", "Saint Louis")
+    """
+    matches = gazetteer.lookup(place, limit=4)
+    if not matches:
+        return json.dumps({"error": f"Unknown place: {place}. Use get_forecast with its coordinates instead."})
+    best = matches[0]
+    latitude, longitude = gazetteer.latitudes[best], gazetteer.longitudes[best]
+    forecast = await fetch_forecast(latitude, longitude)
+    if compact_mode() and isinstance(forecast, list):
+        forecast = compact_forecast(forecast, TOOL_TOKEN_BUDGET - _LOCATION_ENTRY_TOKENS)
+    result = {"place": gazetteer.label(best), "latitude": latitude, "longitude": longitude, "forecast": forecast}
+    if len(matches) > 1:
+        result["other_matches"] = [gazetteer.label(m) for m in matches[1:]]
+    return json.dumps(result)
+
+
+@mcp.tool()
+async def get_alerts_multi(states: list[str], ctx: Context = None) -> str:
+    """Get weather alerts for several US states in one call.
+
+    Prefer this over calling get_alerts once per state.
+
+    Args:
+        states: Two-letter US state codes (e.g. ["CA", "NY"])
+    """
+    if len(states) > BATCH_MAX_ITEMS:
+        return f"Too many states: at most {BATCH_MAX_ITEMS} per call."
+    if compact_mode():
+        budget = item_budget(len(states))
+        results = await fan_out(states, lambda state: fetch_alerts_compact(state, budget), ctx)
+        output = {
+            state: result if isinstance(result, dict) else {"error": f"Unable to fetch alerts: {result}"}
+            for state, result in zip(states, results)
+        }
+        return json.dumps(output)
+
+    results = await fan_out(states, fetch_alerts, ctx)
+    sections = []
+    for state, result in zip(states, results):
+        text = result if isinstance(result, str) else f"Unable to fetch alerts: {result}"
+        sections.append(f"=== {state} ===\n{text}")
+    return "\n\n".join(sections)
+
+
+@mcp.tool()
+async def get_forecasts(locations: list[Location], ctx: Context = None) -> str:
+    """Get weather forecasts for several locations in one call. Returns data as a JSON string.
+
+    Prefer this over calling get_forecast once per location. Each entry of the
+    result holds the location and either its `forecast` periods or an `error`.
+
+    Args:
+        locations: Locations as objects with `latitude` and `longitude`
+    """
+    if len(locations) > BATCH_MAX_ITEMS:
+        return json.dumps({"error": f"Too many locations: at most {BATCH_MAX_ITEMS} per call."})
+    results = await fan_out(locations, lambda loc: fetch_forecast(loc.latitude, loc.longitude), ctx)
+    output = []
+    for location, result in zip(locations, results):
+        entry = {"latitude": location.latitude, "longitude": location.longitude}
+        if isinstance(result, Exception):
+            entry["error"] = f"Unexpected error: {result}"
+        elif isinstance(result, dict) and "error" in result:
+            entry["error"] = result["error"]
+        elif compact_mode():
+            entry["forecast"] = compact_forecast(result, item_budget(len(locations), _LOCATION_ENTRY_TOKENS))
+        else:
+            entry["forecast"] = result
+        output.append(entry)
+    return json.dumps(output)
+
+
+def alert_url(alert_id: str) -> str | None:
+    """
+    The NWS URL of an alert, or None unless `alert_id` is a bare alert id or that URL.
+
+    The id comes from the model, so it never selects another host or path to fetch.
+    """
+    prefix = f"{NWS_API_BASE}/alerts/"
+    if alert_id.startswith(prefix):
+        alert_id = alert_id[len(prefix):]
+    if not ALERT_ID_PATTERN.fullmatch(alert_id):
+        return None
+    return prefix + alert_id
+
+
+@mcp.tool()
+async def get_alert_detail(alert_id: str) -> str:
+    """Get the full text of one weather alert, e.g. one whose description was shortened.
+
+    Args:
+        alert_id: The alert `id` from get_alerts or get_alerts_multi
+    """
+    url = alert_url(alert_id)
+    if url is None:
+        return "Invalid alert id; pass an `id` exactly as get_alerts or get_alerts_multi returned it."
+    data = await make_nws_request(url)
+    if not data or "properties" not in data:
+        return "Unable to fetch this alert; it may have expired."
+    return format_alert(data)
+
+
+@mcp.tool()
+async def get_forecast_period(latitude: float, longitude: float, index: int) -> str:
+    """Get one forecast period of a location in full, e.g. one whose detail was shortened.
+
+    Args:
+        latitude: Latitude of the location
+        longitude: Longitude of the location
+        index: Position of the period in the forecast, starting at 0
+    """
+    forecast = await fetch_forecast(latitude, longitude)
+    if isinstance(forecast, dict):
+        return json.dumps(forecast)
+    if not 0 <= index < len(forecast):
+        return json.dumps({"error": f"No forecast period {index}; there are {len(forecast)}."})
+    return json.dumps(forecast[index])
+
 if __name__ == "__main__":
     logger.info("Starting Weather MCP Server...")
     try:
-        mcp.run(transport="sse")
+        if MCP_TRANSPORT == "streamable-http":
+            import uvicorn
+
+            # Worker processes have to import the app themselves, so they get it by name.
+            uvicorn.run(
+                "weather_mcp:http_app" if MCP_WORKERS > 1 else http_app,
+                factory=True,
+                host=MCP_SERVER_HOST,
+                port=MCP_SERVER_PORT,
+                workers=MCP_WORKERS,
+                log_level=os.getenv("LOG_LEVEL", "INFO").lower(),
+            )
+        else:
+            if MCP_WORKERS > 1:
+                logger.warning("SSE sessions live in one process; ignoring MCP_WORKERS (use MCP_TRANSPORT=streamable-http)")
+            mcp.run(transport="sse")
     except Exception as e:
         logging.critical(f"MCP server failed to run: {e}", exc_info=True)
-        exit(1)
\ No newline at end of file
+        exit(1)
@@ -0,0 +1,210 @@
+import asyncio
+import math
+import time
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple, Union
+
+DEFAULT_TENANT = "default"
+
+
+class OverloadedError(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class TenantPolicy:
+    """
+    Scheduling share of one tenant.
+
+    `weight` is its share of dispatch slots while other tenants are waiting too,
+    `max_running` caps its concurrent requests regardless of idle capacity, and
+    `priority` is passed to vLLM's priority scheduler (lower runs first).
+    """
+    weight: float = 1.0
+    max_running: Optional[int] = None
+    priority: int = 0
+
+
+@dataclass
+class _TenantState:
+    policy: TenantPolicy
+    running: int = 0
+    last_finish: float = 0.0
+    waiters: Deque[Tuple[asyncio.Future, float]] = field(default_factory=deque)
+
+
+class AdmissionController:
+    """
+    Bounds the requests a replica hands to the engine.
+
+    At most `max_running` requests are dispatched at once and at most
+    `max_queued` wait for a slot. Requests beyond that, or that waited longer
+    than `queue_timeout_s`, are rejected right away with OverloadedError, so
+    overload turns into fast retries instead of requests that sit in the
+    engine until the client times out.
+
+    Waiting requests are dispatched by start-time fair queuing across tenants:
+    each tenant gets slots in proportion to its weight, never more than its
+    own `max_running`, and a tenant that floods the queue has its newest
+    waiters shed before anyone else's.
+    """
+
+    def __init__(
+        self,
+        max_running: int,
+        max_queued: int,
+        queue_timeout_s: float,
+        tenants: Optional[Dict[str, Union[TenantPolicy, Dict]]] = None,
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.queue_timeout_s = queue_timeout_s
+        self.policies: Dict[str, TenantPolicy] = {
+            name: policy if isinstance(policy, TenantPolicy) else TenantPolicy(**policy)
+            for name, policy in (tenants or {}).items()
+        }
+        self._running = 0
+        self._queued = 0
+        self._virtual_time = 0.0
+        self._tenants: Dict[str, _TenantState] = {}
+        self._latency_ewma: Optional[float] = None
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def tenant_for(self, name: Optional[str]) -> str:
+        """
+        The tenant a request naming `name` is scheduled as.
+
+        Names come from clients, so only configured tenants get a queue of their
+        own; any other name is the default tenant, or rotating names would buy
+        a client extra queue slots and let it push out other clients' waiters.
+        """
+        return name if name and name in self.policies else DEFAULT_TENANT
+
+    def policy(self, tenant: str) -> TenantPolicy:
+        """Policy of a tenant; unknown tenants share the `default` one."""
+        return self.policies.get(tenant) or self.policies.get(DEFAULT_TENANT) or TenantPolicy()
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, at least one."""
+        if self._latency_ewma is None:
+            return 1
+        return max(1, math.ceil(self._latency_ewma * (self.queued + 1) / self.max_running))
+
+    async def acquire(self, tenant: str = DEFAULT_TENANT):
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = _TenantState(self.policy(tenant), last_finish=self._virtual_time)
+        if self._queued >= self.max_queued and not self._push_out(tenant):
+            self._forget_if_idle(tenant)
+            raise OverloadedError(self.retry_after())
+
+        start_tag = max(self._virtual_time, state.last_finish)
+        state.last_finish = start_tag + 1 / state.policy.weight
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append((waiter, start_tag))
+        self._queued += 1
+        self._dispatch()
+        if waiter.done():
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # The slot was handed over just as we gave up on it.
+                self.release(tenant=tenant)
+            elif not waiter.done():
+                waiter.cancel()
+                self._remove_waiter(tenant, waiter)
+            else:
+                # Pushed out by another tenant just as we gave up.
+                self._forget_if_idle(tenant)
+            if isinstance(e, asyncio.TimeoutError):
+                raise OverloadedError(self.retry_after()) from None
+            raise
+        except OverloadedError:
+            # Pushed out of the queue by another tenant's request.
+            self._forget_if_idle(tenant)
+            raise
+
+    def release(self, latency_s: Optional[float] = None, tenant: str = DEFAULT_TENANT):
+        """Free a slot and hand it to the next waiter in fair-queuing order."""
+        if latency_s is not None:
+            self._latency_ewma = latency_s if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency_s
+        self._running -= 1
+        self._tenants[tenant].running -= 1
+        self._dispatch()
+        self._forget_if_idle(tenant)
+
+    async def release_after(self, generator: AsyncIterator, start: float, tenant: str = DEFAULT_TENANT) -> AsyncIterator:
+        """Hold the slot until a streamed response has been fully sent."""
+        try:
+            async for chunk in generator:
+                yield chunk
+        finally:
+            self.release(time.perf_counter() - start, tenant=tenant)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"running": state.running, "queued": len(state.waiters)}
+            for name, state in self._tenants.items()
+        }
+
+    def _dispatch(self):
+        """Hand free slots to the eligible waiter with the smallest start tag."""
+        while self._running < self.max_running:
+            best: Optional[_TenantState] = None
+            for state in self._tenants.values():
+                if not state.waiters:
+                    continue
+                if state.policy.max_running is not None and state.running >= state.policy.max_running:
+                    continue
+                if best is None or state.waiters[0][1] < best.waiters[0][1]:
+                    best = state
+            if best is None:
+                return
+            waiter, start_tag = best.waiters.popleft()
+            self._queued -= 1
+            self._virtual_time = max(self._virtual_time, start_tag)
+            self._running += 1
+            best.running += 1
+            waiter.set_result(None)
+
+    def _push_out(self, tenant: str) -> bool:
+        """Shed the newest waiter of the tenant queueing the most, if that isn't `tenant` itself."""
+        own = len(self._tenants[tenant].waiters)
+        name, state = max(self._tenants.items(), key=lambda item: len(item[1].waiters))
+        if name == tenant or len(state.waiters) <= own + 1:
+            return False
+        waiter, _ = state.waiters.pop()
+        self._queued -= 1
+        waiter.set_exception(OverloadedError(self.retry_after()))
+        return True
+
+    def _remove_waiter(self, tenant: str, waiter: asyncio.Future):
+        state = self._tenants[tenant]
+        for i, (queued, _) in enumerate(state.waiters):
+            if queued is waiter:
+                del state.waiters[i]
+                self._queued -= 1
+                break
+        self._forget_if_idle(tenant)
+
+    def _forget_if_idle(self, tenant: str):
+        # Idle tenants are dropped; one that comes back starts at the current virtual time anyway.
+        state = self._tenants.get(tenant)
+        if state is not None and state.running == 0 and not state.waiters:
+            del self._tenants[tenant]
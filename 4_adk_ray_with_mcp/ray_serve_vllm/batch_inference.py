@@ -0,0 +1,246 @@
+"""
+Offline bulk inference with the same engine configuration as the Serve app.
+
+Reads a JSONL file of chat completion requests, runs them through an
+in-process AsyncLLMEngine (which batches all in-flight requests continuously)
+and appends one result per line to the output file as soon as it finishes.
+Each input line is either a ChatCompletionRequest body or an OpenAI batch
+line `{"custom_id": ..., "body": {...}}`; lines without a `custom_id` are
+identified by their line number. Re-running with the same output file skips
+requests that already have a result, so an interrupted run resumes where it
+stopped.
+
+    python batch_inference.py --input prompts.jsonl --output results.jsonl
+
+The engine is configured from the same environment variables as build_app
+(MODEL_ID, TENSOR_PARALLELISM, CHAT_TEMPLATE_PATH, LORA_MODULES, ...).
+VLLM_FAKE_ENGINE=true or --fake-engine runs on CPU with FakeAsyncLLMEngine.
+Large files can be split across workers with --num-shards/--shard-index.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import traceback
+
+from typing import Any, Dict, Iterator, Set, Tuple
+
+from vllm.engine.async_llm_engine import AsyncLLMEngine
+from vllm.entrypoints.openai.protocol import ChatCompletionRequest, ChatCompletionResponse, ErrorResponse
+
+from fake_engine import FakeAsyncLLMEngine, FakeServingChat, FakeServingModels
+from lora_registry import LoRAAdapterRegistry
+from engine_config import create_openai_serving, load_engine_config, load_fake_engine_config
+
+logger = logging.getLogger("ray.serve")
+
+
+def read_requests(path: str, num_shards: int, shard_index: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (custom_id, request body) pairs of this shard."""
+    with open(path) as f:
+        for line_number, line in enumerate(f):
+            if line_number % num_shards != shard_index or not line.strip():
+                continue
+            item = json.loads(line)
+            if "body" in item:
+                yield str(item.get("custom_id", line_number)), item["body"]
+            else:
+                custom_id = item.pop("custom_id", line_number)
+                yield str(custom_id), item
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a result in the output file."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["custom_id"])
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; that request is redone.
+                continue
+    return done
+
+
+def drop_errors(path: str) -> int:
+    """Remove error results (and cut-off lines) from the output file so those requests are redone; returns how many."""
+    if not os.path.exists(path):
+        return 0
+    kept = []
+    dropped = 0
+    with open(path) as f:
+        for line in f:
+            try:
+                failed = json.loads(line).get("error") is not None
+            except json.JSONDecodeError:
+                failed = True
+            if failed:
+                dropped += 1
+            else:
+                kept.append(line if line.endswith("\n") else line + "\n")
+    if dropped:
+        # Rewrite next to the original and swap it in, so an interrupted rewrite loses nothing.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as out:
+            out.writelines(kept)
+        os.replace(tmp_path, path)
+    return dropped
+
+
+class BatchRunner:
+    """Runs requests through OpenAIServingChat with a bounded number in flight."""
+
+    def __init__(self, serving_chat: Any, lora_registry: LoRAAdapterRegistry, default_model: str, max_in_flight: int):
+        self.serving_chat = serving_chat
+        self.lora_registry = lora_registry
+        self.default_model = default_model
+        self.max_in_flight = max_in_flight
+        self.succeeded = 0
+        self.failed = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def run_one(self, custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            request = ChatCompletionRequest(**{"model": self.default_model, **body, "stream": False})
+            result = await self.lora_registry.acquire(request.model)
+            if result is None:
+                try:
+                    result = await self.serving_chat.create_chat_completion(request, None)
+                finally:
+                    self.lora_registry.release(request.model)
+        except Exception as e:
+            logger.error(f"Request {custom_id} failed: {str(e)}\n{traceback.format_exc()}")
+            result = ErrorResponse(message=str(e), type="InternalServerError", code=500)
+
+        if isinstance(result, ChatCompletionResponse):
+            self.succeeded += 1
+            if result.usage is not None:
+                self.prompt_tokens += result.usage.prompt_tokens
+                self.completion_tokens += result.usage.completion_tokens or 0
+            return {"custom_id": custom_id, "response": result.model_dump(), "error": None}
+        self.failed += 1
+        if not isinstance(result, ErrorResponse):
+            result = ErrorResponse(message=f"Unexpected response type {type(result)}", type="InternalServerError", code=500)
+        return {"custom_id": custom_id, "response": None, "error": result.model_dump()}
+
+    async def run(self, requests: Iterator[Tuple[str, Dict[str, Any]]], output_path: str, progress_s: float = 10.0):
+        start = time.perf_counter()
+        last_progress = start
+        slots = asyncio.Semaphore(self.max_in_flight)
+        pending: Set[asyncio.Future] = set()
+
+        # Append to an earlier run's results; make sure a cut-off last line isn't extended.
+        with open(output_path, "a+") as out:
+            if out.tell() > 0:
+                out.seek(out.tell() - 1)
+                if out.read(1) != "\n":
+                    out.write("\n")
+
+            async def run_and_write(custom_id: str, body: Dict[str, Any]):
+                try:
+                    result = await self.run_one(custom_id, body)
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                finally:
+                    slots.release()
+
+            for custom_id, body in requests:
+                await slots.acquire()
+                task = asyncio.ensure_future(run_and_write(custom_id, body))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if time.perf_counter() - last_progress >= progress_s:
+                    last_progress = time.perf_counter()
+                    logger.info(f"Batch progress: {self.report(last_progress - start)}")
+            if pending:
+                await asyncio.gather(*pending)
+
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed_s: float) -> Dict[str, Any]:
+        elapsed_s = max(elapsed_s, 1e-9)
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed_s, 2),
+            "requests_per_s": round((self.succeeded + self.failed) / elapsed_s, 2),
+            "prompt_tokens_per_s": round(self.prompt_tokens / elapsed_s, 1),
+            "completion_tokens_per_s": round(self.completion_tokens / elapsed_s, 1),
+        }
+
+
+async def run_batch(args: argparse.Namespace) -> Dict[str, Any]:
+    engine_config = load_engine_config()
+    engine_args = engine_config["engine_args"]
+    served_model_names = engine_config["served_model_names"] or [engine_args.model]
+
+    fake_engine_config = load_fake_engine_config()
+    if fake_engine_config is not None:
+        logger.info(f"Using FakeAsyncLLMEngine: {fake_engine_config}")
+        engine = FakeAsyncLLMEngine(**fake_engine_config)
+        models = FakeServingModels(served_model_names)
+        serving_chat = FakeServingChat(engine, models)
+    else:
+        # One log line per request is noise across tens of thousands of prompts.
+        engine_args.disable_log_requests = True
+        engine = AsyncLLMEngine.from_engine_args(engine_args)
+        models, serving_chat = await create_openai_serving(
+            engine,
+            engine_args,
+            served_model_names,
+            engine_config["chat_template"],
+            engine_config["enable_auto_tools"],
+            engine_config["tool_parser_name"],
+        )
+
+    lora_registry = LoRAAdapterRegistry(**engine_config["lora_config"])
+    error = await lora_registry.bind(models)
+    if error is not None:
+        raise RuntimeError(f"Failed to load LoRA adapters: {error.message}")
+
+    if args.retry_errors:
+        dropped = drop_errors(args.output)
+        if dropped:
+            logger.info(f"Retrying {dropped} requests whose earlier result in {args.output} was an error")
+    done = completed_ids(args.output)
+    if done:
+        logger.info(f"Resuming: {len(done)} requests in {args.output} already have results")
+    requests = (
+        (custom_id, body)
+        for custom_id, body in read_requests(args.input, args.num_shards, args.shard_index)
+        if custom_id not in done
+    )
+
+    runner = BatchRunner(serving_chat, lora_registry, served_model_names[0], args.max_in_flight)
+    return await runner.run(requests, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="JSONL file of chat completion requests")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--max-in-flight", type=int, default=512, help="Requests submitted to the engine at once")
+    parser.add_argument("--retry-errors", action="store_true", help="Redo requests whose earlier result was an error")
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--shard-index", type=int, default=0)
+    parser.add_argument("--fake-engine", action="store_true", help="Use FakeAsyncLLMEngine (CPU only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    if args.fake_engine:
+        os.environ["VLLM_FAKE_ENGINE"] = "true"
+    report = asyncio.run(run_batch(args))
+    logger.info(f"Batch finished: {report}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Load-generation benchmark for the chat-completions path.
+
+Against a running deployment:
+
+    python -m benchmark --url http://llama-31-8b-serve-svc:8000 --concurrency 32 --duration 60
+
+Against a local Ray Serve app backed by FakeAsyncLLMEngine (CPU only), which
+measures the overhead VLLMDeployment adds on top of the engine:
+
+    python -m benchmark --local-fake --rate 50 --duration 30
+
+Run from the ray_serve_vllm directory. Results are printed as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from benchmark.load_gen import run_load
+
+
+def start_local_fake_app(port: int) -> str:
+    """Run serve_chat_completion's app in a local Ray Serve instance with the fake engine."""
+    os.environ.setdefault("VLLM_FAKE_ENGINE", "true")
+    os.environ.setdefault("WARMUP_ENABLED", "false")
+
+    from ray import serve
+    import serve_chat_completion
+
+    serve.start(http_options={"host": "127.0.0.1", "port": port})
+    serve.run(serve_chat_completion.model, route_prefix="/")
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of the Serve application")
+    target.add_argument("--local-fake", action="store_true", help="Start a local fake-engine deployment")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=16, help="Closed-loop virtual agents")
+    load.add_argument("--rate", type=float, help="Open-loop arrival rate in requests/s")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--turns", type=int, default=3, help="User turns per agent session")
+    parser.add_argument("--no-stream", action="store_true", help="Send non-streaming requests")
+    parser.add_argument("--port", type=int, default=8000, help="Port for --local-fake")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    base_url = start_local_fake_app(args.port) if args.local_fake else args.url
+    results = asyncio.run(run_load(
+        base_url,
+        concurrency=None if args.rate else args.concurrency,
+        rate=args.rate,
+        duration_s=args.duration,
+        turns=args.turns,
+        stream=not args.no_stream,
+        seed=args.seed,
+    ))
+
+    report = {
+        "target": "local-fake" if args.local_fake else args.url,
+        "mode": {"rate_rps": args.rate} if args.rate else {"concurrency": args.concurrency},
+        "stream": not args.no_stream,
+        **results.report(),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
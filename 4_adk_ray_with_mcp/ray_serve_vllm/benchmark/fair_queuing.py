@@ -0,0 +1,106 @@
+"""
+Simulate interactive and batch tenants sharing one replica's admission control.
+
+Interactive users arrive as a Poisson process with short completions, while a
+batch tenant keeps `--batch-concurrency` long requests outstanding at all
+times. Each admitted request holds an engine slot for its prefill and decode
+time. The interactive TTFT (queue wait plus prefill) is reported for the
+interactive tenant alone, and with the batch tenant under FIFO admission and
+under weighted fair queuing.
+
+    python -m benchmark.fair_queuing --duration 10 --batch-concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from typing import Any, Dict, List, Optional
+
+from admission import AdmissionController
+from benchmark.stats import summarize_ms
+
+FAIR_TENANTS = {
+    "interactive": {"weight": 8},
+    "batch": {"weight": 1, "max_running": 5},
+}
+
+
+async def run_request(
+    admission: AdmissionController, tenant: str, prefill_s: float, decode_s: float
+) -> float:
+    """Admit one request and hold its slot like the engine would; returns TTFT."""
+    start = time.perf_counter()
+    await admission.acquire(tenant)
+    try:
+        await asyncio.sleep(prefill_s)
+        ttft = time.perf_counter() - start
+        await asyncio.sleep(decode_s)
+    finally:
+        admission.release(time.perf_counter() - start, tenant=tenant)
+    return ttft
+
+
+async def scenario(args: argparse.Namespace, batch: bool, tenants: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    admission = AdmissionController(
+        max_running=args.max_running, max_queued=10_000, queue_timeout_s=3600, tenants=tenants
+    )
+
+    def tenant_of(name: str) -> str:
+        return name if tenants else "default"
+
+    deadline = time.perf_counter() + args.duration
+    interactive_ttft: List[float] = []
+    batch_done = 0
+
+    async def batch_worker():
+        nonlocal batch_done
+        while time.perf_counter() < deadline:
+            await run_request(admission, tenant_of("batch"), args.batch_prefill_ms / 1000, args.batch_decode_ms / 1000)
+            batch_done += 1
+
+    async def interactive_request():
+        interactive_ttft.append(await run_request(
+            admission, tenant_of("interactive"), args.interactive_prefill_ms / 1000, args.interactive_decode_ms / 1000
+        ))
+
+    workers = [asyncio.ensure_future(batch_worker()) for _ in range(args.batch_concurrency if batch else 0)]
+    requests = []
+    rng = random.Random(0)
+    while time.perf_counter() < deadline:
+        requests.append(asyncio.ensure_future(interactive_request()))
+        await asyncio.sleep(rng.expovariate(args.interactive_rate))
+    await asyncio.gather(*requests, *workers)
+
+    mode = "interactive-only" if not batch else ("fair" if tenants else "fifo")
+    return {
+        "mode": mode,
+        "interactive_requests": len(interactive_ttft),
+        "interactive_ttft_ms": summarize_ms(interactive_ttft),
+        "batch_requests_per_s": round(batch_done / args.duration, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--max-running", type=int, default=8)
+    parser.add_argument("--interactive-rate", type=float, default=10.0, help="Interactive requests per second")
+    parser.add_argument("--interactive-prefill-ms", type=float, default=20.0)
+    parser.add_argument("--interactive-decode-ms", type=float, default=150.0)
+    parser.add_argument("--batch-concurrency", type=int, default=64)
+    parser.add_argument("--batch-prefill-ms", type=float, default=50.0)
+    parser.add_argument("--batch-decode-ms", type=float, default=600.0)
+    args = parser.parse_args()
+
+    results = [
+        asyncio.run(scenario(args, batch=False, tenants=None)),
+        asyncio.run(scenario(args, batch=True, tenants=None)),
+        asyncio.run(scenario(args, batch=True, tenants=FAIR_TENANTS)),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import random
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmark.stats import summarize_ms
+from benchmark.traffic import conversation
+
+
+@dataclass
+class RequestResult:
+    status: int
+    ttft_s: Optional[float] = None
+    e2e_s: float = 0.0
+    output_tokens: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadResults:
+    results: List[RequestResult] = field(default_factory=list)
+    started: float = 0.0
+    finished: float = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        ok = [r for r in self.results if r.error is None]
+        errors: Dict[str, int] = {}
+        for r in self.results:
+            if r.error is not None:
+                errors[r.error] = errors.get(r.error, 0) + 1
+        elapsed = max(self.finished - self.started, 1e-9)
+        return {
+            "duration_s": round(elapsed, 3),
+            "requests": len(self.results),
+            "errors": len(self.results) - len(ok),
+            "error_rate": round((len(self.results) - len(ok)) / max(len(self.results), 1), 4),
+            "errors_by_kind": errors,
+            "throughput_rps": round(len(ok) / elapsed, 2),
+            "output_tokens_per_s": round(sum(r.output_tokens for r in ok) / elapsed, 2),
+            "ttft_ms": summarize_ms([r.ttft_s for r in ok if r.ttft_s is not None]),
+            "e2e_ms": summarize_ms([r.e2e_s for r in ok]),
+        }
+
+
+async def send_request(client: httpx.AsyncClient, url: str, body: Dict[str, Any], stream: bool) -> RequestResult:
+    body = {**body, "stream": stream}
+    if stream:
+        body["stream_options"] = {"include_usage": True}
+    start = time.perf_counter()
+    try:
+        if not stream:
+            response = await client.post(url, json=body)
+            if response.status_code != 200:
+                return RequestResult(status=response.status_code, e2e_s=time.perf_counter() - start, error=f"http_{response.status_code}")
+            usage = response.json().get("usage") or {}
+            return RequestResult(status=200, e2e_s=time.perf_counter() - start, output_tokens=usage.get("completion_tokens", 0))
+
+        result = RequestResult(status=0)
+        async with client.stream("POST", url, json=body) as response:
+            result.status = response.status_code
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"http_{response.status_code}"
+            else:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: ") or line == "data: [DONE]":
+                        continue
+                    if result.ttft_s is None:
+                        result.ttft_s = time.perf_counter() - start
+                    chunk = json.loads(line[len("data: "):])
+                    if chunk.get("usage") and not chunk.get("choices"):
+                        result.output_tokens = chunk["usage"].get("completion_tokens", 0)
+        result.e2e_s = time.perf_counter() - start
+        return result
+    except httpx.HTTPError as e:
+        return RequestResult(status=0, e2e_s=time.perf_counter() - start, error=type(e).__name__)
+
+
+def request_stream(seed: int, turns: int):
+    """Endless sequence of request bodies, one agent session after another."""
+    rng = random.Random(seed)
+    session = 0
+    while True:
+        yield from conversation(session, turns, rng)
+        session += 1
+
+
+async def run_load(
+    base_url: str,
+    concurrency: Optional[int] = None,
+    rate: Optional[float] = None,
+    duration_s: float = 30.0,
+    turns: int = 3,
+    stream: bool = True,
+    seed: int = 0,
+    timeout_s: float = 300.0,
+) -> LoadResults:
+    """
+    Replay agent traffic against /v1/chat/completions.
+
+    With `concurrency`, that many closed-loop virtual agents each send their
+    next request as soon as the previous one finishes. With `rate`, requests
+    arrive open-loop as a Poisson process of `rate` requests per second.
+    """
+    url = base_url.rstrip("/") + "/v1/chat/completions"
+    results = LoadResults()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    async with httpx.AsyncClient(timeout=timeout_s, limits=limits) as client:
+        results.started = time.perf_counter()
+        deadline = results.started + duration_s
+
+        async def record(body: Dict[str, Any]):
+            results.results.append(await send_request(client, url, body, stream))
+
+        if rate:
+            rng = random.Random(seed)
+            bodies = request_stream(seed, turns)
+            in_flight = set()
+            while time.perf_counter() < deadline:
+                task = asyncio.create_task(record(next(bodies)))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                await asyncio.sleep(rng.expovariate(rate))
+            if in_flight:
+                await asyncio.wait(in_flight)
+        else:
+            async def agent(worker: int):
+                for body in request_stream(seed + worker, turns):
+                    if time.perf_counter() >= deadline:
+                        return
+                    await record(body)
+
+            await asyncio.gather(*(agent(i) for i in range(concurrency or 1)))
+
+        results.finished = time.perf_counter()
+    return results
@@ -0,0 +1,137 @@
+"""
+Compare prefix-affinity routing with random routing over stub replicas.
+
+Each stub replica models vLLM prefix caching: it keeps an LRU of routing keys
+together with the number of prompt tokens cached for them, so a request only
+pays prefill for the tokens past its cached prefix. Affinity routing mirrors
+how Ray Serve schedules multiplexed requests for PrefixRouter.
+
+    python -m benchmark.prefix_routing --replicas 4 --sessions 16 --turns 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from benchmark.stats import percentile
+from benchmark.traffic import CITIES, MODEL, SYSTEM_INSTRUCTION, TOOLS
+from prefix_key import prefix_routing_key
+
+
+def approx_tokens(body: Dict[str, Any]) -> int:
+    """Rough prompt length, about four characters per token."""
+    return len(json.dumps(body)) // 4
+
+
+class StubReplica:
+    """A replica with bounded concurrency and an LRU prefix cache."""
+
+    def __init__(self, name: str, max_ongoing: int, cache_slots: int, prefill_ms_per_token: float, decode_ms: float):
+        self.name = name
+        self.max_ongoing = max_ongoing
+        self.cache_slots = cache_slots
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms = decode_ms
+        self.ongoing = 0
+        self.slots = asyncio.Semaphore(max_ongoing)
+        self.prefix_cache: "OrderedDict[str, int]" = OrderedDict()
+
+    async def handle(self, routing_key: str, prompt_tokens: int) -> bool:
+        self.ongoing += 1
+        try:
+            async with self.slots:
+                cached = self.prefix_cache.pop(routing_key, 0)
+                self.prefix_cache[routing_key] = prompt_tokens
+                if len(self.prefix_cache) > self.cache_slots:
+                    self.prefix_cache.popitem(last=False)
+                uncached = prompt_tokens - min(cached, prompt_tokens)
+                await asyncio.sleep((uncached * self.prefill_ms_per_token + self.decode_ms) / 1000)
+                return cached > 0
+        finally:
+            self.ongoing -= 1
+
+
+class RandomPolicy:
+    def __init__(self, replicas: List[StubReplica], rng: random.Random):
+        self.replicas = replicas
+        self.rng = rng
+
+    def choose(self, routing_key: str) -> StubReplica:
+        return self.rng.choice(self.replicas)
+
+
+class AffinityPolicy(RandomPolicy):
+    """Prefer replicas holding the key; otherwise the less loaded of two random replicas."""
+
+    def __init__(self, replicas: List[StubReplica], rng: random.Random):
+        super().__init__(replicas, rng)
+        self.holders: Dict[str, List[StubReplica]] = {}
+
+    def choose(self, routing_key: str) -> StubReplica:
+        holders = [r for r in self.holders.get(routing_key, []) if r.ongoing < r.max_ongoing]
+        if holders:
+            return min(holders, key=lambda r: r.ongoing)
+        replica = min(self.rng.sample(self.replicas, min(2, len(self.replicas))), key=lambda r: r.ongoing)
+        self.holders.setdefault(routing_key, []).append(replica)
+        return replica
+
+
+async def run_session(session: int, turns: int, policy: RandomPolicy, latencies: List[float], hits: List[bool]):
+    messages = [{"role": "system", "content": SYSTEM_INSTRUCTION}]
+    cities = list(CITIES)
+    for turn in range(turns):
+        city = cities[(session + turn) % len(cities)]
+        messages.append({"role": "user", "content": f"Session {session}: what's the forecast for {city}?"})
+        body = {"model": MODEL, "messages": list(messages), "tools": TOOLS}
+
+        routing_key = prefix_routing_key(body)
+        start = time.perf_counter()
+        hit = await policy.choose(routing_key).handle(routing_key, approx_tokens(body))
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append(hit)
+
+        messages.append({"role": "assistant", "content": f"It will be mild in {city} with light winds."})
+
+
+async def run_policy(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    replicas = [
+        StubReplica(f"replica-{i}", args.max_ongoing, args.cache_slots, args.prefill_ms_per_token, args.decode_ms)
+        for i in range(args.replicas)
+    ]
+    policy = AffinityPolicy(replicas, rng) if name == "affinity" else RandomPolicy(replicas, rng)
+
+    latencies: List[float] = []
+    hits: List[bool] = []
+    await asyncio.gather(*(run_session(s, args.turns, policy, latencies, hits) for s in range(args.sessions)))
+    return {
+        "policy": name,
+        "requests": len(latencies),
+        "prefix_hit_rate": round(sum(hits) / len(hits), 4),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--max-ongoing", type=int, default=5)
+    parser.add_argument("--cache-slots", type=int, default=8)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05)
+    parser.add_argument("--decode-ms", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_policy(name, args)) for name in ("random", "affinity")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare per-token SSE frames with coalesced frames.
+
+Streams a synthetic vLLM response (a tool call followed by a text answer) and
+reports frames sent, bytes sent and CPU per 1k tokens, separately for the
+transform in the replica and for the per-frame parsing a downstream proxy or
+ADK client performs.
+
+    python -m benchmark.sse_coalescing --tokens 1000 --coalesce-tokens 8
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from typing import Any, AsyncIterator, Dict, List
+
+from sse_coalescing import coalesce_sse
+
+
+def vllm_frames(tokens: int) -> List[str]:
+    """Frames shaped like OpenAIServingChat output, serialized one per token."""
+    def frame(delta: Dict[str, Any], finish_reason=None) -> str:
+        choice = {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}
+        chunk = {
+            "id": "chatcmpl-0123456789abcdef",
+            "object": "chat.completion.chunk",
+            "created": 1760000000,
+            "model": "meta-llama/Llama-3.1-8B-Instruct",
+            "choices": [choice],
+        }
+        return f"data: {json.dumps(chunk, separators=(',', ':'))}\n\n"
+
+    frames = [frame({"role": "assistant", "content": ""})]
+    frames.append(frame({"tool_calls": [{"index": 0, "id": "chatcmpl-tool-1", "type": "function",
+                                         "function": {"name": "get_forecast", "arguments": ""}}]}))
+    for piece in ['{"lat', 'itude"', ': 47.6', ', "lon', 'gitude', '": -12', '2.3}']:
+        frames.append(frame({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]}))
+    frames.extend(frame({"content": f" word{i}"}) for i in range(tokens))
+    frames.append(frame({}, finish_reason="stop"))
+    frames.append("data: [DONE]\n\n")
+    return frames
+
+
+async def replay(frames: List[str]) -> AsyncIterator[str]:
+    for frame in frames:
+        yield frame
+
+
+async def measure(frames: List[str], tokens: int, coalesce_tokens: int, coalesce_ms: float) -> Dict[str, Any]:
+    cpu_start = time.process_time()
+    stream = replay(frames)
+    if coalesce_tokens > 0:
+        stream = coalesce_sse(stream, max_tokens=coalesce_tokens, max_delay_s=coalesce_ms / 1000)
+    sent = [frame.encode() if isinstance(frame, str) else frame async for frame in stream]
+    transform_s = time.process_time() - cpu_start
+
+    cpu_start = time.process_time()
+    for data in sent:
+        payload = data[len(b"data: "):].strip()
+        if payload != b"[DONE]":
+            json.loads(payload)
+    parse_s = time.process_time() - cpu_start
+
+    per_1k = 1000 / tokens
+    return {
+        "mode": f"coalesce-{coalesce_tokens}" if coalesce_tokens > 0 else "per-token",
+        "frames_per_1k_tokens": round(len(sent) * per_1k, 1),
+        "bytes_per_1k_tokens": round(sum(len(data) for data in sent) * per_1k),
+        "transform_cpu_ms_per_1k_tokens": round(transform_s * 1000 * per_1k, 3),
+        "client_parse_cpu_ms_per_1k_tokens": round(parse_s * 1000 * per_1k, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--coalesce-tokens", type=int, default=8)
+    parser.add_argument("--coalesce-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=20, help="Streams per mode; CPU is the median")
+    args = parser.parse_args()
+
+    frames = vllm_frames(args.tokens)
+
+    async def run(coalesce_tokens: int) -> Dict[str, Any]:
+        results = [await measure(frames, args.tokens, coalesce_tokens, args.coalesce_ms) for _ in range(args.repeat)]
+        report = results[-1]
+        for key in ("transform_cpu_ms_per_1k_tokens", "client_parse_cpu_ms_per_1k_tokens"):
+            report[key] = round(statistics.median(r[key] for r in results), 3)
+        return report
+
+    print(json.dumps([asyncio.run(run(0)), asyncio.run(run(args.coalesce_tokens))], indent=2))
+
+
+if __name__ == "__main__":
+    main()
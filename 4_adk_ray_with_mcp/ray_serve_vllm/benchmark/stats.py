@@ -0,0 +1,16 @@
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize_ms(values_s: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 of latencies given in seconds, reported in milliseconds."""
+    return {
+        f"p{p}": None if percentile(values_s, p) is None else round(percentile(values_s, p) * 1000, 2)
+        for p in (50, 95, 99)
+    }
@@ -0,0 +1,103 @@
+"""Realistic ADK weather-agent traffic: multi-turn conversations with tool calls and tool results."""
+import json
+import random
+
+from typing import Any, Dict, List
+
+MODEL = "meta-llama/Llama-3.1-8B-Instruct"
+
+SYSTEM_INSTRUCTION = (
+    "You are a specialist AI assistant for weather.\n\n"
+    "Use your available tools to answer questions about weather.\n"
+    "Format your answers clearly using Markdown.\n"
+    "If you cannot find specific information, say so."
+)
+
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_forecast",
+            "description": "Get weather forecast for a location. Returns data as a JSON string.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "latitude": {"type": "number", "description": "Latitude of the location"},
+                    "longitude": {"type": "number", "description": "Longitude of the location"},
+                },
+                "required": ["latitude", "longitude"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_alerts",
+            "description": "Get weather alerts for a US state.",
+            "parameters": {
+                "type": "object",
+                "properties": {"state": {"type": "string", "description": "Two-letter US state code (e.g. CA, NY)"}},
+                "required": ["state"],
+            },
+        },
+    },
+]
+
+CITIES = {
+    "Seattle": (47.6062, -122.3321, "WA"),
+    "San Francisco": (37.7749, -122.4194, "CA"),
+    "New York": (40.7128, -74.0060, "NY"),
+    "Miami": (25.7617, -80.1918, "FL"),
+    "Chicago": (41.8781, -87.6298, "IL"),
+    "Denver": (39.7392, -104.9903, "CO"),
+    "Boston": (42.3601, -71.0589, "MA"),
+    "Austin": (30.2672, -97.7431, "TX"),
+}
+
+
+def forecast_result(city: str) -> str:
+    periods = [
+        {
+            "name": name,
+            "temperature": 50 + i * 3,
+            "temperatureUnit": "F",
+            "windSpeed": "5 to 10 mph",
+            "windDirection": "SW",
+            "shortForecast": "Partly Cloudy",
+            "detailedForecast": f"Partly cloudy in {city}, with a high near {50 + i * 3}. Southwest wind 5 to 10 mph.",
+        }
+        for i, name in enumerate(["Tonight", "Saturday", "Saturday Night", "Sunday", "Sunday Night"])
+    ]
+    return json.dumps(periods)
+
+
+def conversation(session: int, turns: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    The request bodies an ADK agent sends for one session.
+
+    Each user turn costs two LLM calls: one that answers with a tool call and
+    one that summarizes the tool result. Later turns resend the whole history.
+    """
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": SYSTEM_INSTRUCTION}]
+    requests = []
+    for turn in range(turns):
+        city = rng.choice(list(CITIES))
+        latitude, longitude, _ = CITIES[city]
+        messages.append({"role": "user", "content": f"What's the forecast for {city} this weekend?"})
+        requests.append({"model": MODEL, "messages": list(messages), "tools": TOOLS})
+
+        call_id = f"call_{session}_{turn}"
+        messages.append({
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [{
+                "id": call_id,
+                "type": "function",
+                "function": {"name": "get_forecast", "arguments": json.dumps({"latitude": latitude, "longitude": longitude})},
+            }],
+        })
+        messages.append({"role": "tool", "tool_call_id": call_id, "content": forecast_result(city)})
+        requests.append({"model": MODEL, "messages": list(messages), "tools": TOOLS})
+
+        messages.append({"role": "assistant", "content": f"The weekend in {city} looks partly cloudy with highs in the 50s."})
+    return requests
@@ -0,0 +1,185 @@
+"""
+Engine configuration and OpenAI serving setup shared by the Serve app and the
+offline batch_inference pipeline; importing it builds nothing.
+"""
+import argparse
+import json
+import logging
+import os
+import traceback
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from vllm.engine.arg_utils import AsyncEngineArgs
+from vllm.engine.async_llm_engine import AsyncLLMEngine
+from vllm.entrypoints.chat_utils import load_chat_template
+from vllm.entrypoints.openai.cli_args import make_arg_parser
+from vllm.entrypoints.openai.serving_chat import OpenAIServingChat
+from vllm.entrypoints.openai.serving_models import BaseModelPath, OpenAIServingModels
+
+from serve_metrics import instrument_tool_parser
+
+logger = logging.getLogger("ray.serve")
+
+
+async def create_openai_serving(
+    engine: AsyncLLMEngine,
+    engine_args: AsyncEngineArgs,
+    served_model_names: List[str],
+    chat_template: Optional[str],
+    enable_auto_tools: bool,
+    tool_parser_name: str,
+) -> Tuple[OpenAIServingModels, OpenAIServingChat]:
+    """Build the OpenAIServingModels and OpenAIServingChat pair on top of an engine."""
+    model_config = await engine.get_model_config()
+
+    logger.info(f"Initializing OpenAIServingModels (served names: {served_model_names})...")
+    models = OpenAIServingModels(
+        engine_client=engine,
+        model_config=model_config,
+        base_model_paths=[BaseModelPath(name=name, model_path=engine_args.model) for name in served_model_names],
+    )
+    logger.info("OpenAIServingModels initialized successfully.")
+
+    logger.info("Initializing OpenAIServingChat...")
+    serving_chat = OpenAIServingChat(
+        engine_client=engine,
+        model_config=model_config,
+        models=models,
+        request_logger=None,
+        chat_template=chat_template,
+        chat_template_content_format="auto",
+        enable_auto_tools=enable_auto_tools,
+        tool_parser=tool_parser_name,
+        response_role="assistant"
+    )
+    if serving_chat.tool_parser is not None:
+        serving_chat.tool_parser = instrument_tool_parser(serving_chat.tool_parser, served_model_names[0])
+    logger.info("OpenAIServingChat initialized successfully.")
+    return models, serving_chat
+
+
+def parse_vllm_args(cli_args: Dict[str, Any]):
+    """Parses vLLM AsyncEngineArgs args based on CLI inputs."""
+    parser = argparse.ArgumentParser()
+    make_arg_parser(parser)
+
+    arg_strings = []
+    for key, value in cli_args.items():
+        arg_strings.extend([f"--{key}", str(value)])
+    parsed_args = parser.parse_args(args=arg_strings)
+    return parsed_args
+
+
+def load_fake_engine_config() -> Optional[Dict[str, Any]]:
+    """FakeAsyncLLMEngine settings when VLLM_FAKE_ENGINE=true, for CPU-only benchmarking."""
+    if os.environ.get('VLLM_FAKE_ENGINE', 'false').lower() != 'true':
+        return None
+    return {
+        "prefill_s_per_token": float(os.environ.get('FAKE_ENGINE_PREFILL_S_PER_TOKEN', "0.00002")),
+        "decode_s": float(os.environ.get('FAKE_ENGINE_DECODE_S', "0.01")),
+        "output_tokens": int(os.environ.get('FAKE_ENGINE_OUTPUT_TOKENS', "32")),
+    }
+
+
+def load_model_config(default_model: str) -> Dict[str, Any]:
+    """
+    Served model aliases and LoRA adapters.
+
+    MODEL_CONFIG_PATH points at a JSON file like
+    `{"served_model_names": [...], "lora_modules": [{"name": ..., "path": ...}], "max_resident_loras": 8}`;
+    SERVED_MODEL_NAMES (comma separated) and LORA_MODULES (`name=path,...`) override it.
+    """
+    file_config: Dict[str, Any] = {}
+    path = os.environ.get('MODEL_CONFIG_PATH')
+    if path:
+        try:
+            with open(path) as f:
+                file_config = json.load(f)
+        except Exception as e:
+            error_msg = f"Failed to load model config from {path}: {str(e)}"
+            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise RuntimeError(error_msg) from e
+
+    served_model_names = file_config.get("served_model_names") or [default_model]
+    if os.environ.get('SERVED_MODEL_NAMES'):
+        served_model_names = [n.strip() for n in os.environ['SERVED_MODEL_NAMES'].split(",") if n.strip()]
+
+    adapters = {m["name"]: m["path"] for m in file_config.get("lora_modules", [])}
+    if os.environ.get('LORA_MODULES'):
+        adapters = {}
+        for module in os.environ['LORA_MODULES'].split(","):
+            name, sep, module_path = module.strip().partition("=")
+            if not sep or not name or not module_path:
+                raise ValueError(f"Invalid LORA_MODULES entry '{module}', expected name=path")
+            adapters[name] = module_path
+
+    return {
+        "served_model_names": served_model_names,
+        "adapters": adapters,
+        "max_resident": int(os.environ.get('MAX_RESIDENT_LORAS', file_config.get("max_resident_loras", 8))),
+        "max_lora_rank": int(os.environ.get('MAX_LORA_RANK', file_config.get("max_lora_rank", 16))),
+        "max_gpu_loras": int(os.environ.get('MAX_GPU_LORAS', file_config.get("max_gpu_loras", 4))),
+    }
+
+
+def load_engine_config() -> Dict[str, Any]:
+    """
+    Engine arguments, chat template, tool parsing and served models from the environment.
+
+    Shared by build_app and the offline batch_inference pipeline.
+    """
+    # Read configuration from environment variables
+    config = {
+        "model": os.environ.get('MODEL_ID', "meta-llama/Llama-3.1-8B-Instruct"),
+        "tensor-parallel-size": os.environ.get('TENSOR_PARALLELISM', "2"),
+        "max-model-len": os.environ.get("MAX_MODEL_LEN", "8192"),
+        "scheduling-policy": os.environ.get("SCHEDULING_POLICY", "fcfs"),
+    }
+    parsed_args = parse_vllm_args(config)
+    engine_args = AsyncEngineArgs.from_cli_args(parsed_args)
+
+    engine_args.worker_use_ray = True
+    engine_args.trust_remote_code = True
+    engine_args.enable_chunked_prefill = True
+
+    model_config = load_model_config(config["model"])
+    enable_lora = bool(model_config["adapters"]) or os.environ.get('ENABLE_LORA', 'false').lower() == 'true'
+    if enable_lora:
+        # Resident adapters are kept in CPU memory; the engine swaps up to
+        # max_loras of them onto the GPU per batch.
+        engine_args.enable_lora = True
+        engine_args.max_loras = model_config["max_gpu_loras"]
+        engine_args.max_lora_rank = model_config["max_lora_rank"]
+        engine_args.max_cpu_loras = max(model_config["max_resident"], model_config["max_gpu_loras"])
+        logger.info(
+            f"LoRA serving enabled: {len(model_config['adapters'])} adapters, "
+            f"max resident {model_config['max_resident']}, max per batch {model_config['max_gpu_loras']}"
+        )
+
+    enable_auto_tools_env = os.environ.get('VLLM_ENABLE_AUTO_TOOL_CHOICE', 'true')
+    tool_parser_name_env = os.environ.get('TOOL_PARSER_NAME', 'llama3_json')
+    chat_template_path = os.environ.get('CHAT_TEMPLATE_PATH')
+
+    # Load chat template if path exists
+    chat_template = None
+    if chat_template_path:
+        try:
+            logger.info(f"Loading chat template from: {chat_template_path}")
+            chat_template = load_chat_template(chat_template_path, is_literal=False)
+            logger.info("Chat template loaded successfully")
+        except Exception as e:
+            error_msg = f"Failed to load chat template from {chat_template_path}: {str(e)}"
+            logger.error(f"{error_msg}\n{traceback.format_exc()}")
+            raise RuntimeError(error_msg) from e
+    else:
+        logger.info("No chat template path provided, using default template")
+
+    return {
+        "engine_args": engine_args,
+        "chat_template": chat_template,
+        "enable_auto_tools": enable_auto_tools_env,
+        "tool_parser_name": tool_parser_name_env,
+        "served_model_names": model_config["served_model_names"],
+        "lora_config": {"adapters": model_config["adapters"], "max_resident": model_config["max_resident"]},
+    }
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from starlette.requests import Request
+
+from vllm.entrypoints.openai.protocol import (
+    ChatCompletionRequest,
+    ChatCompletionResponse,
+    ChatCompletionResponseChoice,
+    ChatCompletionResponseStreamChoice,
+    ChatCompletionStreamResponse,
+    ChatMessage,
+    DeltaFunctionCall,
+    DeltaMessage,
+    DeltaToolCall,
+    ErrorResponse,
+    FunctionCall,
+    LoadLoRAAdapterRequest,
+    ModelCard,
+    ModelList,
+    ToolCall,
+    UnloadLoRAAdapterRequest,
+    UsageInfo,
+)
+
+
+class FakeAsyncLLMEngine:
+    """
+    Deterministic stand-in for AsyncLLMEngine that needs neither a GPU nor model weights.
+
+    Each request sleeps for a prefill proportional to its prompt length and then
+    emits one token per decode step, so the Serve and FastAPI overhead of
+    VLLMDeployment can be measured on a CPU-only machine.
+    """
+
+    def __init__(self, prefill_s_per_token: float = 0.00002, decode_s: float = 0.01, output_tokens: int = 32):
+        self.prefill_s_per_token = prefill_s_per_token
+        self.decode_s = decode_s
+        self.output_tokens = output_tokens
+        self.aborted: Dict[str, float] = {}
+        self.routed: Dict[str, str] = {}
+        self._running: Dict[str, bool] = {}
+
+    async def generate(self, pieces: List[str], prompt_tokens: int, request_id: str, model: str) -> AsyncIterator[str]:
+        """Yield `pieces` one decode step apart, stopping early once aborted."""
+        self.routed[request_id] = model
+        self._running[request_id] = True
+        try:
+            await asyncio.sleep(prompt_tokens * self.prefill_s_per_token)
+            for piece in pieces:
+                if not self._running[request_id]:
+                    return
+                await asyncio.sleep(self.decode_s)
+                yield piece
+        finally:
+            del self._running[request_id]
+
+    async def abort(self, request_id: str):
+        if request_id in self._running:
+            self._running[request_id] = False
+            self.aborted[request_id] = time.perf_counter()
+
+
+class FakeServingModels:
+    """Mimics OpenAIServingModels: base model aliases plus runtime-loaded LoRA adapters."""
+
+    def __init__(self, base_model_names: List[str]):
+        self.base_model_names = list(base_model_names)
+        self.lora_adapters: Dict[str, str] = {}
+
+    def is_served(self, name: Optional[str]) -> bool:
+        return name is None or name in self.base_model_names or name in self.lora_adapters
+
+    async def load_lora_adapter(self, request: LoadLoRAAdapterRequest) -> Union[str, ErrorResponse]:
+        if request.lora_name in self.lora_adapters:
+            return ErrorResponse(
+                message=f"The lora adapter '{request.lora_name}' has already been loaded.",
+                type="InvalidUserInput", code=400,
+            )
+        self.lora_adapters[request.lora_name] = request.lora_path
+        return f"Success: LoRA adapter '{request.lora_name}' added successfully."
+
+    async def unload_lora_adapter(self, request: UnloadLoRAAdapterRequest) -> Union[str, ErrorResponse]:
+        if self.lora_adapters.pop(request.lora_name, None) is None:
+            return ErrorResponse(
+                message=f"The lora adapter '{request.lora_name}' cannot be found.",
+                type="NotFoundError", code=404,
+            )
+        return f"Success: LoRA adapter '{request.lora_name}' removed successfully."
+
+    async def show_available_models(self) -> ModelList:
+        names = self.base_model_names + list(self.lora_adapters)
+        return ModelList(data=[ModelCard(id=name, root=self.base_model_names[0]) for name in names])
+
+
+class FakeServingChat:
+    """
+    Mimics OpenAIServingChat on top of FakeAsyncLLMEngine.
+
+    A request whose last message comes from the user and that offers tools is
+    answered with a call to the first tool; anything else gets a plain text
+    answer. Chunks are serialized the same way vLLM does it.
+    """
+
+    def __init__(self, engine: FakeAsyncLLMEngine, models: FakeServingModels):
+        self.engine = engine
+        self.models = models
+        self.tool_parser = None
+
+    async def create_chat_completion(
+        self, request: ChatCompletionRequest, raw_request: Optional[Request] = None
+    ) -> Union[AsyncIterator[str], ChatCompletionResponse, ErrorResponse]:
+        request_id = request.request_id
+        if raw_request is not None:
+            request_id = raw_request.headers.get("X-Request-Id") or request_id
+        request_id = f"chatcmpl-{request_id}"
+        if not self.models.is_served(request.model):
+            return ErrorResponse(
+                message=f"The model `{request.model}` does not exist.", type="NotFoundError", code=404
+            )
+        model = request.model or self.models.base_model_names[0]
+
+        messages = [m if isinstance(m, dict) else dict(m) for m in request.messages]
+        prompt_tokens = len(json.dumps(messages, default=str)) // 4
+        tool_call = self._tool_call(request, messages)
+        max_tokens = request.max_tokens or request.max_completion_tokens or self.engine.output_tokens
+        if tool_call is not None:
+            arguments = tool_call.function.arguments
+            pieces = [arguments[i:i + 4] for i in range(0, len(arguments), 4)]
+        else:
+            pieces = [f" tok{i}" for i in range(max_tokens)]
+
+        tokens = self.engine.generate(pieces, prompt_tokens, request_id, model)
+        if request.stream:
+            return self._stream(request, request_id, model, tokens, tool_call, prompt_tokens)
+
+        completion_tokens = 0
+        text = ""
+        async for piece in tokens:
+            completion_tokens += 1
+            text += piece
+        if tool_call is not None:
+            message = ChatMessage(role="assistant", content="", tool_calls=[tool_call])
+        else:
+            message = ChatMessage(role="assistant", content=text)
+        return ChatCompletionResponse(
+            id=request_id,
+            model=model,
+            choices=[ChatCompletionResponseChoice(
+                index=0, message=message, finish_reason="tool_calls" if tool_call else "length"
+            )],
+            usage=UsageInfo(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    async def _stream(
+        self,
+        request: ChatCompletionRequest,
+        request_id: str,
+        model: str,
+        tokens: AsyncIterator[str],
+        tool_call: Optional[ToolCall],
+        prompt_tokens: int,
+    ) -> AsyncIterator[str]:
+        created = int(time.time())
+
+        def chunk(delta: DeltaMessage, finish_reason: Optional[str] = None) -> str:
+            response = ChatCompletionStreamResponse(
+                id=request_id,
+                created=created,
+                model=model,
+                choices=[ChatCompletionResponseStreamChoice(index=0, delta=delta, finish_reason=finish_reason)],
+            )
+            return f"data: {response.model_dump_json(exclude_unset=True)}\n\n"
+
+        completion_tokens = 0
+        async for piece in tokens:
+            if completion_tokens == 0:
+                yield chunk(DeltaMessage(role="assistant", content=""))
+                if tool_call is not None:
+                    yield chunk(DeltaMessage(tool_calls=[DeltaToolCall(
+                        index=0, id=tool_call.id, type="function",
+                        function=DeltaFunctionCall(name=tool_call.function.name, arguments=""),
+                    )]))
+            completion_tokens += 1
+            if tool_call is not None:
+                yield chunk(DeltaMessage(tool_calls=[DeltaToolCall(
+                    index=0, function=DeltaFunctionCall(arguments=piece)
+                )]))
+            else:
+                yield chunk(DeltaMessage(content=piece))
+
+        yield chunk(DeltaMessage(), finish_reason="tool_calls" if tool_call else "length")
+        if request.stream_options and request.stream_options.include_usage:
+            usage = ChatCompletionStreamResponse(
+                id=request_id,
+                created=created,
+                model=model,
+                choices=[],
+                usage=UsageInfo(
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    total_tokens=prompt_tokens + completion_tokens,
+                ),
+            )
+            yield f"data: {usage.model_dump_json(exclude_unset=True, exclude_none=True)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @staticmethod
+    def _tool_call(request: ChatCompletionRequest, messages: List[Dict[str, Any]]) -> Optional[ToolCall]:
+        if not request.tools or request.tool_choice == "none" or not messages or messages[-1].get("role") != "user":
+            return None
+        function = request.tools[0].function
+        properties = (function.parameters or {}).get("properties", {})
+        arguments = {
+            name: 47.6 if spec.get("type") == "number" else "Seattle"
+            for name, spec in properties.items()
+        }
+        return ToolCall(function=FunctionCall(name=function.name, arguments=json.dumps(arguments)))
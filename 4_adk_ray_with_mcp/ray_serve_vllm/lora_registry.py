@@ -0,0 +1,133 @@
+import asyncio
+import logging
+
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from vllm.entrypoints.openai.protocol import (
+    ErrorResponse,
+    LoadLoRAAdapterRequest,
+    UnloadLoRAAdapterRequest,
+)
+
+logger = logging.getLogger("ray.serve")
+
+
+class LoRAAdapterRegistry:
+    """
+    Known LoRA adapters plus a bounded LRU of the ones registered for serving.
+
+    Adapters are registered with OpenAIServingModels on first use and the least
+    recently used one is unregistered once more than `max_resident` are loaded.
+    A request naming an evicted adapter loads it again on demand, so the set of
+    adapters a replica can serve is not limited by how many it keeps resident.
+
+    Requests pin their adapter with `acquire` until `release`; pinned adapters
+    are never evicted, so the resident set can exceed `max_resident` while all
+    of them are in use.
+    """
+
+    def __init__(self, adapters: Dict[str, str], max_resident: int):
+        self.known: Dict[str, str] = dict(adapters)
+        self.max_resident = max_resident
+        self.resident: "OrderedDict[str, str]" = OrderedDict()
+        self.models: Any = None
+        self._lock = asyncio.Lock()
+        self._pins: Dict[str, int] = {}
+
+    async def bind(self, models: Any) -> Optional[ErrorResponse]:
+        """Attach the serving models and load the configured adapters, up to the LRU bound."""
+        self.models = models
+        for name in list(self.known)[:self.max_resident]:
+            error = await self.ensure_resident(name)
+            if error is not None:
+                return error
+        return None
+
+    async def acquire(self, name: Optional[str]) -> Optional[ErrorResponse]:
+        """Make sure a known adapter is loaded and keep it loaded until `release`."""
+        return await self.ensure_resident(name, pin=True)
+
+    def release(self, name: Optional[str]):
+        pins = self._pins.get(name, 0) - 1
+        if pins > 0:
+            self._pins[name] = pins
+        else:
+            self._pins.pop(name, None)
+
+    async def release_after(self, generator: AsyncIterator, name: Optional[str]) -> AsyncIterator:
+        """Keep the adapter pinned until a streamed response has been fully sent."""
+        try:
+            async for chunk in generator:
+                yield chunk
+        finally:
+            self.release(name)
+
+    async def ensure_resident(self, name: Optional[str], pin: bool = False) -> Optional[ErrorResponse]:
+        """Make sure a known adapter is loaded; other model names pass through untouched."""
+        if name not in self.known:
+            return None
+        # Nothing awaits between the check and the pin, so an eviction can't come in between.
+        if name not in self.resident:
+            async with self._lock:
+                if name not in self.resident:
+                    error = await self._load_resident(name)
+                    if error is not None:
+                        return error
+        self.resident.move_to_end(name)
+        if pin:
+            self._pins[name] = self._pins.get(name, 0) + 1
+        return None
+
+    async def _load_resident(self, name: str) -> Optional[ErrorResponse]:
+        path = self.known[name]
+        result = await self.models.load_lora_adapter(LoadLoRAAdapterRequest(lora_name=name, lora_path=path))
+        if isinstance(result, ErrorResponse):
+            logger.error(f"Failed to load LoRA adapter '{name}' from {path}: {result.message}")
+            return result
+        self.resident[name] = path
+        logger.info(f"Loaded LoRA adapter '{name}' from {path}")
+
+        # Evict only after the load succeeded, so a failed load leaves the resident set intact,
+        # and never an adapter that in-flight requests are using.
+        victims = [n for n in self.resident if n != name and not self._pins.get(n)]
+        while len(self.resident) > self.max_resident and victims:
+            victim = victims.pop(0)
+            if self._pins.get(victim):
+                continue  # pinned while the previous eviction was unloading
+            del self.resident[victim]
+            logger.info(f"Evicting LoRA adapter '{victim}' from the resident set")
+            await self.models.unload_lora_adapter(UnloadLoRAAdapterRequest(lora_name=victim))
+        return None
+
+    async def load(self, name: str, path: str) -> Optional[ErrorResponse]:
+        """Register (or re-point) an adapter at runtime and load it; a failed load registers nothing."""
+        previous = self.known.get(name)
+        if previous is not None and previous != path:
+            await self.unload(name)
+        self.known[name] = path
+        error = await self.ensure_resident(name)
+        if error is not None:
+            if previous is None:
+                del self.known[name]
+            else:
+                self.known[name] = previous
+        return error
+
+    async def unload(self, name: str) -> Optional[ErrorResponse]:
+        async with self._lock:
+            if self.known.pop(name, None) is None:
+                return ErrorResponse(message=f"Unknown LoRA adapter '{name}'", type="NotFoundError", code=404)
+            if self.resident.pop(name, None) is not None:
+                result = await self.models.unload_lora_adapter(UnloadLoRAAdapterRequest(lora_name=name))
+                if isinstance(result, ErrorResponse):
+                    return result
+        return None
+
+    def stats(self) -> Dict[str, Union[int, List[str]]]:
+        return {
+            "max_resident": self.max_resident,
+            "resident": list(self.resident),
+            "pinned": list(self._pins),
+            "known": list(self.known),
+        }
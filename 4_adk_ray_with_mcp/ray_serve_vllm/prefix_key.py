@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+from typing import Any, Dict, Optional
+
+
+def prefix_routing_key(body: Dict[str, Any], session_id: Optional[str] = None, prefix_messages: int = 1) -> str:
+    """
+    Derive the routing key for a chat completion request body.
+
+    Requests sharing a key are sent to the same replica, where vLLM's prefix
+    cache already holds their KV blocks. An explicit session id (the
+    X-Session-Id header) wins; otherwise the key covers the model, the tool
+    schemas, the leading system messages and the first `prefix_messages`
+    conversation messages, which stay byte-identical across the turns of an
+    ADK session.
+    """
+    if session_id:
+        return "session-" + hashlib.sha256(session_id.encode()).hexdigest()[:16]
+
+    messages = body.get("messages") or []
+    prefix = []
+    for message in messages:
+        if message.get("role") != "system":
+            break
+        prefix.append(message)
+    prefix.extend(messages[len(prefix):len(prefix) + prefix_messages])
+
+    canonical = json.dumps(
+        {"model": body.get("model"), "tools": body.get("tools"), "messages": prefix},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return "prefix-" + hashlib.sha256(canonical.encode()).hexdigest()[:16]
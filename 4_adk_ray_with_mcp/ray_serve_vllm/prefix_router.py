@@ -0,0 +1,87 @@
+import logging
+import traceback
+
+from fastapi import FastAPI
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from ray import serve
+from ray.serve.handle import DeploymentHandle
+
+from vllm.entrypoints.openai.protocol import ErrorResponse
+
+from prefix_key import prefix_routing_key
+
+logger = logging.getLogger("ray.serve")
+
+SESSION_ID_HEADER = "x-session-id"
+
+# Serve allows one docs page per application; the replica's, which documents the
+# OpenAI routes, is reached through the catch-all forward route.
+router_app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+
+@router_app.get("/-/healthz")
+async def router_health_check():
+    """Basic liveness check for the routing ingress."""
+    return {"status": "success"}
+
+
+@serve.deployment(name="PrefixRouter")
+@serve.ingress(router_app)
+class PrefixRouter:
+    """
+    Ingress that pins requests sharing a prompt prefix to one VLLMDeployment replica.
+
+    The routing key is passed as the Serve multiplexed model id. Serve prefers
+    replicas that already registered that id and, when all of them are at
+    `max_ongoing_requests`, falls back to the least loaded of two random
+    replicas, which then registers the key as well. Every other route
+    (/metrics, /v1/models, the stats and LoRA admin routes) goes to any one
+    replica, as it would without this ingress.
+    """
+
+    def __init__(self, llm: DeploymentHandle, prefix_messages: int = 1):
+        self.llm = llm
+        self.prefix_messages = prefix_messages
+
+    @router_app.post("/v1/chat/completions")
+    async def create_chat_completion(self, raw_request: Request):
+        """Forward an OpenAI chat request to the replica owning its prefix."""
+        body = await raw_request.json()
+        routing_key = prefix_routing_key(
+            body, raw_request.headers.get(SESSION_ID_HEADER), self.prefix_messages
+        )
+
+        try:
+            response_gen = self.llm.options(
+                multiplexed_model_id=routing_key, stream=True
+            ).generate.remote(body, dict(raw_request.headers))
+            meta = await response_gen.__anext__()
+        except Exception as e:
+            logger.error(f"Error forwarding request with routing key {routing_key}: {str(e)}\n{traceback.format_exc()}")
+            return JSONResponse(
+                content=ErrorResponse(message=f"Routing error: {str(e)}", type="ServiceUnavailable", code=503).model_dump(),
+                status_code=503
+            )
+
+        return StreamingResponse(
+            content=response_gen,
+            status_code=meta["status_code"],
+            headers=meta["headers"],
+        )
+
+    @router_app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE"])
+    async def forward(self, path: str, raw_request: Request):
+        """Forward any other request to a VLLMDeployment replica's own route."""
+        try:
+            result = await self.llm.forward.remote(
+                raw_request.method, raw_request.url.path, raw_request.url.query,
+                dict(raw_request.headers), await raw_request.body(),
+            )
+        except Exception as e:
+            logger.error(f"Error forwarding {raw_request.method} /{path}: {str(e)}\n{traceback.format_exc()}")
+            return JSONResponse(
+                content=ErrorResponse(message=f"Routing error: {str(e)}", type="ServiceUnavailable", code=503).model_dump(),
+                status_code=503
+            )
+        return Response(content=result["body"], status_code=result["status_code"], headers=result["headers"])
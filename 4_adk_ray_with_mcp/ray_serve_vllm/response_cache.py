@@ -0,0 +1,127 @@
+import hashlib
+import json
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from vllm.entrypoints.openai.protocol import ChatCompletionRequest
+
+CACHE_STATUS_HEADER = "X-Response-Cache"
+
+# Fields that differ between otherwise identical requests without changing the output.
+_KEY_EXCLUDED_FIELDS = {"request_id"}
+
+
+@dataclass
+class CachedResponse:
+    """A finished chat completion: a JSON body or the SSE frames of a stream."""
+    body: Optional[bytes] = None
+    frames: Optional[List[Union[str, bytes]]] = None
+    size: int = 0
+    expires_at: float = 0.0
+
+
+class ResponseCache:
+    """
+    In-replica LRU cache of deterministic chat completions.
+
+    Only requests that produce the same output every time are cached: a single
+    choice with `temperature=0` or an explicit `seed`. Streaming and non-streaming
+    requests are cached separately, so hits are replayed in the format the client
+    asked for. Clients skip the cache with `Cache-Control: no-cache` (don't read)
+    or `Cache-Control: no-store` (don't read or write).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_s: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(request: ChatCompletionRequest) -> Optional[str]:
+        """Canonical hash of the request, or None when its output isn't deterministic."""
+        if (request.n or 1) != 1:
+            return None
+        if request.temperature != 0 and request.seed is None:
+            return None
+        canonical = json.dumps(
+            request.model_dump(mode="json", exclude=_KEY_EXCLUDED_FIELDS),
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def cache_control(headers) -> Dict[str, bool]:
+        """Whether the client allows reading from and writing to the cache."""
+        directives = {d.strip().lower() for d in headers.get("cache-control", "").split(",")}
+        no_store = "no-store" in directives
+        return {"read": not no_store and "no-cache" not in directives, "write": not no_store}
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, body: Optional[bytes] = None, frames: Optional[List[Union[str, bytes]]] = None):
+        size = len(body) if body is not None else sum(len(f) for f in frames or [])
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CachedResponse(
+            body=body, frames=frames, size=size, expires_at=time.monotonic() + self.ttl_s
+        )
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def record_stream(
+        self, key: str, generator: AsyncIterator[Union[str, bytes]]
+    ) -> AsyncIterator[Union[str, bytes]]:
+        """Pass SSE frames through, caching them once the stream finished cleanly."""
+        frames: List[Union[str, bytes]] = []
+        async for frame in generator:
+            frames.append(frame)
+            yield frame
+        if frames and _as_text(frames[-1]).startswith("data: [DONE]") and not any(
+            _as_text(f).startswith('data: {"error"') for f in frames
+        ):
+            self.put(key, frames=frames)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+
+def _as_text(frame: Union[str, bytes]) -> str:
+    return frame.decode() if isinstance(frame, bytes) else frame
+
+
+async def replay_frames(frames: List[Union[str, bytes]]) -> AsyncIterator[Union[str, bytes]]:
+    for frame in frames:
+        yield frame
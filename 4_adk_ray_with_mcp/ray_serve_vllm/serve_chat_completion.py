@@ -1,28 +1,45 @@
 import os
 import logging
 import sys
-import argparse
+import asyncio
+import json
+import time
 import traceback
 
-from typing import Dict, Optional, Any
+from typing import AsyncGenerator, Dict, List, Optional, Any
+
+import httpx
 
 from fastapi import FastAPI
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from starlette.requests import Request
-from starlette.responses import StreamingResponse, JSONResponse
+from starlette.responses import Response, StreamingResponse, JSONResponse
 
 from ray import serve
 
 from vllm.engine.arg_utils import AsyncEngineArgs
 from vllm.engine.async_llm_engine import AsyncLLMEngine
-from vllm.entrypoints.chat_utils import load_chat_template
-from vllm.entrypoints.openai.cli_args import make_arg_parser
 from vllm.entrypoints.openai.protocol import (
     ChatCompletionRequest,
     ChatCompletionResponse,
     ErrorResponse,
+    LoadLoRAAdapterRequest,
+    StreamOptions,
+    UnloadLoRAAdapterRequest,
 )
 from vllm.entrypoints.openai.serving_chat import OpenAIServingChat
-from vllm.entrypoints.openai.serving_models import OpenAIServingModels, BaseModelPath
+from vllm.entrypoints.openai.serving_models import OpenAIServingModels
+
+from admission import AdmissionController, OverloadedError
+from engine_config import create_openai_serving, load_engine_config, load_fake_engine_config
+from fake_engine import FakeAsyncLLMEngine, FakeServingChat, FakeServingModels
+from lora_registry import LoRAAdapterRegistry
+from prefix_router import PrefixRouter
+from response_cache import CACHE_STATUS_HEADER, ResponseCache, replay_frames
+from sse_coalescing import coalesce_sse
+# Deployment methods only touch metrics through RequestMetrics: serve.ingress pickles
+# them with the globals they use, and prometheus metrics hold locks.
+from serve_metrics import RequestMetrics
 
 logger = logging.getLogger("ray.serve")
 handler = logging.StreamHandler(sys.stdout)
@@ -33,6 +50,51 @@ if not logger.handlers:
     logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# Header naming the tenant a request is scheduled as; the request's `user` field is the fallback.
+# Names that aren't configured tenants are scheduled as the default tenant.
+TENANT_HEADER = "X-Tenant-Id"
+
+# Headers describing one HTTP hop, dropped when PrefixRouter forwards a request to a replica's route.
+HOP_BY_HOP_HEADERS = {"host", "connection", "content-length", "transfer-encoding", "keep-alive"}
+
+# Requests replayed against every replica before it is reported ready. The tool
+# request goes through the chat template and the tool parser (streaming and
+# non-streaming), so the first real agent turn doesn't pay for their setup.
+DEFAULT_WARMUP_REQUESTS: List[Dict[str, Any]] = [
+    {
+        "messages": [{"role": "user", "content": "Hello!"}],
+        "max_tokens": 8,
+    },
+    {
+        "messages": [
+            {"role": "system", "content": "You are a weather assistant."},
+            {"role": "user", "content": "What's the weather like in Seattle?"},
+        ],
+        "tools": [
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_current_weather",
+                    "description": "Get current weather for a city.",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "city": {"type": "string", "description": "The city name, e.g., 'Seattle'"},
+                        },
+                        "required": ["city"],
+                    },
+                },
+            }
+        ],
+        "tool_choice": "auto",
+        "max_tokens": 32,
+    },
+]
+
+# Number of prompt prefixes a replica advertises to PrefixRouter before the
+# least recently used one is released to other replicas.
+PREFIX_SLOTS_PER_REPLICA = int(os.environ.get("PREFIX_SLOTS_PER_REPLICA", "256"))
+
 app = FastAPI()
 
 @app.get("/-/healthz")
@@ -40,6 +102,32 @@ async def global_health_check():
     """Basic liveness check for the FastAPI application server."""
     return {"status": "success"}
 
+def request_from_headers(headers: Dict[str, str]) -> Request:
+    """
+    Build a Starlette request carrying `headers` for calls that arrive through a
+    DeploymentHandle. Client disconnects reach these calls as cancellation, so
+    the receive channel never reports one.
+    """
+    async def receive():
+        await asyncio.Event().wait()
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/v1/chat/completions",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+    }
+    return Request(scope, receive)
+
+
+async def wait_for_disconnect(raw_request: Request):
+    """Return once the client has gone away."""
+    while True:
+        message = await raw_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
 @serve.deployment(name="VLLMDeployment")
 @serve.ingress(app)
 class VLLMDeployment:
@@ -49,21 +137,248 @@ class VLLMDeployment:
         chat_template: Optional[str] = None,
         enable_auto_tools: bool = True,
         tool_parser_name: str = "llama3_json",
+        warmup_requests: Optional[List[Dict[str, Any]]] = None,
+        response_cache_config: Optional[Dict[str, Any]] = None,
+        admission_config: Optional[Dict[str, Any]] = None,
+        fake_engine_config: Optional[Dict[str, Any]] = None,
+        sse_coalesce_config: Optional[Dict[str, Any]] = None,
+        served_model_names: Optional[List[str]] = None,
+        lora_config: Optional[Dict[str, Any]] = None,
+        admin_api_key: Optional[str] = None,
     ):
+        # serve.ingress calls the constructor synchronously, so the async part of
+        # startup runs from the first health check, which Ray Serve awaits before
+        # routing any traffic to the replica.
         logger.info(f"Starting VLLMDeployment with engine args: {engine_args}")
 
         self.engine_args = engine_args
         self.chat_template = chat_template
         self.enable_auto_tools = enable_auto_tools
         self.tool_parser_name = tool_parser_name
-
-        logger.info("Initializing AsyncLLMEngine...")
-        self.engine = AsyncLLMEngine.from_engine_args(engine_args)
-        logger.info("AsyncLLMEngine initialized successfully")
+        self.served_model_names = served_model_names or [engine_args.model]
+        self.lora_registry = LoRAAdapterRegistry(**(lora_config or {"adapters": {}, "max_resident": 8}))
+        self.admin_api_key = admin_api_key
 
         self.openai_serving_chat: Optional[OpenAIServingChat] = None
         self.models: Optional[OpenAIServingModels] = None
+        self._init_lock = asyncio.Lock()
+        self.response_cache: Optional[ResponseCache] = (
+            ResponseCache(**response_cache_config) if response_cache_config is not None else None
+        )
+        self.sse_coalesce_config = sse_coalesce_config
+        self.admission: Optional[AdmissionController] = (
+            AdmissionController(**admission_config) if admission_config is not None else None
+        )
+        self.priority_scheduling = getattr(engine_args, "scheduling_policy", "fcfs") == "priority"
 
+        self.warmup_requests = DEFAULT_WARMUP_REQUESTS if warmup_requests is None else warmup_requests
+        self._ready: Optional[asyncio.Future] = None
+
+        start = time.perf_counter()
+        if fake_engine_config is not None:
+            logger.info(f"Using FakeAsyncLLMEngine: {fake_engine_config}")
+            self.engine = FakeAsyncLLMEngine(**fake_engine_config)
+        else:
+            logger.info("Initializing AsyncLLMEngine...")
+            self.engine = AsyncLLMEngine.from_engine_args(engine_args)
+            logger.info("AsyncLLMEngine initialized successfully")
+        logger.info(f"Engine initialized in {time.perf_counter() - start:.2f}s")
+
+    async def check_health(self):
+        """Finish startup on the first call; the replica stays unhealthy until it has."""
+        if self._ready is None:
+            self._ready = asyncio.ensure_future(self._start())
+        await self._ready
+
+    async def _start(self):
+        start = time.perf_counter()
+        await self._ensure_serving()
+        serving_done = time.perf_counter()
+
+        await self._warmup(self.warmup_requests)
+        warmup_done = time.perf_counter()
+
+        logger.info(
+            f"VLLMDeployment ready: serving_objects={serving_done - start:.2f}s, "
+            f"warmup={warmup_done - serving_done:.2f}s"
+        )
+
+    async def _ensure_serving(self) -> OpenAIServingChat:
+        """Build the OpenAI serving objects exactly once, even under concurrent callers."""
+        if self.openai_serving_chat is not None:
+            return self.openai_serving_chat
+
+        async with self._init_lock:
+            if self.openai_serving_chat is not None:
+                return self.openai_serving_chat
+
+            if isinstance(self.engine, FakeAsyncLLMEngine):
+                self.models = FakeServingModels(self.served_model_names)
+                await self._bind_lora_adapters()
+                self.openai_serving_chat = FakeServingChat(self.engine, self.models)
+                return self.openai_serving_chat
+
+            self.models, self.openai_serving_chat = await create_openai_serving(
+                self.engine,
+                self.engine_args,
+                self.served_model_names,
+                self.chat_template,
+                self.enable_auto_tools,
+                self.tool_parser_name,
+            )
+            await self._bind_lora_adapters()
+
+        return self.openai_serving_chat
+
+    async def _bind_lora_adapters(self):
+        error = await self.lora_registry.bind(self.models)
+        if error is not None:
+            raise RuntimeError(f"Failed to load LoRA adapters: {error.message}")
+
+    async def _warmup(self, warmup_requests: List[Dict[str, Any]]):
+        """Run each warmup request once non-streaming and once streaming."""
+        serving_chat = await self._ensure_serving()
+        for i, payload in enumerate(warmup_requests):
+            for stream in (False, True):
+                request = ChatCompletionRequest(
+                    **{"model": self.served_model_names[0], **payload, "stream": stream}
+                )
+                start = time.perf_counter()
+                try:
+                    result = await serving_chat.create_chat_completion(request, None)
+                    if isinstance(result, ErrorResponse):
+                        logger.warning(f"Warmup request {i} (stream={stream}) returned an error: {result.message}")
+                        continue
+                    if stream:
+                        async for _ in result:
+                            pass
+                except Exception as e:
+                    logger.warning(f"Warmup request {i} (stream={stream}) failed: {str(e)}\n{traceback.format_exc()}")
+                    continue
+                logger.info(f"Warmup request {i} (stream={stream}) completed in {time.perf_counter() - start:.2f}s")
+
+
+    @serve.multiplexed(max_num_models_per_replica=PREFIX_SLOTS_PER_REPLICA)
+    async def _pin_prefix(self, routing_key: str) -> str:
+        """Advertise a PrefixRouter routing key on this replica; nothing is loaded."""
+        return routing_key
+
+    async def generate(self, body: Dict[str, Any], headers: Dict[str, str]) -> AsyncGenerator[Any, None]:
+        """
+        DeploymentHandle entrypoint used by PrefixRouter.
+
+        Yields the response status and headers first, followed by the body chunks.
+        """
+        routing_key = serve.get_multiplexed_model_id()
+        if routing_key:
+            await self._pin_prefix(routing_key)
+
+        response = await self.create_chat_completion(
+            ChatCompletionRequest(**body), request_from_headers(headers)
+        )
+        yield {"status_code": response.status_code, "headers": dict(response.headers)}
+        if isinstance(response, StreamingResponse):
+            async for chunk in response.body_iterator:
+                yield chunk
+        else:
+            yield response.body
+
+    async def forward(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        """
+        DeploymentHandle entrypoint PrefixRouter sends every route but chat completions to.
+
+        Runs the request through this replica's own routes and returns the status, headers and body.
+        """
+        headers = {k: v for k, v in headers.items() if k.lower() not in HOP_BY_HOP_HEADERS}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replica") as client:
+            response = await client.request(method, f"{path}?{query}" if query else path, headers=headers, content=body)
+        return {
+            "status_code": response.status_code,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS},
+            "body": response.content,
+        }
+
+    @app.get("/metrics")
+    async def metrics(self):
+        """Prometheus metrics of this replica, including vLLM's engine metrics."""
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    @app.get("/-/response-cache")
+    async def response_cache_stats(self):
+        """Hit, miss and eviction counters of this replica's response cache."""
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.stats()}
+
+    @app.get("/-/admission")
+    async def admission_stats(self):
+        """Running and queued requests of this replica, per tenant."""
+        if self.admission is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "running": self.admission.running,
+            "queued": self.admission.queued,
+            "tenants": self.admission.stats(),
+        }
+
+    @app.get("/v1/models")
+    async def show_available_models(self):
+        """Base model aliases and the LoRA adapters currently registered on this replica."""
+        await self._ensure_serving()
+        models = await self.models.show_available_models()
+        return JSONResponse(content=models.model_dump())
+
+    @app.get("/-/lora-adapters")
+    async def lora_adapter_stats(self):
+        """Known and resident LoRA adapters of this replica."""
+        return self.lora_registry.stats()
+
+    @app.post("/v1/load_lora_adapter")
+    async def load_lora_adapter(self, request: LoadLoRAAdapterRequest, raw_request: Request):
+        """
+        Register a LoRA adapter (or point an existing name at a new path) and load it.
+
+        Applies to the one replica that handles the call; adapters every replica
+        should serve belong in LORA_MODULES or MODEL_CONFIG_PATH.
+        """
+        denied = self._check_admin(raw_request)
+        if denied is not None:
+            return denied
+        await self._ensure_serving()
+        error = await self.lora_registry.load(request.lora_name, request.lora_path)
+        if error is not None:
+            return JSONResponse(content=error.model_dump(), status_code=error.code)
+        return Response(content=f"Success: LoRA adapter '{request.lora_name}' added successfully.", status_code=200)
+
+    @app.post("/v1/unload_lora_adapter")
+    async def unload_lora_adapter(self, request: UnloadLoRAAdapterRequest, raw_request: Request):
+        """Forget a LoRA adapter and unload it if it is resident, on the replica that handles the call."""
+        denied = self._check_admin(raw_request)
+        if denied is not None:
+            return denied
+        await self._ensure_serving()
+        error = await self.lora_registry.unload(request.lora_name)
+        if error is not None:
+            return JSONResponse(content=error.model_dump(), status_code=error.code)
+        return Response(content=f"Success: LoRA adapter '{request.lora_name}' removed successfully.", status_code=200)
+
+    def _check_admin(self, raw_request: Request) -> Optional[JSONResponse]:
+        """Reject admin calls without the configured bearer token; all of them when no key is set."""
+        if self.admin_api_key is None:
+            return JSONResponse(
+                content=ErrorResponse(
+                    message="LoRA admin routes are disabled; set ADMIN_API_KEY to enable them",
+                    type="Forbidden", code=403,
+                ).model_dump(),
+                status_code=403,
+            )
+        if raw_request.headers.get("authorization") == f"Bearer {self.admin_api_key}":
+            return None
+        return JSONResponse(
+            content=ErrorResponse(message="Unauthorized", type="Unauthorized", code=401).model_dump(),
+            status_code=401,
+        )
 
     @app.post("/v1/chat/completions")
     async def create_chat_completion(
@@ -71,41 +386,140 @@ class VLLMDeployment:
     ):
         """Handle chat requests with OpenAI-compatible response format."""
 
-        if not self.openai_serving_chat:
-            try:
-                model_config = await self.engine.get_model_config()
-                model = self.engine_args.model
+        cache_key = None
+        if self.response_cache is not None:
+            cache_key = self.response_cache.make_key(request)
+            cache_control = ResponseCache.cache_control(raw_request.headers)
+            if cache_key and cache_control["read"]:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    if cached.frames is not None:
+                        return StreamingResponse(
+                            content=replay_frames(cached.frames),
+                            media_type="text/event-stream",
+                            headers={CACHE_STATUS_HEADER: "HIT"},
+                        )
+                    return Response(
+                        content=cached.body, media_type="application/json", headers={CACHE_STATUS_HEADER: "HIT"}
+                    )
+            if not cache_control["write"]:
+                cache_key = None
 
-                logger.info("Initializing OpenAIServingModels...")
-                self.models = OpenAIServingModels(
-                    engine_client=self.engine,
-                    model_config=model_config,
-                    base_model_paths=[BaseModelPath(name=model, model_path=model)],
-                )
-                logger.info("OpenAIServingModels initialized successfully.")
-
-                logger.info("Initializing OpenAIServingChat...")
-                self.openai_serving_chat = OpenAIServingChat(
-                    engine_client=self.engine,
-                    model_config=model_config,
-                    models=self.models,
-                    request_logger=None,
-                    chat_template=self.chat_template,
-                    chat_template_content_format="auto",
-                    enable_auto_tools=self.enable_auto_tools,
-                    tool_parser=self.tool_parser_name,
-                    response_role="assistant"
-                )
-                logger.info("OpenAIServingChat initialized successfully.")
+        metrics = RequestMetrics(self._model_label(request.model), request.stream)
+        if self.admission is None:
+            return await self._serve_chat_completion(request, raw_request, metrics, cache_key)
 
-            except Exception as e:
-                logger.error(f"Error during initialization: {str(e)}\n{traceback.format_exc()}")
-                return JSONResponse(
-                    content=ErrorResponse(message=f"Server initialization error: {str(e)}", type="InternalServerError", code=500).model_dump(),
-                    status_code=500
-                )
-        
-        generator = await self.openai_serving_chat.create_chat_completion(request, raw_request)
+        tenant = self.admission.tenant_for(raw_request.headers.get(TENANT_HEADER) or request.user)
+        if self.priority_scheduling:
+            # The tenant's priority is a floor; clients may only deprioritize themselves.
+            request.priority = max(request.priority, self.admission.policy(tenant).priority)
+
+        try:
+            await self.admission.acquire(tenant)
+        except OverloadedError as e:
+            logger.warning(
+                f"Shedding request of tenant '{tenant}': {str(e)} "
+                f"(running={self.admission.running}, queued={self.admission.queued})"
+            )
+            metrics.shed()
+            return JSONResponse(
+                content=ErrorResponse(message=str(e), type="TooManyRequests", code=429).model_dump(),
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+        try:
+            response = await self._serve_chat_completion(request, raw_request, metrics, cache_key)
+        except BaseException:
+            self.admission.release(tenant=tenant)
+            raise
+        if isinstance(response, StreamingResponse):
+            response.body_iterator = self.admission.release_after(response.body_iterator, metrics.start, tenant)
+        else:
+            self.admission.release(time.perf_counter() - metrics.start, tenant=tenant)
+        return response
+
+    def _model_label(self, model: Optional[str]) -> str:
+        """Metrics label of a requested model; names this replica doesn't serve share "unknown"."""
+        if not model:
+            return self.served_model_names[0]
+        if model in self.served_model_names or model in self.lora_registry.known:
+            return model
+        return "unknown"
+
+    async def _serve_chat_completion(
+        self,
+        request: ChatCompletionRequest,
+        raw_request: Request,
+        metrics: RequestMetrics,
+        cache_key: Optional[str],
+    ) -> Response:
+        """Run an admitted request through OpenAIServingChat."""
+        try:
+            serving_chat = await self._ensure_serving()
+        except Exception as e:
+            logger.error(f"Error during initialization: {str(e)}\n{traceback.format_exc()}")
+            return JSONResponse(
+                content=ErrorResponse(message=f"Server initialization error: {str(e)}", type="InternalServerError", code=500).model_dump(),
+                status_code=500
+            )
+
+        # Requests naming an adapter that was evicted from the resident set load it again here,
+        # and keep it from being evicted until their response has been sent.
+        lora_error = await self.lora_registry.acquire(request.model)
+        if lora_error is not None:
+            return JSONResponse(content=lora_error.model_dump(), status_code=lora_error.code)
+
+        try:
+            response = await self._run_chat_completion(serving_chat, request, raw_request, metrics, cache_key)
+        except BaseException:
+            self.lora_registry.release(request.model)
+            raise
+        if isinstance(response, StreamingResponse):
+            response.body_iterator = self.lora_registry.release_after(response.body_iterator, request.model)
+        else:
+            self.lora_registry.release(request.model)
+        return response
+
+    async def _run_chat_completion(
+        self,
+        serving_chat: Any,
+        request: ChatCompletionRequest,
+        raw_request: Request,
+        metrics: RequestMetrics,
+        cache_key: Optional[str],
+    ) -> Response:
+        """Hand a request to the engine and build its response."""
+        # Token counts of a stream only arrive in its usage chunk, so ask for it
+        # and strip it again for clients that didn't.
+        strip_usage = False
+        if request.stream and not (request.stream_options and request.stream_options.include_usage):
+            if request.stream_options is None:
+                request.stream_options = StreamOptions()
+            request.stream_options.include_usage = True
+            strip_usage = True
+
+        # Same id OpenAIServingChat hands to the engine, so the request can be aborted.
+        engine_request_id = f"chatcmpl-{raw_request.headers.get('X-Request-Id') or request.request_id}"
+
+        # A non-streaming completion only returns once generation has finished, so
+        # race it against the client going away (or Serve cancelling the request).
+        metrics.dispatched()
+        completion = asyncio.ensure_future(serving_chat.create_chat_completion(request, raw_request))
+        disconnected = asyncio.ensure_future(wait_for_disconnect(raw_request))
+        try:
+            await asyncio.wait({completion, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            completion.cancel()
+            await self._abort(engine_request_id, request, metrics)
+            raise
+        finally:
+            disconnected.cancel()
+        if not completion.done():
+            completion.cancel()
+            await self._abort(engine_request_id, request, metrics)
+            return Response(status_code=499)
+        generator = completion.result()
 
         if isinstance(generator, ErrorResponse):
             logger.error(f"Error response from chat completion: {generator.model_dump()}")
@@ -113,13 +527,25 @@ class VLLMDeployment:
                 content=generator.model_dump(), status_code=generator.code
             )
 
+        cache_headers = {CACHE_STATUS_HEADER: "MISS"} if cache_key else None
+
         if request.stream:
             logger.info("Returning streaming response")
-            return StreamingResponse(content=generator, media_type="text/event-stream")
+            generator = metrics.wrap_stream(generator, strip_usage=strip_usage)
+            if self.sse_coalesce_config is not None:
+                generator = coalesce_sse(generator, **self.sse_coalesce_config)
+            if cache_key:
+                generator = self.response_cache.record_stream(cache_key, generator)
+            generator = self._abort_on_close(generator, engine_request_id, request, metrics)
+            return StreamingResponse(content=generator, media_type="text/event-stream", headers=cache_headers)
         else:
             logger.info("Returning non-streaming response")
             if isinstance(generator, ChatCompletionResponse) and hasattr(generator, "model_dump"):
-                return JSONResponse(content=generator.model_dump())
+                metrics.observe_response(generator)
+                response = JSONResponse(content=generator.model_dump(), headers=cache_headers)
+                if cache_key:
+                    self.response_cache.put(cache_key, body=response.body)
+                return response
             else:
                 logger.error(f"Unexpected non-streaming response type: {type(generator)}")
                 error_response_content = ErrorResponse(
@@ -129,64 +555,178 @@ class VLLMDeployment:
                 ).model_dump()
                 return JSONResponse(content=error_response_content, status_code=500)
 
+    async def _abort_on_close(
+        self,
+        generator: AsyncGenerator[Any, None],
+        engine_request_id: str,
+        request: ChatCompletionRequest,
+        metrics: RequestMetrics,
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Stream the response, aborting the engine request if the stream is closed early.
 
-def parse_vllm_args(cli_args: Dict[str, Any]):
-    """Parses vLLM AsyncEngineArgs args based on CLI inputs."""
-    parser = argparse.ArgumentParser()
-    make_arg_parser(parser)
+        Starlette and Ray Serve cancel the response task as soon as the client
+        disconnects, which lands here at the next chunk boundary.
+        """
+        finished = False
+        try:
+            async for frame in generator:
+                yield frame
+            finished = True
+        finally:
+            if not finished:
+                await self._abort(engine_request_id, request, metrics)
 
-    arg_strings = []
-    for key, value in cli_args.items():
-        arg_strings.extend([f"--{key}", str(value)])
-    parsed_args = parser.parse_args(args=arg_strings)
-    return parsed_args
+    async def _abort(self, engine_request_id: str, request: ChatCompletionRequest, metrics: RequestMetrics):
+        """Abort an engine request nobody is waiting for, freeing its KV-cache blocks."""
+        await self.engine.abort(engine_request_id)
+        # Only a stream counts the tokens that went out, and only an explicit max_tokens bounds
+        # how many more there would have been; anything else would credit the whole context.
+        budget = request.max_tokens or request.max_completion_tokens
+        metrics.aborted(max(budget - metrics.output_chunks, 0) if request.stream and budget else 0)
+        logger.info(f"Aborted {engine_request_id} after {metrics.output_chunks} chunks: client went away")
 
 
-def build_app() -> serve.Application:
+def load_warmup_requests() -> Optional[List[Dict[str, Any]]]:
     """
-    Build the Ray Serve application for vLLM model serving.
+    Read the warmup requests from the environment.
 
-    Returns:
-        serve.Application: Configured Ray Serve application
+    WARMUP_ENABLED=false disables warmup entirely. WARMUP_REQUESTS_PATH points to a
+    JSON file holding a list of ChatCompletionRequest bodies; without it the
+    built-in DEFAULT_WARMUP_REQUESTS are used.
     """
-    # Read configuration from environment variables
+    if os.environ.get('WARMUP_ENABLED', 'true').lower() != 'true':
+        logger.info("Replica warmup disabled")
+        return []
+
+    warmup_requests_path = os.environ.get('WARMUP_REQUESTS_PATH')
+    if not warmup_requests_path:
+        return None
+
+    try:
+        with open(warmup_requests_path) as f:
+            warmup_requests = json.load(f)
+    except Exception as e:
+        error_msg = f"Failed to load warmup requests from {warmup_requests_path}: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        raise RuntimeError(error_msg) from e
+
+    if not isinstance(warmup_requests, list):
+        raise RuntimeError(f"Warmup requests in {warmup_requests_path} must be a JSON list")
+    logger.info(f"Loaded {len(warmup_requests)} warmup requests from: {warmup_requests_path}")
+    return warmup_requests
+
+
+def load_response_cache_config() -> Optional[Dict[str, Any]]:
+    """Response cache settings, or None when RESPONSE_CACHE_ENABLED isn't set to true."""
+    if os.environ.get('RESPONSE_CACHE_ENABLED', 'false').lower() != 'true':
+        return None
     config = {
-        "model": os.environ.get('MODEL_ID', "meta-llama/Llama-3.1-8B-Instruct"),
-        "tensor-parallel-size": os.environ.get('TENSOR_PARALLELISM', "2"),
-        "max-model-len": os.environ.get("MAX_MODEL_LEN", "8192"),
+        "max_entries": int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', "1024")),
+        "max_bytes": int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        "ttl_s": float(os.environ.get('RESPONSE_CACHE_TTL_S', "300")),
     }
-    parsed_args = parse_vllm_args(config)
-    engine_args = AsyncEngineArgs.from_cli_args(parsed_args)
+    logger.info(f"Response cache enabled: {config}")
+    return config
 
-    engine_args.worker_use_ray = True
-    engine_args.trust_remote_code = True
-    engine_args.enable_chunked_prefill = True
 
-    enable_auto_tools_env = os.environ.get('VLLM_ENABLE_AUTO_TOOL_CHOICE', 'true')
-    tool_parser_name_env = os.environ.get('TOOL_PARSER_NAME', 'llama3_json')
-    chat_template_path = os.environ.get('CHAT_TEMPLATE_PATH')
+def load_admission_config() -> Optional[Dict[str, Any]]:
+    """Admission control settings; ADMISSION_MAX_RUNNING=0 disables load shedding."""
+    max_running = int(os.environ.get('ADMISSION_MAX_RUNNING', "32"))
+    if max_running <= 0:
+        logger.info("Admission control disabled")
+        return None
+    config = {
+        "max_running": max_running,
+        "max_queued": int(os.environ.get('ADMISSION_MAX_QUEUED', "64")),
+        "queue_timeout_s": float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_S', "30")),
+    }
+    # e.g. {"interactive": {"weight": 8, "priority": 0}, "batch": {"weight": 1, "max_running": 8, "priority": 10}}
+    tenants = os.environ.get('ADMISSION_TENANTS')
+    if tenants:
+        config["tenants"] = json.loads(tenants)
+    logger.info(f"Admission control enabled: {config}")
+    return config
 
-    # Load chat template if path exists
-    chat_template = None
-    if chat_template_path:
-        try:
-            logger.info(f"Loading chat template from: {chat_template_path}")
-            chat_template = load_chat_template(chat_template_path, is_literal=False)
-            logger.info("Chat template loaded successfully")
-        except Exception as e:
-            error_msg = f"Failed to load chat template from {chat_template_path}: {str(e)}"
-            logger.error(f"{error_msg}\n{traceback.format_exc()}")
-            raise RuntimeError(error_msg) from e
-    else:
-        logger.info("No chat template path provided, using default template")
-
-    return VLLMDeployment.bind(
-        engine_args,
-        chat_template,
-        enable_auto_tools=enable_auto_tools_env,
-        tool_parser_name=tool_parser_name_env
+
+def load_sse_coalesce_config() -> Optional[Dict[str, Any]]:
+    """
+    SSE frame coalescing settings. SSE_COALESCE_TOKENS > 0 merges up to that many
+    content deltas per frame, flushing at the latest after SSE_COALESCE_MS.
+    """
+    max_tokens = int(os.environ.get('SSE_COALESCE_TOKENS', "0"))
+    if max_tokens <= 0:
+        return None
+    config = {
+        "max_tokens": max_tokens,
+        "max_delay_s": float(os.environ.get('SSE_COALESCE_MS', "20")) / 1000,
+    }
+    logger.info(f"SSE frame coalescing enabled: {config}")
+    return config
+
+
+def load_serve_options() -> Dict[str, Any]:
+    """
+    Ray Serve deployment options for VLLMDeployment.
+
+    Replicas scale on ongoing requests, which include the ones waiting in the
+    admission queue. SERVE_MAX_ONGOING_REQUESTS should stay above
+    ADMISSION_MAX_RUNNING + ADMISSION_MAX_QUEUED so excess requests reach a
+    replica and get a fast 429 instead of queueing unbounded in the proxy.
+    """
+    options = {
+        "max_ongoing_requests": int(os.environ.get('SERVE_MAX_ONGOING_REQUESTS', "128")),
+        "max_queued_requests": int(os.environ.get('SERVE_MAX_QUEUED_REQUESTS', "256")),
+        "autoscaling_config": {
+            "min_replicas": int(os.environ.get('SERVE_MIN_REPLICAS', "1")),
+            "max_replicas": int(os.environ.get('SERVE_MAX_REPLICAS', "1")),
+            "target_ongoing_requests": float(os.environ.get('SERVE_TARGET_ONGOING_REQUESTS', "32")),
+            "upscale_delay_s": float(os.environ.get('SERVE_UPSCALE_DELAY_S', "30")),
+            "downscale_delay_s": float(os.environ.get('SERVE_DOWNSCALE_DELAY_S', "600")),
+        },
+    }
+    logger.info(f"VLLMDeployment options: {options}")
+    return options
+
+
+def build_app() -> serve.Application:
+    """
+    Build the Ray Serve application for vLLM model serving.
+
+    Returns:
+        serve.Application: Configured Ray Serve application
+    """
+    engine_config = load_engine_config()
+    serve_options = load_serve_options()
+    deployment = VLLMDeployment.options(**serve_options).bind(
+        engine_config["engine_args"],
+        engine_config["chat_template"],
+        enable_auto_tools=engine_config["enable_auto_tools"],
+        tool_parser_name=engine_config["tool_parser_name"],
+        warmup_requests=load_warmup_requests(),
+        response_cache_config=load_response_cache_config(),
+        admission_config=load_admission_config(),
+        fake_engine_config=load_fake_engine_config(),
+        sse_coalesce_config=load_sse_coalesce_config(),
+        served_model_names=engine_config["served_model_names"],
+        lora_config=engine_config["lora_config"],
+        admin_api_key=os.environ.get('ADMIN_API_KEY') or None,
     )
 
+    if os.environ.get('PREFIX_ROUTING', 'false').lower() == 'true':
+        prefix_messages = int(os.environ.get('PREFIX_ROUTING_MESSAGES', "1"))
+        logger.info(f"Prefix-aware routing enabled (prefix messages: {prefix_messages})")
+        # One router replica holds every request for its whole stream, so it takes as many
+        # as all the VLLMDeployment replicas together; Serve's default of 5 would cap the app.
+        replicas = serve_options["autoscaling_config"]["max_replicas"]
+        router = PrefixRouter.options(
+            max_ongoing_requests=serve_options["max_ongoing_requests"] * replicas,
+            max_queued_requests=serve_options["max_queued_requests"] * replicas,
+        )
+        return router.bind(deployment, prefix_messages=prefix_messages)
+
+    return deployment
+
 logger.info("Setting up vLLM Ray Serve application...")
 model = build_app()
 logger.info("Ray Serve application 'model' has been built successfully.")
\ No newline at end of file
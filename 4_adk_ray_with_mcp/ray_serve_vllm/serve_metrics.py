@@ -0,0 +1,169 @@
+import re
+import time
+
+from typing import AsyncIterator, Optional, Type
+
+import orjson
+
+from prometheus_client import Counter, Histogram
+
+from vllm.entrypoints.openai.protocol import ChatCompletionResponse, UsageInfo
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+INTER_TOKEN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.03, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+LABELS = ("model", "stream")
+
+TIME_TO_FIRST_TOKEN = Histogram(
+    "vllm_serve_time_to_first_token_seconds",
+    "Time from the request reaching the replica to the first streamed chunk carrying tokens.",
+    LABELS, buckets=LATENCY_BUCKETS,
+)
+INTER_TOKEN_LATENCY = Histogram(
+    "vllm_serve_inter_token_latency_seconds",
+    "Time between consecutive streamed chunks carrying tokens.",
+    LABELS, buckets=INTER_TOKEN_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "vllm_serve_request_latency_seconds",
+    "End-to-end request latency inside the replica.",
+    LABELS, buckets=LATENCY_BUCKETS,
+)
+QUEUE_TIME = Histogram(
+    "vllm_serve_request_queue_seconds",
+    "Time a request waits in the replica before it is handed to the engine.",
+    LABELS, buckets=LATENCY_BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "vllm_serve_prompt_tokens",
+    "Prompt tokens per request.",
+    LABELS, buckets=TOKEN_BUCKETS,
+)
+COMPLETION_TOKENS = Histogram(
+    "vllm_serve_completion_tokens",
+    "Completion tokens per request.",
+    LABELS, buckets=TOKEN_BUCKETS,
+)
+TOOL_PARSE_TIME = Histogram(
+    "vllm_serve_tool_parse_seconds",
+    "Time spent in the tool-call parser per call.",
+    LABELS, buckets=INTER_TOKEN_BUCKETS,
+)
+REQUESTS_SHED = Counter(
+    "vllm_serve_requests_shed_total",
+    "Requests rejected with 429 by admission control.",
+    LABELS,
+)
+ABORTED_REQUESTS = Counter(
+    "vllm_serve_aborted_requests_total",
+    "Engine requests aborted because the client disconnected or the request was cancelled.",
+    LABELS,
+)
+ABORT_TOKENS_SAVED = Counter(
+    "vllm_serve_abort_tokens_saved_total",
+    "Unused max_tokens budget of aborted streams: the most completion tokens the aborts saved. "
+    "Aborted non-streaming requests and requests without max_tokens add nothing.",
+    LABELS,
+)
+
+
+# Stream chunks are compact JSON with escaped quotes inside strings, so these only match keys:
+# a delta with text, reasoning or tool calls, and the usage-only chunk that ends a stream.
+_TOKEN_DELTA = re.compile(r'"(?:content|reasoning_content)":"[^"]|"tool_calls":\[\{')
+_USAGE_ONLY = '"choices":[]'
+
+
+def _carries_tokens(frame: str) -> bool:
+    """Whether an SSE frame holds generated text or tool-call deltas, not just a role, finish reason or error."""
+    return _TOKEN_DELTA.search(frame) is not None
+
+
+class RequestMetrics:
+    """
+    Records the latency and token histograms of one chat completion request.
+
+    `model` must be a name the replica serves (or a fixed placeholder), never
+    the raw request field, so clients can't grow the label set.
+    """
+
+    def __init__(self, model: str, stream: bool):
+        self.labels = (model, "true" if stream else "false")
+        self.start = time.perf_counter()
+        self.output_chunks = 0
+
+    def dispatched(self):
+        """Call once the request has been handed to the engine."""
+        QUEUE_TIME.labels(*self.labels).observe(time.perf_counter() - self.start)
+
+    def shed(self):
+        REQUESTS_SHED.labels(*self.labels).inc()
+
+    def aborted(self, tokens_saved: int):
+        ABORTED_REQUESTS.labels(*self.labels).inc()
+        ABORT_TOKENS_SAVED.labels(*self.labels).inc(tokens_saved)
+
+    def observe_response(self, response: ChatCompletionResponse):
+        REQUEST_LATENCY.labels(*self.labels).observe(time.perf_counter() - self.start)
+        self._observe_usage(response.usage)
+
+    async def wrap_stream(self, generator: AsyncIterator[str], strip_usage: bool = False) -> AsyncIterator[str]:
+        """
+        Pass SSE frames through while timing them.
+
+        vLLM reports token counts in a final usage-only chunk, which the caller
+        requests on behalf of clients that didn't ask for it; `strip_usage` drops
+        that chunk again before it reaches them.
+        """
+        last = None
+        async for frame in generator:
+            now = time.perf_counter()
+            chunk = frame.startswith("data: {")
+            if chunk and _USAGE_ONLY in frame:
+                # The one frame of a stream that is parsed.
+                usage = orjson.loads(frame[len("data: "):]).get("usage")
+                if usage:
+                    self._observe_usage(UsageInfo(**usage))
+                    if strip_usage:
+                        continue
+            elif chunk and _carries_tokens(frame):
+                if last is None:
+                    TIME_TO_FIRST_TOKEN.labels(*self.labels).observe(now - self.start)
+                else:
+                    INTER_TOKEN_LATENCY.labels(*self.labels).observe(now - last)
+                last = now
+                self.output_chunks += 1
+            yield frame
+        REQUEST_LATENCY.labels(*self.labels).observe(time.perf_counter() - self.start)
+
+    def _observe_usage(self, usage: Optional[UsageInfo]):
+        if usage is None:
+            return
+        PROMPT_TOKENS.labels(*self.labels).observe(usage.prompt_tokens)
+        COMPLETION_TOKENS.labels(*self.labels).observe(usage.completion_tokens or 0)
+
+
+def instrument_tool_parser(parser_cls: Type, model: str) -> Type:
+    """
+    Subclass a vLLM tool parser so each extraction call is timed.
+
+    One parser serves every alias and adapter of the engine, so its calls are
+    labelled with the primary served model name.
+    """
+
+    class TimedToolParser(parser_cls):
+        def extract_tool_calls(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().extract_tool_calls(*args, **kwargs)
+            finally:
+                TOOL_PARSE_TIME.labels(model, "false").observe(time.perf_counter() - start)
+
+        def extract_tool_calls_streaming(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return super().extract_tool_calls_streaming(*args, **kwargs)
+            finally:
+                TOOL_PARSE_TIME.labels(model, "true").observe(time.perf_counter() - start)
+
+    TimedToolParser.__name__ = parser_cls.__name__
+    return TimedToolParser
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import time
+
+from typing import Any, AsyncIterator, List, Optional, Tuple, Union
+
+SSEFrame = Union[str, bytes]
+
+# vLLM serializes a plain content delta of a single choice as this marker, the
+# escaped text, and one of these closings; anything else is not merged.
+_CONTENT_START = '"choices":[{"index":0,"delta":{"content":"'
+_CONTENT_ENDS = ('"}}]', '"},"logprobs":null,"finish_reason":null}]')
+
+
+def _split(frame: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Split a mergeable frame into the text before its content, the still-escaped
+    content and the rest, without parsing it; None for role, tool-call, finish,
+    usage-only and error frames.
+    """
+    start = frame.find(_CONTENT_START)
+    if start < 0:
+        return None
+    start += len(_CONTENT_START)
+    for closing in _CONTENT_ENDS:
+        end = frame.find(closing, start)
+        if end >= 0:
+            break
+    else:
+        return None
+    content = frame[start:end]
+    # Every quote inside the string is escaped; an unescaped one means the delta has more fields.
+    if content.count('"') != content.count('\\"'):
+        return None
+    rest = frame[end + len(closing):]
+    if rest != "}\n\n" and not (rest.startswith(',"usage":{') and rest.endswith("}\n\n")):
+        return None
+    return frame[:start], content, frame[end:]
+
+
+class _Buffer:
+    def __init__(self):
+        self.head: Optional[str] = None
+        self.contents: List[str] = []
+        self.tail = ""
+        self.started = 0.0
+
+    def add(self, head: str, content: str, tail: str):
+        if self.head is None:
+            self.head = head
+            self.started = time.perf_counter()
+        self.contents.append(content)
+        # The last tail carries the latest usage when continuous usage stats are on.
+        self.tail = tail
+
+    def flush(self) -> Optional[str]:
+        if self.head is None:
+            return None
+        # Escaped JSON strings concatenate into the escaped concatenation.
+        merged = self.head + "".join(self.contents) + self.tail
+        self.head, self.contents = None, []
+        return merged
+
+
+async def coalesce_sse(
+    generator: AsyncIterator[SSEFrame], max_tokens: int = 8, max_delay_s: float = 0.02
+) -> AsyncIterator[SSEFrame]:
+    """
+    Merge consecutive content deltas of a vLLM SSE stream into fewer frames.
+
+    A merged frame is sent once it holds `max_tokens` deltas or its first delta
+    is `max_delay_s` old, whichever comes first, so a slow decode never holds
+    text back for long. Every other frame (role, tool-call, finish, usage,
+    errors, `[DONE]`) flushes the buffer and is forwarded unchanged. Deltas
+    are merged as text, without decoding or re-encoding their JSON.
+    """
+    buffer = _Buffer()
+    frames: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=4 * max_tokens)
+    done = object()
+
+    async def read_upstream():
+        try:
+            async for frame in generator:
+                await frames.put(frame)
+        except Exception as e:
+            await frames.put(e)
+        await frames.put(done)
+
+    reader = asyncio.ensure_future(read_upstream())
+    try:
+        while True:
+            try:
+                frame = frames.get_nowait()
+            except asyncio.QueueEmpty:
+                if buffer.head is None:
+                    frame = await frames.get()
+                else:
+                    remaining = buffer.started + max_delay_s - time.perf_counter()
+                    try:
+                        frame = await asyncio.wait_for(frames.get(), max(remaining, 0))
+                    except asyncio.TimeoutError:
+                        yield buffer.flush()
+                        continue
+
+            if frame is done or isinstance(frame, Exception):
+                break
+
+            parts = _split(frame.decode() if isinstance(frame, bytes) else frame)
+            if parts is not None:
+                buffer.add(*parts)
+                if len(buffer.contents) >= max_tokens:
+                    yield buffer.flush()
+                continue
+
+            flushed = buffer.flush()
+            if flushed is not None:
+                yield flushed
+            yield frame
+
+        flushed = buffer.flush()
+        if flushed is not None:
+            yield flushed
+        if isinstance(frame, Exception):
+            raise frame
+    finally:
+        if not reader.done():
+            reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await reader
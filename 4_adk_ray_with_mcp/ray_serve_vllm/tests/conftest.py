@@ -0,0 +1,59 @@
+"""
+Helpers for testing VLLMDeployment on FakeAsyncLLMEngine, without Ray Serve or a GPU.
+
+Run from ray_serve_vllm with `PYTHONPATH=. python -m pytest -q tests`. Tests of
+the deployment skip themselves when ray or vllm isn't installed.
+"""
+import asyncio
+import os
+
+# serve_chat_completion builds its application at import time.
+os.environ.setdefault("VLLM_FAKE_ENGINE", "true")
+os.environ.setdefault("TENSOR_PARALLELISM", "1")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+MODEL = "meta-llama/Llama-3.1-8B-Instruct"
+
+
+def deployment_class():
+    """The user class behind serve.deployment and serve.ingress."""
+    import serve_chat_completion
+
+    return next(
+        cls for cls in serve_chat_completion.VLLMDeployment.func_or_class.__mro__
+        if cls.__module__ == "serve_chat_completion"
+    )
+
+
+def make_deployment(decode_s: float = 0.001, output_tokens: int = 8, **kwargs):
+    """A VLLMDeployment on FakeAsyncLLMEngine, without warmup unless asked for."""
+    from vllm.engine.arg_utils import AsyncEngineArgs
+
+    kwargs.setdefault("warmup_requests", [])
+    return deployment_class()(
+        AsyncEngineArgs(model=MODEL, max_model_len=8192),
+        fake_engine_config={"prefill_s_per_token": 0.0, "decode_s": decode_s, "output_tokens": output_tokens},
+        **kwargs,
+    )
+
+
+def chat_request(**body):
+    from vllm.entrypoints.openai.protocol import ChatCompletionRequest
+
+    return ChatCompletionRequest(**{"model": MODEL, "messages": [{"role": "user", "content": "Hi"}], **body})
+
+
+def raw_request(headers=None, disconnect_after_s=None):
+    """A request whose client stays connected, or disconnects after `disconnect_after_s`."""
+    from serve_chat_completion import request_from_headers
+    from starlette.requests import Request
+
+    request = request_from_headers(headers or {})
+    if disconnect_after_s is None:
+        return request
+
+    async def receive():
+        await asyncio.sleep(disconnect_after_s)
+        return {"type": "http.disconnect"}
+
+    return Request(request.scope, receive)
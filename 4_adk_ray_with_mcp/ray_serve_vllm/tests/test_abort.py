@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("ray")
+pytest.importorskip("vllm")
+
+from prometheus_client import REGISTRY  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from conftest import MODEL, chat_request, make_deployment, raw_request  # noqa: E402
+
+DECODE_S = 0.05
+
+
+def abort_samples(stream: str):
+    labels = {"model": MODEL, "stream": stream}
+    return tuple(REGISTRY.get_sample_value(name, labels) or 0.0 for name in (
+        "vllm_serve_aborted_requests_total", "vllm_serve_abort_tokens_saved_total"
+    ))
+
+
+def test_non_streaming_request_is_aborted_within_a_decode_step_of_a_disconnect():
+    deployment = make_deployment(decode_s=DECODE_S)
+    disconnected_at = []
+
+    async def receive():
+        await asyncio.sleep(0.2)
+        disconnected_at.append(time.perf_counter())
+        return {"type": "http.disconnect"}
+
+    async def run():
+        await deployment.check_health()
+        request = Request(raw_request({"X-Request-Id": "gone"}).scope, receive)
+        return await deployment.create_chat_completion(chat_request(max_completion_tokens=100), request)
+
+    before = abort_samples("false")
+    response = asyncio.run(run())
+    assert response.status_code == 499
+    assert deployment.engine.aborted["chatcmpl-gone"] - disconnected_at[0] < DECODE_S
+    # How many tokens it had generated is unknown, so none count as saved.
+    aborted, saved = abort_samples("false")
+    assert (aborted - before[0], saved - before[1]) == (1, 0)
+
+
+def test_stream_is_aborted_within_a_decode_step_of_being_closed():
+    deployment = make_deployment(decode_s=DECODE_S)
+
+    async def run():
+        await deployment.check_health()
+        response = await deployment.create_chat_completion(
+            chat_request(stream=True, max_completion_tokens=100), raw_request({"X-Request-Id": "closed"})
+        )
+        frames = response.body_iterator
+        for _ in range(3):
+            await frames.__anext__()
+        # Starlette cancels the response task on disconnect, which closes the stream.
+        closed_at = time.perf_counter()
+        await frames.aclose()
+        return closed_at
+
+    before = abort_samples("true")
+    closed_at = asyncio.run(run())
+    assert deployment.engine.aborted["chatcmpl-closed"] - closed_at < DECODE_S
+    # The role chunk and two tokens went out of the 100 max_completion_tokens.
+    aborted, saved = abort_samples("true")
+    assert (aborted - before[0], saved - before[1]) == (1, 98)
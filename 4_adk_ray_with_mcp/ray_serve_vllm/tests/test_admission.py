@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, OverloadedError
+from conftest import chat_request, make_deployment, raw_request
+
+
+def test_overload_is_shed_fast_and_admitted_latency_stays_bounded():
+    pytest.importorskip("ray")
+    pytest.importorskip("vllm")
+    # 8 decode steps of 10ms: about 80ms per request once dispatched.
+    deployment = make_deployment(
+        decode_s=0.01,
+        admission_config={"max_running": 4, "max_queued": 4, "queue_timeout_s": 1.0},
+    )
+
+    async def timed():
+        start = time.perf_counter()
+        response = await deployment.create_chat_completion(chat_request(max_completion_tokens=8), raw_request())
+        return response, time.perf_counter() - start
+
+    async def run():
+        await deployment.check_health()
+        return await asyncio.gather(*(timed() for _ in range(40)))
+
+    results = asyncio.run(run())
+    admitted = [latency for response, latency in results if response.status_code == 200]
+    shed = [(response, latency) for response, latency in results if response.status_code == 429]
+    assert len(admitted) == 8
+    assert len(shed) == 32
+    assert all(int(response.headers["Retry-After"]) >= 1 for response, _ in shed)
+    # Shed requests never wait for a slot, and the queue only ever holds one round of requests.
+    assert max(latency for _, latency in shed) < 0.05
+    assert max(admitted) < 0.5
+    assert deployment.admission.running == 0 and deployment.admission.queued == 0
+
+
+def test_idle_tenants_are_forgotten():
+    controller = AdmissionController(max_running=1, max_queued=3, queue_timeout_s=0.05)
+
+    async def request(tenant, hold_s=0.01):
+        try:
+            await controller.acquire(tenant)
+        except OverloadedError:
+            return "shed"
+        await asyncio.sleep(hold_s)
+        controller.release(hold_s, tenant=tenant)
+        return "ok"
+
+    async def run():
+        # "flood" fills the queue; each other tenant pushes out one of its waiters,
+        # and the rest time out. Another one is cancelled while it waits.
+        flood = [asyncio.ensure_future(request("flood", hold_s=0.1)) for _ in range(4)]
+        await asyncio.sleep(0)
+        others = [asyncio.ensure_future(request(f"tenant-{i}")) for i in range(20)]
+        cancelled = asyncio.ensure_future(request("cancelled"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        results = await asyncio.gather(*flood, *others, return_exceptions=True)
+        return results
+
+    results = asyncio.run(run())
+    assert "shed" in results and "ok" in results
+    assert controller.stats() == {}
+    assert controller.running == 0 and controller.queued == 0
+
+
+async def hold_and_release(controller, tenants, releases):
+    """Queue a request per tenant behind one that holds every slot, then free `releases` slots one at a time."""
+    order = []
+
+    async def request(tenant):
+        await controller.acquire(tenant)
+        order.append(tenant)
+
+    for _ in range(controller.max_running):
+        await controller.acquire("holder")
+    tasks = [asyncio.ensure_future(request(tenant)) for tenant in tenants]
+    await asyncio.sleep(0.01)
+    for _ in range(releases):
+        controller.release(tenant="holder")
+        await asyncio.sleep(0.01)
+    stats = controller.stats()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return order, stats
+
+
+def test_slots_are_shared_by_weight():
+    controller = AdmissionController(
+        max_running=8, max_queued=100, queue_timeout_s=5,
+        tenants={"holder": {}, "interactive": {"weight": 3}, "batch": {"weight": 1}},
+    )
+    order, _ = asyncio.run(hold_and_release(controller, ["batch", "interactive"] * 8, releases=8))
+    # Start tags 0, 1/3, 2/3, ... against 0, 1, 2, ...: the first 8 slots go 6 to 2.
+    assert order.count("interactive") == 6 and order.count("batch") == 2
+
+
+def test_tenant_max_running_caps_it_despite_free_slots():
+    controller = AdmissionController(
+        max_running=4, max_queued=100, queue_timeout_s=5,
+        tenants={"holder": {}, "batch": {"max_running": 1}, "interactive": {}},
+    )
+    order, stats = asyncio.run(hold_and_release(controller, ["batch"] * 4 + ["interactive"], releases=4))
+    assert order == ["batch", "interactive"]
+    assert stats["batch"] == {"running": 1, "queued": 3}
+
+
+def test_unknown_tenants_share_the_default_queue():
+    controller = AdmissionController(max_running=1, max_queued=4, queue_timeout_s=5, tenants={"batch": {}})
+    assert controller.tenant_for("batch") == "batch"
+    assert controller.tenant_for("rotating-name-1") == "default"
+    assert controller.tenant_for(None) == "default"
+
+    names = [controller.tenant_for(f"rotating-name-{i}") for i in range(3)]
+    _, stats = asyncio.run(hold_and_release(controller, ["batch"] * 2 + names, releases=0))
+    # The names are one tenant, so once the queue is full the third is shed instead of
+    # pushing out a "batch" waiter, as a tenant of its own with nothing queued would.
+    assert stats["default"] == {"running": 0, "queued": 2}
+    assert stats["batch"] == {"running": 0, "queued": 2}
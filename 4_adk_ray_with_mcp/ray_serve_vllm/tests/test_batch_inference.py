@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("vllm")
+
+from batch_inference import completed_ids, drop_errors, run_batch  # noqa: E402
+from conftest import MODEL  # noqa: E402
+
+
+def batch_args(tmp_path, **kwargs):
+    return argparse.Namespace(**{
+        "input": str(tmp_path / "prompts.jsonl"), "output": str(tmp_path / "results.jsonl"),
+        "max_in_flight": 4, "retry_errors": False, "num_shards": 1, "shard_index": 0, **kwargs,
+    })
+
+
+def results(path):
+    return [json.loads(line) for line in open(path)]
+
+
+@pytest.fixture
+def prompts(tmp_path, monkeypatch):
+    monkeypatch.setenv("MODEL_ID", MODEL)
+    monkeypatch.setenv("FAKE_ENGINE_DECODE_S", "0.001")
+    monkeypatch.setenv("FAKE_ENGINE_OUTPUT_TOKENS", "4")
+    lines = [{"custom_id": f"batch-{i}", "body": {"messages": [{"role": "user", "content": f"Hi {i}"}]}}
+             for i in range(6)]
+    lines += [{"messages": [{"role": "user", "content": "Plain body"}]}, {"custom_id": "bad", "body": {}}]
+    (tmp_path / "prompts.jsonl").write_text("".join(json.dumps(line) + "\n" for line in lines))
+    return [f"batch-{i}" for i in range(6)] + ["6", "bad"]
+
+
+def test_run_batch_writes_a_row_per_request(tmp_path, prompts):
+    report = asyncio.run(run_batch(batch_args(tmp_path)))
+    rows = {row["custom_id"]: row for row in results(tmp_path / "results.jsonl")}
+    assert sorted(rows) == sorted(prompts)
+    assert report["succeeded"] == 7 and report["failed"] == 1
+    assert rows["batch-0"]["error"] is None
+    assert rows["batch-0"]["response"]["model"] == MODEL
+    assert rows["batch-0"]["response"]["usage"]["completion_tokens"] == 4
+    assert rows["bad"]["response"] is None and rows["bad"]["error"]["message"]
+
+
+def test_shards_split_the_input(tmp_path, prompts):
+    ids = []
+    for shard in range(3):
+        output = str(tmp_path / f"results-{shard}.jsonl")
+        asyncio.run(run_batch(batch_args(tmp_path, output=output, num_shards=3, shard_index=shard)))
+        ids.append({row["custom_id"] for row in results(output)})
+    assert [len(shard) for shard in ids] == [3, 3, 2]
+    assert set().union(*ids) == set(prompts)
+
+
+def test_a_cut_off_run_resumes_where_it_stopped(tmp_path, prompts):
+    output = tmp_path / "results.jsonl"
+    asyncio.run(run_batch(batch_args(tmp_path)))
+    lines = output.read_text().splitlines(keepends=True)
+    # Three rows made it, the fourth was cut off mid-line.
+    output.write_text("".join(lines[:3]) + lines[3][:20])
+    kept = [json.loads(line)["custom_id"] for line in lines[:3]]
+
+    report = asyncio.run(run_batch(batch_args(tmp_path)))
+    assert report["succeeded"] + report["failed"] == len(prompts) - 3
+    rows = output.read_text().splitlines()
+    # The cut-off line is left alone on a line of its own; the rest are whole rows.
+    assert rows[3] == lines[3][:20]
+    ids = [json.loads(row)["custom_id"] for row in rows[:3] + rows[4:]]
+    assert ids[:3] == kept and sorted(ids) == sorted(prompts)
+
+
+def test_retrying_errors_drops_their_rows(tmp_path):
+    output = tmp_path / "results.jsonl"
+    rows = [
+        {"custom_id": "a", "response": {}, "error": None},
+        {"custom_id": "b", "response": None, "error": {"message": "boom"}},
+        {"custom_id": "c", "response": {}, "error": None},
+    ]
+    output.write_text("".join(json.dumps(row) + "\n" for row in rows) + '{"custom_id": "d", "resp')
+
+    assert drop_errors(str(output)) == 2
+    assert completed_ids(str(output)) == {"a", "c"}
+    assert [json.loads(line)["custom_id"] for line in output.read_text().splitlines()] == ["a", "c"]
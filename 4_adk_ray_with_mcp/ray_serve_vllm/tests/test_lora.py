@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("ray")
+pytest.importorskip("vllm")
+
+from vllm.entrypoints.openai.protocol import ErrorResponse, LoadLoRAAdapterRequest  # noqa: E402
+
+from conftest import chat_request, make_deployment, raw_request  # noqa: E402
+from fake_engine import FakeServingModels  # noqa: E402
+from lora_registry import LoRAAdapterRegistry  # noqa: E402
+
+ADMIN = {"Authorization": "Bearer secret"}
+
+
+def test_admin_routes_are_disabled_without_a_key():
+    deployment = make_deployment()
+
+    async def run():
+        return await deployment.load_lora_adapter(
+            LoadLoRAAdapterRequest(lora_name="sql", lora_path="/adapters/sql"), raw_request(ADMIN)
+        )
+
+    assert asyncio.run(run()).status_code == 403
+    assert "sql" not in deployment.lora_registry.known
+
+
+def test_requests_are_routed_to_the_adapter_they_name():
+    deployment = make_deployment(
+        admin_api_key="secret", lora_config={"adapters": {"weather": "/adapters/weather"}, "max_resident": 1}
+    )
+
+    async def run():
+        await deployment.check_health()
+        denied = await deployment.load_lora_adapter(
+            LoadLoRAAdapterRequest(lora_name="sql", lora_path="/adapters/sql"), raw_request()
+        )
+        loaded = await deployment.load_lora_adapter(
+            LoadLoRAAdapterRequest(lora_name="sql", lora_path="/adapters/sql"), raw_request(ADMIN)
+        )
+        responses = {}
+        for model in ("sql", "weather", "meta-llama/Llama-3.1-8B-Instruct"):
+            responses[model] = await deployment.create_chat_completion(
+                chat_request(model=model, max_completion_tokens=2), raw_request({"X-Request-Id": model})
+            )
+        return denied, loaded, responses
+
+    denied, loaded, responses = asyncio.run(run())
+    assert denied.status_code == 401
+    assert loaded.status_code == 200
+    assert all(response.status_code == 200 for response in responses.values())
+    for model in responses:
+        assert deployment.engine.routed[f"chatcmpl-{model}"] == model
+    # One resident adapter: serving "weather" evicted "sql" again.
+    assert list(deployment.lora_registry.resident) == ["weather"]
+
+
+class FailingServingModels(FakeServingModels):
+    async def load_lora_adapter(self, request):
+        if request.lora_path.startswith("/missing"):
+            return ErrorResponse(message="No adapter at that path", type="NotFoundError", code=404)
+        return await super().load_lora_adapter(request)
+
+
+def test_failed_load_keeps_the_registry_as_it_was():
+    registry = LoRAAdapterRegistry({"weather": "/adapters/weather", "sql": "/adapters/sql"}, max_resident=1)
+    models = FailingServingModels(["base"])
+
+    async def run():
+        await registry.bind(models)
+        new = await registry.load("broken", "/missing/broken")
+        # The failed load didn't evict the adapter that was already resident.
+        assert list(registry.resident) == ["weather"]
+        assert "broken" not in registry.known
+        repointed = await registry.load("weather", "/missing/weather")
+        return new, repointed
+
+    new, repointed = asyncio.run(run())
+    assert new.code == 404 and repointed.code == 404
+    assert registry.known == {"weather": "/adapters/weather", "sql": "/adapters/sql"}
+    # Re-pointing unloaded the old path; the next request loads it again.
+    assert list(registry.resident) == []
+
+
+def test_adapters_in_use_are_not_evicted():
+    registry = LoRAAdapterRegistry({name: f"/adapters/{name}" for name in ("a", "b", "c")}, max_resident=1)
+    models = FakeServingModels(["base"])
+
+    async def run():
+        await registry.bind(models)
+        await registry.acquire("a")
+        # Loading "b" would evict "a", but a request is using it.
+        await registry.acquire("b")
+        assert list(registry.resident) == ["a", "b"] and set(models.lora_adapters) == {"a", "b"}
+        registry.release("b")
+        await registry.acquire("c")
+        assert list(registry.resident) == ["a", "c"] and set(models.lora_adapters) == {"a", "c"}
+        registry.release("a")
+        registry.release("c")
+        await registry.ensure_resident("b")
+        assert list(registry.resident) == ["b"] and set(models.lora_adapters) == {"b"}
+        assert registry.stats()["pinned"] == []
+
+    asyncio.run(run())
+
+
+def test_a_stream_keeps_its_adapter_resident_until_it_ends():
+    deployment = make_deployment(
+        decode_s=0.01, lora_config={"adapters": {"weather": "/adapters/weather", "sql": "/adapters/sql"},
+                                    "max_resident": 1},
+    )
+
+    async def run():
+        await deployment.check_health()
+        stream = await deployment.create_chat_completion(
+            chat_request(model="sql", stream=True, max_completion_tokens=4), raw_request()
+        )
+        await stream.body_iterator.__anext__()
+        other = await deployment.create_chat_completion(
+            chat_request(model="weather", max_completion_tokens=2), raw_request()
+        )
+        during = list(deployment.lora_registry.resident)
+        rest = [frame async for frame in stream.body_iterator]
+        return other, during, rest
+
+    other, during, rest = asyncio.run(run())
+    assert other.status_code == 200
+    assert during == ["sql", "weather"]
+    assert rest[-1] == "data: [DONE]\n\n"
+    assert deployment.lora_registry.stats()["pinned"] == []
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("ray")
+pytest.importorskip("vllm")
+
+from prometheus_client import REGISTRY  # noqa: E402
+
+from conftest import MODEL, chat_request, make_deployment, raw_request  # noqa: E402
+
+
+def sample(name: str, model: str, stream: str) -> float:
+    return REGISTRY.get_sample_value(name, {"model": model, "stream": stream}) or 0.0
+
+
+def test_stream_histograms_time_only_token_chunks():
+    # No prefill, then one token every 20ms.
+    deployment = make_deployment(decode_s=0.02)
+    before = {
+        name: sample(name, MODEL, "true") for name in (
+            "vllm_serve_time_to_first_token_seconds_count",
+            "vllm_serve_time_to_first_token_seconds_sum",
+            "vllm_serve_inter_token_latency_seconds_count",
+            "vllm_serve_inter_token_latency_seconds_sum",
+            "vllm_serve_completion_tokens_sum",
+        )
+    }
+
+    async def run():
+        await deployment.check_health()
+        response = await deployment.create_chat_completion(
+            chat_request(stream=True, max_completion_tokens=5), raw_request()
+        )
+        return [frame async for frame in response.body_iterator]
+
+    frames = asyncio.run(run())
+    # Role, five content chunks and finish; the usage chunk the client didn't ask for is stripped.
+    assert len(frames) == 8 and frames[-1] == "data: [DONE]\n\n"
+    assert not any('"usage"' in frame for frame in frames)
+
+    def delta(name):
+        return sample(name, MODEL, "true") - before[name]
+
+    assert delta("vllm_serve_time_to_first_token_seconds_count") == 1
+    assert delta("vllm_serve_inter_token_latency_seconds_count") == 4
+    assert delta("vllm_serve_completion_tokens_sum") == 5
+    # The role chunk goes out with the first token, so it doesn't shorten the TTFT.
+    assert 0.02 <= delta("vllm_serve_time_to_first_token_seconds_sum") < 0.1
+    assert 0.015 <= delta("vllm_serve_inter_token_latency_seconds_sum") / 4 < 0.05
+
+
+def test_token_chunks_are_found_without_parsing():
+    from serve_metrics import _carries_tokens
+
+    head = 'data: {"id":"1","object":"chat.completion.chunk","created":1,"model":"m","choices":[{"index":0,"delta":'
+    assert _carries_tokens(head + '{"content":" tok0"}}]}\n\n')
+    assert _carries_tokens(head + '{"reasoning_content":"hm"}}]}\n\n')
+    assert _carries_tokens(head + '{"tool_calls":[{"index":0,"function":{"arguments":"{\\"ci"}}]}}]}\n\n')
+    assert not _carries_tokens(head + '{"role":"assistant","content":""}}]}\n\n')
+    assert not _carries_tokens(head + '{},"finish_reason":"length"}]}\n\n')
+    assert not _carries_tokens(head + '{"content":""},"logprobs":{"content":[]}}]}\n\n')
+    # Keys quoted inside a string are escaped, so they don't count.
+    assert not _carries_tokens(head + '{"content":"","tool_calls":[]},"x":"\\"content\\":\\"a"}]}\n\n')
+
+
+def test_unknown_model_names_share_one_label():
+    deployment = make_deployment()
+
+    async def run():
+        await deployment.check_health()
+        return await deployment.create_chat_completion(chat_request(model="no-such-model"), raw_request())
+
+    assert asyncio.run(run()).status_code == 404
+    assert sample("vllm_serve_request_queue_seconds_count", "unknown", "false") >= 1
+    assert REGISTRY.get_sample_value(
+        "vllm_serve_request_queue_seconds_count", {"model": "no-such-model", "stream": "false"}
+    ) is None
@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip("ray")
+pytest.importorskip("vllm")
+
+
+def test_router_takes_the_requests_of_every_replica(monkeypatch):
+    import serve_chat_completion
+
+    monkeypatch.setenv("PREFIX_ROUTING", "true")
+    monkeypatch.setenv("SERVE_MAX_REPLICAS", "3")
+    monkeypatch.setenv("SERVE_MAX_ONGOING_REQUESTS", "100")
+    monkeypatch.setenv("SERVE_MAX_QUEUED_REQUESTS", "200")
+    router = serve_chat_completion.build_app()._bound_deployment
+
+    assert router.name == "PrefixRouter"
+    assert router._deployment_config.max_ongoing_requests == 300
+    assert router._deployment_config.max_queued_requests == 600
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("vllm")
+
+import response_cache  # noqa: E402
+from conftest import chat_request, make_deployment, raw_request  # noqa: E402
+from response_cache import CACHE_STATUS_HEADER, ResponseCache  # noqa: E402
+
+TOOL = {"type": "function", "function": {"name": "get_forecast", "parameters": {"type": "object"}}}
+
+
+def test_key_ignores_request_id_and_covers_what_changes_the_output():
+    key = ResponseCache.make_key(chat_request(temperature=0, request_id="a"))
+    assert key == ResponseCache.make_key(chat_request(temperature=0, request_id="b"))
+    assert key == ResponseCache.make_key(chat_request(temperature=0.0))
+
+    variants = [
+        chat_request(temperature=0, model="other-model"),
+        chat_request(temperature=0, messages=[{"role": "user", "content": "Hello"}]),
+        chat_request(temperature=0, tools=[TOOL]),
+        chat_request(temperature=0, top_p=0.5),
+        chat_request(temperature=0, max_completion_tokens=16),
+        chat_request(temperature=0, stream=True),
+    ]
+    keys = {ResponseCache.make_key(request) for request in variants}
+    assert None not in keys and key not in keys and len(keys) == len(variants)
+
+
+def test_only_deterministic_single_choice_requests_are_cached():
+    assert ResponseCache.make_key(chat_request(temperature=0)) is not None
+    assert ResponseCache.make_key(chat_request(temperature=0.7, seed=1)) is not None
+    assert ResponseCache.make_key(chat_request(temperature=0.7)) is None
+    assert ResponseCache.make_key(chat_request()) is None  # the model's default temperature
+    assert ResponseCache.make_key(chat_request(temperature=0, n=2)) is None
+    assert ResponseCache.make_key(chat_request(temperature=0.7, seed=1)) != ResponseCache.make_key(
+        chat_request(temperature=0.7, seed=2))
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl_s=10)
+    cache.put("key", body=b"{}")
+    now[0] += 9.9
+    assert cache.get("key").body == b"{}"
+    now[0] += 0.2
+    assert cache.get("key") is None
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", body=b"1")
+    cache.put("b", body=b"2")
+    cache.get("a")
+    cache.put("c", body=b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", body=b"12345")
+    cache.put("b", body=b"12345")
+    cache.put("c", body=b"123")
+    assert cache.get("a") is None and cache.get("b") is not None
+    cache.put("too big", body=b"x" * 11)
+    assert cache.get("too big") is None
+    assert cache.stats()["bytes"] == 8 and cache.stats()["evictions"] == 1
+
+
+def test_cache_control_bypasses_the_cache():
+    assert ResponseCache.cache_control({}) == {"read": True, "write": True}
+    assert ResponseCache.cache_control({"cache-control": "no-cache"}) == {"read": False, "write": True}
+    assert ResponseCache.cache_control({"cache-control": "max-age=0, No-Store"}) == {"read": False, "write": False}
+
+
+def test_only_finished_streams_are_recorded():
+    cache = ResponseCache()
+
+    async def record(key, frames):
+        async def stream():
+            for frame in frames:
+                yield frame
+
+        return [frame async for frame in cache.record_stream(key, stream())]
+
+    done = ['data: {"choices":[]}\n\n', "data: [DONE]\n\n"]
+    assert asyncio.run(record("done", done)) == done
+    asyncio.run(record("cut", done[:1]))
+    asyncio.run(record("error", ['data: {"error":{"message":"boom"}}\n\n', "data: [DONE]\n\n"]))
+    assert cache.get("done").frames == done
+    assert cache.get("cut") is None and cache.get("error") is None
+
+
+def test_streams_are_replayed_and_bypass_headers_skip_the_cache():
+    pytest.importorskip("ray")
+    deployment = make_deployment(response_cache_config={})
+
+    async def body(response):
+        if hasattr(response, "body_iterator"):
+            return "".join([c if isinstance(c, str) else c.decode() async for c in response.body_iterator])
+        return response.body.decode()
+
+    async def complete(headers=None, **kwargs):
+        response = await deployment.create_chat_completion(
+            chat_request(**{"temperature": 0, "max_completion_tokens": 4, **kwargs}), raw_request(headers)
+        )
+        return response.headers.get(CACHE_STATUS_HEADER), await body(response)
+
+    async def run():
+        await deployment.check_health()
+        return [
+            await complete(stream=True),
+            await complete(stream=True),
+            await complete(),
+            await complete(headers={"cache-control": "no-cache"}, stream=True),
+            await complete(headers={"cache-control": "no-store"}),
+            await complete(),
+            await complete(temperature=None),
+        ]
+
+    results = asyncio.run(run())
+    statuses = [status for status, _ in results]
+    assert statuses == ["MISS", "HIT", "MISS", "MISS", None, "HIT", None]
+    assert results[1][1] == results[0][1] and results[1][1].endswith("data: [DONE]\n\n")
+    assert results[5][1] == results[2][1]
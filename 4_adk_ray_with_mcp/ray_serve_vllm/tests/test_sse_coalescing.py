@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from sse_coalescing import coalesce_sse
+
+
+def frame(delta, finish_reason=None, usage=None):
+    chunk = {
+        "id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 1760000000, "model": "m",
+        "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}],
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk, separators=(',', ':'))}\n\n"
+
+
+def coalesce(frames, max_tokens=8):
+    async def replay():
+        for f in frames:
+            yield f
+
+    async def run():
+        return [f async for f in coalesce_sse(replay(), max_tokens=max_tokens, max_delay_s=10.0)]
+
+    return asyncio.run(run())
+
+
+def test_content_deltas_merge_into_valid_frames():
+    pieces = ['He said "hi"', " \\o/", " caf\u00e9", " \n", " \U0001F600", " end"]
+    out = coalesce([frame({"content": p}) for p in pieces] + ["data: [DONE]\n\n"], max_tokens=4)
+    assert len(out) == 3
+    merged = [json.loads(f[len("data: "):]) for f in out[:2]]
+    assert "".join(c["choices"][0]["delta"]["content"] for c in merged) == "".join(pieces)
+    assert merged[0]["choices"][0]["finish_reason"] is None
+    assert out[-1] == "data: [DONE]\n\n"
+
+
+def test_other_frames_pass_through_and_flush():
+    role = frame({"role": "assistant", "content": ""})
+    tool = frame({"tool_calls": [{"index": 0, "function": {"arguments": '{"city"'}}]})
+    reasoning = frame({"content": "a", "reasoning_content": "b"})
+    finish = frame({}, finish_reason="stop")
+    frames = [role, frame({"content": "x"}), tool, frame({"content": "y"}), reasoning, finish]
+    out = coalesce(frames)
+    assert out == frames
+
+
+def test_last_usage_wins_with_continuous_usage_stats():
+    frames = [frame({"content": str(i)}, usage={"prompt_tokens": 3, "completion_tokens": i + 1}) for i in range(3)]
+    (merged,) = coalesce(frames)
+    chunk = json.loads(merged[len("data: "):])
+    assert chunk["choices"][0]["delta"]["content"] == "012"
+    assert chunk["usage"]["completion_tokens"] == 3
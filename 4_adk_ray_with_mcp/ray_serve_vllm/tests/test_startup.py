@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("ray")
+pytest.importorskip("vllm")
+
+from conftest import chat_request, make_deployment, raw_request
+
+
+def test_concurrent_first_requests_build_serving_objects_once():
+    deployment = make_deployment()
+    # serve.ingress pickled the methods with copies of their globals, so count
+    # the builds through the instance rather than by patching the module.
+    built = []
+    bind = deployment._bind_lora_adapters
+
+    async def counting_bind():
+        built.append(deployment.models)
+        await asyncio.sleep(0.01)
+        await bind()
+
+    deployment._bind_lora_adapters = counting_bind
+
+    async def run():
+        return await asyncio.gather(*(
+            deployment.create_chat_completion(chat_request(max_completion_tokens=4), raw_request()) for _ in range(100)
+        ))
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200] * 100
+    assert len(built) == 1
+
+
+def test_health_check_runs_startup_once():
+    warmup_requests = [{"messages": [{"role": "user", "content": "Hello!"}], "max_completion_tokens": 2}]
+    deployment = make_deployment(warmup_requests=warmup_requests)
+    calls = []
+    warmup = deployment._warmup
+
+    async def counting_warmup(requests):
+        calls.append(len(requests))
+        await warmup(requests)
+
+    deployment._warmup = counting_warmup
+
+    async def run():
+        await asyncio.gather(*(deployment.check_health() for _ in range(10)))
+        await deployment.check_health()
+
+    asyncio.run(run())
+    assert calls == [1]
+    assert deployment.openai_serving_chat is not None
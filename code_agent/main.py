@@ -1,29 +1,57 @@
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 from google.adk.cli.fast_api import get_fast_api_app
 
+from adk_shared.session_store import check_session_service, session_service_from_env, use_session_service
+
 # Get the directory where main.py is located
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Example session DB URL (e.g., SQLite)
+# Example session DB URL (e.g., SQLite), used with SESSION_STORE=adk
 SESSION_SERVICE_URI = "sqlite:///./sessions.db"
 
+# Sessions go to the store SESSION_STORE selects (memory, sqlite or redis, see adk_shared.session_store),
+# which writes each event as it's appended and batches concurrent sessions' writes.
+session_service = session_service_from_env(default_store="sqlite")
+if session_service is not None:
+    use_session_service(session_service)
+    SESSION_SERVICE_URI = ""  # get_fast_api_app then builds its in-memory service, which is ours
+
 # Example allowed origins for CORS
 ALLOWED_ORIGINS = ["http://localhost", "http://localhost:8080", "*"]
 
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = True
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if session_service is not None:
+        await session_service.close()  # writes out what is still queued
+
+
 # Call the function to get the FastAPI app instance
 # Ensure the agent directory name ('capital_agent') matches your agent folder
 app: FastAPI = get_fast_api_app(
     agents_dir=AGENT_DIR,
     session_service_uri=SESSION_SERVICE_URI,
+    lifespan=lifespan,
     allow_origins=ALLOWED_ORIGINS,
     web=SERVE_WEB_INTERFACE,
 )
+if session_service is not None:
+    check_session_service(session_service)
+
+
+@app.get("/-/sessions")
+async def session_store_stats():
+    """Appends, batches and pending writes of the session store."""
+    return session_service.stats() if session_service is not None else {"store": "adk"}
+
 
 # You can add more FastAPI routes or configurations below if needed
 # Example:
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Session state key holding how far the history has been compacted
+STATE_KEY = "history_compaction"
+
+
+class HistoryCompactor:
+    """
+    Keeps every LLM request within the model's context, attached as a before_model_callback.
+
+        compactor = HistoryCompactor(max_model_len=8192)
+        Agent(..., before_model_callback=compactor.before_model)
+
+    History is compacted in turns (a user message and everything up to the
+    next one). The system instruction and the newest `keep_turns` turns are
+    never touched. Older turns are compacted oldest first, `chunk_turns` at a
+    time: their tool results are collapsed into one-line summaries and, if
+    that is not enough, the turns are dropped. How far the history has been
+    compacted is kept in session state and only moves forward, in whole
+    chunks, so consecutive requests share a byte-identical prefix that vLLM's
+    prefix cache can reuse.
+    """
+
+    def __init__(
+        self,
+        max_model_len: int = 8192,
+        reserve_tokens: int = 1024,
+        keep_turns: int = 4,
+        chunk_turns: int = 4,
+        low_watermark: float = 0.8,
+        summary_chars: int = 160,
+        chars_per_token: float = 4.0,
+        max_tracked_results: int = 4096,
+    ):
+        self.max_model_len = max_model_len
+        self.reserve_tokens = reserve_tokens
+        self.keep_turns = keep_turns
+        self.chunk_turns = chunk_turns
+        self.low_watermark = low_watermark
+        self.summary_chars = summary_chars
+        self.chars_per_token = chars_per_token
+        self.max_tracked_results = max_tracked_results
+        # Token counts of tool results by function call id, so the results (the bulk of
+        # the history) aren't re-serialized on every request.
+        self._result_tokens: "OrderedDict[str, int]" = OrderedDict()
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self.requests = 0
+        self.compacted_requests = 0
+        self.tokens_saved = 0
+        self.over_budget = 0
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> None:
+        """Compact `llm_request.contents` in place; never answers instead of the model."""
+        self.requests += 1
+        config = llm_request.config
+        fixed = self.text_tokens(str(getattr(config, "system_instruction", None) or ""))
+        for tool in getattr(config, "tools", None) or []:
+            fixed += self.text_tokens(tool.model_dump_json(exclude_none=True))
+        budget = self.max_model_len - self.reserve_tokens - fixed
+        state = getattr(callback_context, "state", None)
+        boundaries = tuple(state.get(STATE_KEY) or (0, 0)) if state is not None else (0, 0)
+        before = sum(self.content_tokens(content) for content in llm_request.contents)
+        if before <= budget and boundaries == (0, 0):
+            return None
+        llm_request.contents, compacted = self.compact(llm_request.contents, budget, boundaries)
+        if state is not None and compacted != boundaries:
+            state[STATE_KEY] = list(compacted)
+        after = sum(self.content_tokens(content) for content in llm_request.contents)
+        self.compacted_requests += 1
+        self.tokens_saved += before - after
+        if after > budget:
+            self.over_budget += 1
+            logger.warning(f"History is {after} tokens after compaction, over its budget of {budget}")
+        return None
+
+    def compact(
+        self, contents: List[types.Content], budget: int, boundaries: Tuple[int, int] = (0, 0),
+    ) -> Tuple[List[types.Content], Tuple[int, int]]:
+        """
+        The history compacted to `budget` tokens, or as far as the kept turns allow.
+
+        `boundaries` are (summarized, dropped): the turns before the first are
+        summarized and those before the second omitted. They come from the
+        session's previous requests and only ever move forward, so the next
+        request never un-compacts a turn and breaks the shared prefix. The
+        boundaries used are returned with the contents.
+        """
+        turns = split_turns(contents)
+        old = max(len(turns) - self.keep_turns, 0)
+        summarized, dropped = min(boundaries[0], old), min(boundaries[1], old)
+        if old == 0:
+            return contents, (summarized, dropped)
+        brief: Dict[int, int] = {}
+        verbatim = [sum(self.content_tokens(c) for c in turn) for turn in turns]
+
+        def tokens(k: int, d: int) -> int:
+            for i in range(d, k):
+                if i not in brief:
+                    brief[i] = sum(self.content_tokens(c, summarized=True) for c in turns[i])
+            note = self.text_tokens(omitted_note(d).text) if d else 0
+            return note + sum(brief[i] for i in range(d, k)) + sum(verbatim[k:])
+
+        if tokens(summarized, dropped) > budget:
+            # The least compaction, in whole chunks and summarizing before dropping, that gets
+            # under the low watermark, so the next few requests fit without moving it again.
+            steps = list(range(self.chunk_turns, old, self.chunk_turns)) + [old]
+            candidates = [(k, dropped) for k in steps if k > summarized]
+            candidates += [(k, d) for d in steps if d > dropped for k in steps if k >= max(d, summarized)]
+            target = int(budget * self.low_watermark)
+            summarized, dropped = next(
+                ((k, d) for limit in (target, budget) for k, d in candidates if tokens(k, d) <= limit), (old, old),
+            )
+        kept = flatten([self.summarize(turn) for turn in turns[dropped:summarized]]) + flatten(turns[summarized:])
+        if dropped:
+            first = kept[0]
+            kept[0] = types.Content(role=first.role, parts=[omitted_note(dropped), *(first.parts or [])])
+        return kept, (summarized, dropped)
+
+    def summarize(self, turn: List[types.Content]) -> List[types.Content]:
+        """The turn with every tool result collapsed into a one-line summary."""
+        compacted = []
+        for content in turn:
+            if not any(part.function_response for part in content.parts or []):
+                compacted.append(content)
+                continue
+            parts = []
+            for part in content.parts or []:
+                response = part.function_response
+                if response is None:
+                    parts.append(part)
+                    continue
+                # Built without validation: these are rebuilt on every request.
+                parts.append(types.Part.model_construct(function_response=types.FunctionResponse.model_construct(
+                    id=response.id, name=response.name, response={"summary": self._summary(response)},
+                )))
+            compacted.append(types.Content.model_construct(role=content.role, parts=parts))
+        return compacted
+
+    def _summary(self, response: types.FunctionResponse) -> str:
+        if response.id in self._summaries:
+            return self._summaries[response.id]
+        text = result_text(response.response)
+        if len(text) > self.summary_chars:
+            text = text[:self.summary_chars].rsplit(" ", 1)[0] + "..."
+        if response.id:
+            self._summaries[response.id] = text
+            if len(self._summaries) > self.max_tracked_results:
+                self._summaries.popitem(last=False)
+        return text
+
+    def text_tokens(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token) + 1
+
+    def content_tokens(self, content: types.Content, summarized: bool = False) -> int:
+        tokens = 4  # role and message framing
+        for part in content.parts or []:
+            if part.text:
+                tokens += self.text_tokens(part.text)
+            elif part.function_call is not None:
+                tokens += self.text_tokens(part.function_call.name + json.dumps(part.function_call.args, default=str))
+            elif part.function_response is not None:
+                tokens += self._response_tokens(part.function_response, summarized)
+        return tokens
+
+    def _response_tokens(self, response: types.FunctionResponse, summarized: bool = False) -> int:
+        # A summarized result keeps its call id, so the response's keys tell the two apart.
+        value = {"summary": self._summary(response)} if summarized else response.response
+        key = f"{response.id}:{','.join(sorted(value or {}))}" if response.id else None
+        if key is not None and key in self._result_tokens:
+            self._result_tokens.move_to_end(key)
+            return self._result_tokens[key]
+        tokens = self.text_tokens(response.name + json.dumps(value, ensure_ascii=False, default=str))
+        if key is not None:
+            self._result_tokens[key] = tokens
+            if len(self._result_tokens) > self.max_tracked_results:
+                self._result_tokens.popitem(last=False)
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "compacted_requests": self.compacted_requests,
+            "tokens_saved": self.tokens_saved,
+            "over_budget": self.over_budget,
+        }
+
+
+def split_turns(contents: List[types.Content]) -> List[List[types.Content]]:
+    """Group contents into turns, each starting at a user message with text (not a tool result)."""
+    turns: List[List[types.Content]] = []
+    for content in contents:
+        starts_turn = content.role == "user" and any(part.text for part in content.parts or [])
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def result_text(response: Any) -> str:
+    """The text of a tool result: a wrapped string, an MCP result's text content, or else its JSON."""
+    if isinstance(response, dict):
+        if len(response) == 1 and isinstance(response.get("result"), str):
+            return response["result"]
+        content = response.get("content")
+        if isinstance(content, list) and content and all(isinstance(c, dict) and "text" in c for c in content):
+            return " ".join(str(c["text"]) for c in content)
+    return json.dumps(response, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def omitted_note(turns: int) -> types.Part:
+    return types.Part(text=f"[{turns} earlier turns were omitted to fit the context window.]")
+
+
+def flatten(turns: List[List[types.Content]]) -> List[types.Content]:
+    return [content for turn in turns for content in turn]
+
+
+def history_compactor_from_env(default_max_model_len: int) -> Optional[HistoryCompactor]:
+    """The compactor configured by MAX_MODEL_LEN and HISTORY_* variables, or None if disabled."""
+    if os.getenv("HISTORY_COMPACTION_ENABLED", "true").lower() != "true":
+        return None
+    return HistoryCompactor(
+        max_model_len=int(os.getenv("MAX_MODEL_LEN", str(default_max_model_len))),
+        reserve_tokens=int(os.getenv("HISTORY_RESERVE_TOKENS", "1024")),
+        keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "4")),
+        chunk_turns=int(os.getenv("HISTORY_CHUNK_TURNS", "4")),
+        low_watermark=float(os.getenv("HISTORY_LOW_WATERMARK", "0.8")),
+    )
@@ -0,0 +1,271 @@
+import itertools
+import logging
+import os
+import random
+import statistics
+import time
+
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from google.adk.models.lite_llm import LiteLLMClient
+from litellm import acompletion, completion
+from openai import DEFAULT_MAX_RETRIES, APIStatusError, APITimeoutError, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("least_outstanding", "ewma", "round_robin")
+
+
+class Endpoint:
+    """One OpenAI-compatible server, its pooled connections and its latency record."""
+
+    def __init__(
+        self, url: str, api_key: str = "EMPTY", max_connections: int = 64, timeout_s: float = 120.0, window: int = 1024,
+        max_retries: int = 0,
+    ):
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self._client: Optional[AsyncOpenAI] = None
+        self.outstanding = 0
+        self.ewma_ms = 0.0
+        self.latencies_ms: deque = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self._backoff = 0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        # Created on first use, inside the event loop that serves the requests.
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                base_url=self.url,
+                api_key=self.api_key,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+                    ),
+                    timeout=httpx.Timeout(self.timeout_s, connect=min(self.timeout_s, 5.0)),
+                ),
+            )
+        return self._client
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def half_open(self, now: float) -> bool:
+        """Back from ejection but not yet answered: let one request at a time try it."""
+        return self._backoff > 0 and not self.ejected(now)
+
+    def succeeded(self, latency_ms: float, alpha: float):
+        self.latencies_ms.append(latency_ms)
+        self.ewma_ms = latency_ms if self.ewma_ms == 0 else alpha * latency_ms + (1 - alpha) * self.ewma_ms
+        self.consecutive_failures = 0
+        self._backoff = 0
+
+    def failed(self, eject_after: int, eject_s: float):
+        self.failures += 1
+        self.consecutive_failures += 1
+        # Calls that were already in flight when it was ejected don't eject it again.
+        if self.consecutive_failures >= eject_after and not self.ejected(time.monotonic()):
+            # Each ejection in a row lasts twice as long, up to 32x.
+            duration = eject_s * 2 ** min(self._backoff, 5)
+            self.ejected_until = time.monotonic() + duration
+            self.ejections += 1
+            self._backoff += 1
+            logger.warning(f"Ejected LLM endpoint {self.url} for {duration:.0f}s after "
+                           f"{self.consecutive_failures} failed requests in a row")
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            "url": self.url,
+            "healthy": not self.ejected(time.monotonic()),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "ewma_ms": round(self.ewma_ms, 1),
+            "p50_ms": round(percentiles[49], 1) if percentiles else None,
+            "p99_ms": round(percentiles[98], 1) if percentiles else None,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class BalancedLLMClient(LiteLLMClient):
+    """
+    Spreads an agent's LLM calls over several OpenAI-compatible endpoints, as LiteLlm's llm_client.
+
+        client = BalancedLLMClient(["http://vllm-a:8000/v1", "http://vllm-b:8000/v1"])
+        LiteLlm(model="hosted_vllm/...", llm_client=client)
+
+    Each call goes to the endpoint with the fewest requests in flight
+    (`least_outstanding`), the lowest moving-average latency weighted by its
+    requests in flight (`ewma`), or the next one in turn (`round_robin`).
+    Every endpoint keeps its own pool of keep-alive connections. A call that
+    fails with a connection error, a timeout, 408, 429 or a 5xx is retried on
+    another endpoint, up to `max_attempts` in all; with a single endpoint the
+    OpenAI client retries it there instead, with backoff. An endpoint that fails
+    `eject_after` calls in a row is left out for `eject_s` (doubling while it
+    keeps failing) and then gets one call at a time until one succeeds.
+    Latencies are time to the response, or to the first chunk when streaming.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[str],
+        policy: str = "least_outstanding",
+        api_key: str = "EMPTY",
+        max_connections: int = 64,
+        timeout_s: float = 120.0,
+        max_attempts: int = 2,
+        eject_after: int = 3,
+        eject_s: float = 10.0,
+        ewma_alpha: float = 0.3,
+    ):
+        if not endpoints:
+            raise ValueError("BalancedLLMClient needs at least one endpoint")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown LLM balancing policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        # Failover to another endpoint replaces the OpenAI client's retries, unless there is none.
+        retries = DEFAULT_MAX_RETRIES if len(endpoints) == 1 else 0
+        self.endpoints = [Endpoint(url, api_key, max_connections, timeout_s, max_retries=retries) for url in endpoints]
+        self.policy = policy
+        self.max_attempts = max(1, max_attempts)
+        self.eject_after = eject_after
+        self.eject_s = eject_s
+        self.ewma_alpha = ewma_alpha
+        self._turn = itertools.count()
+        self.failovers = 0
+
+    def pick(self, exclude: tuple = ()) -> Endpoint:
+        """The endpoint for the next call; ejected ones only if every endpoint is ejected."""
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        available = [e for e in candidates if not e.ejected(now) and not (e.half_open(now) and e.outstanding)]
+        if not available:
+            return min(candidates, key=lambda e: e.ejected_until)
+        if self.policy == "round_robin":
+            return available[next(self._turn) % len(available)]
+        if self.policy == "ewma":
+            # Unmeasured endpoints cost nothing, so each gets tried before settling.
+            cost = {id(e): e.ewma_ms * (e.outstanding + 1) for e in available}
+        else:
+            cost = {id(e): e.outstanding for e in available}
+        lowest = min(cost.values())
+        return random.choice([e for e in available if cost[id(e)] == lowest])
+
+    @staticmethod
+    def retryable(error: Exception) -> bool:
+        """
+        Whether the endpoint rather than the request failed: it answered 408,
+        429 or a 5xx, timed out, or couldn't be reached. litellm reports
+        unexpected errors of its own as connection errors too, so those only
+        count with a network error underneath.
+        """
+        if isinstance(error, APIStatusError):
+            return error.status_code in (408, 429) or error.status_code >= 500
+        if isinstance(error, APITimeoutError):
+            return True
+        cause: Optional[BaseException] = error
+        for _ in range(8):  # litellm's error, the OpenAI client's, httpx's, ...
+            if cause is None:
+                break
+            if isinstance(cause, (httpx.TransportError, TimeoutError)):
+                return True
+            cause = cause.__cause__ or cause.__context__
+        return False
+
+    async def acompletion(self, model, messages, tools, **kwargs) -> Any:
+        tried: tuple = ()
+        while True:
+            endpoint = self.pick(exclude=tried)
+            tried += (endpoint,)
+            endpoint.requests += 1
+            endpoint.outstanding += 1
+            start = time.perf_counter()
+            try:
+                response = await acompletion(
+                    model=model, messages=messages, tools=tools,
+                    **{**kwargs, "api_base": endpoint.url, "client": endpoint.client},
+                )
+            except Exception as e:
+                endpoint.outstanding -= 1
+                if not self.retryable(e):
+                    raise
+                endpoint.failed(self.eject_after, self.eject_s)
+                if len(tried) >= min(self.max_attempts, len(self.endpoints)):
+                    raise
+                self.failovers += 1
+                logger.info(f"LLM call to {endpoint.url} failed ({type(e).__name__}), retrying on another endpoint")
+                continue
+            if kwargs.get("stream"):
+                return self._stream(endpoint, response, start)
+            endpoint.outstanding -= 1
+            endpoint.succeeded((time.perf_counter() - start) * 1000, self.ewma_alpha)
+            return response
+
+    async def _stream(self, endpoint: Endpoint, stream: Any, start: float) -> AsyncIterator[Any]:
+        # The endpoint counts as busy until the stream ends; chunks already passed on can't be retried.
+        first = True
+        try:
+            async for part in stream:
+                if first:
+                    endpoint.succeeded((time.perf_counter() - start) * 1000, self.ewma_alpha)
+                    first = False
+                yield part
+            if first:
+                endpoint.succeeded((time.perf_counter() - start) * 1000, self.ewma_alpha)
+        except Exception as e:
+            if self.retryable(e):
+                endpoint.failed(self.eject_after, self.eject_s)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+
+    def completion(self, model, messages, tools, stream=False, **kwargs) -> Any:
+        # Synchronous calls don't share the async connection pools; they only get an endpoint.
+        kwargs["api_base"] = self.pick().url
+        return completion(model=model, messages=messages, tools=tools, stream=stream, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "failovers": self.failovers,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.close()
+
+
+def llm_client_from_env(default_endpoint: str) -> Optional[BalancedLLMClient]:
+    """The client configured by LLM_ENDPOINTS and LLM_* variables, or None if disabled."""
+    if os.getenv("LLM_BALANCING_ENABLED", "true").lower() != "true":
+        return None
+    endpoints = [url.strip() for url in os.getenv("LLM_ENDPOINTS", "").split(",") if url.strip()]
+    return BalancedLLMClient(
+        endpoints or [default_endpoint],
+        policy=os.getenv("LLM_BALANCER", "least_outstanding"),
+        api_key=os.getenv("LLM_API_KEY", "EMPTY"),
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "64")),
+        timeout_s=float(os.getenv("LLM_TIMEOUT_S", "120")),
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "2")),
+        eject_after=int(os.getenv("LLM_EJECT_AFTER_FAILURES", "3")),
+        eject_s=float(os.getenv("LLM_EJECT_S", "10")),
+    )
@@ -0,0 +1,624 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+
+try:
+    from google.adk.errors.already_exists_error import AlreadyExistsError
+except ImportError:  # google-adk < 1.17
+
+    class AlreadyExistsError(ValueError):
+        pass
+
+
+logger = logging.getLogger(__name__)
+
+# A write to a backend: ("create", app, user, session_id, state, time), ("append", app, user,
+# session_id, event JSON, time, state delta) or ("delete", app, user, session_id).
+Op = Tuple[Any, ...]
+
+
+def scoped(state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """State split by where it lives: app-wide, per user or per session. temp: keys are never stored."""
+    scopes: Dict[str, Dict[str, Any]] = {"app": {}, "user": {}, "session": {}}
+    for key, value in state.items():
+        if key.startswith(State.TEMP_PREFIX):
+            continue
+        if key.startswith(State.APP_PREFIX):
+            scopes["app"][key] = value
+        elif key.startswith(State.USER_PREFIX):
+            scopes["user"][key] = value
+        else:
+            scopes["session"][key] = value
+    return scopes
+
+
+def recent(events: List[Any], timestamps: List[float], config: Optional[GetSessionConfig]) -> List[Any]:
+    """The events GetSessionConfig asks for: the newest `num_recent_events`, then those since `after_timestamp`."""
+    if config is None:
+        return events
+    if config.num_recent_events:
+        events, timestamps = events[-config.num_recent_events:], timestamps[-config.num_recent_events:]
+    if config.after_timestamp:
+        first = next((i for i, t in enumerate(timestamps) if t >= config.after_timestamp), len(events))
+        events = events[first:]
+    return events
+
+
+def transient(error: Exception) -> bool:
+    """Whether a failed write may go through if retried: a locked SQLite file or a lost connection to Redis."""
+    if isinstance(error, sqlite3.OperationalError):
+        return any(word in str(error).lower() for word in ("locked", "busy"))
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import redis.exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError))
+
+
+class SqliteSessionBackend:
+    """
+    Sessions in a SQLite file in WAL mode, so reads never wait for the writer.
+
+    One connection writes, `pool_size` others read. Events and state keys are
+    rows of their own: an append inserts the event and upserts only the keys
+    its state delta changed, however long the session already is.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self._writer = self._connect()
+        self._writer.executescript("""
+            CREATE TABLE IF NOT EXISTS stored_sessions (
+                app TEXT, user TEXT, id TEXT, update_time REAL, PRIMARY KEY (app, user, id));
+            CREATE TABLE IF NOT EXISTS stored_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, app TEXT, user TEXT, session TEXT, timestamp REAL, data TEXT);
+            CREATE INDEX IF NOT EXISTS events_by_session ON stored_events (app, user, session, seq);
+            CREATE TABLE IF NOT EXISTS stored_state (
+                app TEXT, user TEXT, session TEXT, key TEXT, value TEXT, PRIMARY KEY (app, user, session, key));
+        """)
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._readers.put(self._connect())
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; a crash loses at most the last commits
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def apply(self, ops: List[Op]) -> List[Optional[Exception]]:
+        return await asyncio.to_thread(self._apply, ops)
+
+    def _apply(self, ops: List[Op]) -> List[Optional[Exception]]:
+        """
+        Write `ops` in one transaction; the error of each op, or None.
+
+        Each op, or run of appends, has a savepoint of its own, so an op the
+        data rejects (a duplicate create) fails alone. Anything else, like a
+        locked database, fails the whole batch.
+        """
+        errors: List[Optional[Exception]] = [None] * len(ops)
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                appends: List[int] = []
+                for i, op in enumerate(ops):
+                    if op[0] == "append":
+                        appends.append(i)
+                        continue
+                    self._append_each(conn, ops, appends, errors)
+                    appends = []
+                    errors[i] = self._savepoint(conn, self._write, op)
+                self._append_each(conn, ops, appends, errors)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return errors
+
+    def _append_each(self, conn: sqlite3.Connection, ops: List[Op], indexes: List[int],
+                     errors: List[Optional[Exception]]):
+        if not indexes or self._savepoint(conn, self._append, [ops[i] for i in indexes]) is None:
+            return
+        # One of them failed; redo them one by one so the others still go in.
+        for i in indexes:
+            errors[i] = self._savepoint(conn, self._append, [ops[i]])
+
+    @staticmethod
+    def _savepoint(conn: sqlite3.Connection, write, arg) -> Optional[Exception]:
+        conn.execute("SAVEPOINT op")
+        try:
+            write(conn, arg)
+        except sqlite3.OperationalError:
+            raise
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK TO op")
+            conn.execute("RELEASE op")
+            return e
+        conn.execute("RELEASE op")
+        return None
+
+    def _write(self, conn: sqlite3.Connection, op: Op):
+        kind, app, user, session_id = op[:4]
+        if kind == "create":
+            _, _, _, _, state, now = op
+            conn.execute("INSERT INTO stored_sessions VALUES (?, ?, ?, ?)", (app, user, session_id, now))
+            self._upsert_state(conn, [(app, user, session_id, state)])
+        elif kind == "delete":
+            tables = (("stored_sessions", "id"), ("stored_events", "session"), ("stored_state", "session"))
+            for table, column in tables:
+                conn.execute(f"DELETE FROM {table} WHERE app = ? AND user = ? AND {column} = ?", (app, user, session_id))
+
+    def _append(self, conn: sqlite3.Connection, appends: List[Op]):
+        if not appends:
+            return
+        conn.executemany("INSERT INTO stored_events (app, user, session, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                         [(app, user, session_id, now, data) for _, app, user, session_id, data, now, _ in appends])
+        updated = {(app, user, session_id): now for _, app, user, session_id, _, now, _ in appends}
+        conn.executemany("UPDATE stored_sessions SET update_time = ? WHERE app = ? AND user = ? AND id = ?",
+                         [(now, *key) for key, now in updated.items()])
+        self._upsert_state(conn, [(app, user, session_id, delta) for _, app, user, session_id, _, _, delta in appends])
+
+    @staticmethod
+    def _upsert_state(conn: sqlite3.Connection, changes: List[Tuple[str, str, str, Dict[str, Dict[str, Any]]]]):
+        rows = []
+        for app, user, session_id, state in changes:
+            for scope, (u, s) in (("app", ("", "")), ("user", (user, "")), ("session", (user, session_id))):
+                rows += [(app, u, s, key, json.dumps(value, default=str)) for key, value in state[scope].items()]
+        if rows:
+            conn.executemany(
+                "INSERT INTO stored_state VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (app, user, session, key) DO UPDATE SET value = excluded.value",
+                rows,
+            )
+
+    def _read(self, fn, *args):
+        if self._closed:
+            raise RuntimeError("The session store is closed")
+        conn = self._readers.get()
+        try:
+            return fn(conn, *args)
+        finally:
+            self._readers.put(conn)
+
+    async def load(self, app: str, user: str, session_id: str, config: Optional[GetSessionConfig]):
+        return await asyncio.to_thread(self._read, self._load, app, user, session_id, config)
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, app: str, user: str, session_id: str, config: Optional[GetSessionConfig]):
+        row = conn.execute("SELECT update_time FROM stored_sessions WHERE app = ? AND user = ? AND id = ?",
+                           (app, user, session_id)).fetchone()
+        if row is None:
+            return None
+        state = {key: json.loads(value) for key, value in conn.execute(
+            "SELECT key, value FROM stored_state "
+            "WHERE app = ? AND ((user = '' AND session = '') OR (user = ? AND session IN ('', ?)))",
+            (app, user, session_id),
+        )}
+        query = "SELECT data, timestamp FROM stored_events WHERE app = ? AND user = ? AND session = ? ORDER BY seq DESC"
+        args: List[Any] = [app, user, session_id]
+        if config is not None and config.num_recent_events:
+            query += " LIMIT ?"
+            args.append(config.num_recent_events)
+        rows = conn.execute(query, args).fetchall()[::-1]
+        return state, recent([data for data, _ in rows], [t for _, t in rows], config), row[0]
+
+    async def list(self, app: str, user: str) -> List[Tuple[str, float]]:
+        return await asyncio.to_thread(self._read, lambda conn: conn.execute(
+            "SELECT id, update_time FROM stored_sessions WHERE app = ? AND user = ?", (app, user)).fetchall())
+
+    async def close(self):
+        self._closed = True
+        self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+class RedisSessionBackend:
+    """
+    Sessions in Redis, shared by every agent pod.
+
+    Each session is a list of event JSON and a hash per state scope, so an
+    append is an RPUSH plus an HSET of the changed keys; a batch of writes
+    goes out in one pipeline.
+    """
+
+    # Other pods write the same sessions, so a copy in one pod's memory goes stale.
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "adk-session:"):
+        import redis.asyncio as redis  # Optional dependency, only needed for shared sessions
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    def _keys(self, app: str, user: str, session_id: str) -> Dict[str, str]:
+        p = self.prefix
+        return {
+            "index": f"{p}{app}:{user}:sessions",
+            "events": f"{p}{app}:{user}:{session_id}:events",
+            "times": f"{p}{app}:{user}:{session_id}:times",
+            "app": f"{p}{app}:state",
+            "user": f"{p}{app}:{user}:state",
+            "session": f"{p}{app}:{user}:{session_id}:state",
+        }
+
+    async def apply(self, ops: List[Op]) -> List[Optional[Exception]]:
+        """Write `ops` in one pipeline; the error of each op, or None. A connection error fails them all."""
+        pipe = self.client.pipeline(transaction=False)
+        ends = []
+        for op in ops:
+            kind, app, user, session_id = op[:4]
+            keys = self._keys(app, user, session_id)
+            if kind == "create":
+                _, _, _, _, state, now = op
+                pipe.zadd(keys["index"], {session_id: now})
+                self._set_state(pipe, keys, state)
+            elif kind == "append":
+                _, _, _, _, data, now, delta = op
+                pipe.rpush(keys["events"], data)
+                pipe.rpush(keys["times"], now)
+                pipe.zadd(keys["index"], {session_id: now})
+                self._set_state(pipe, keys, delta)
+            elif kind == "delete":
+                pipe.zrem(keys["index"], session_id)
+                pipe.delete(keys["events"], keys["times"], keys["session"])
+            ends.append(len(pipe))
+        results = await pipe.execute(raise_on_error=False)
+        errors: List[Optional[Exception]] = []
+        for start, end in zip([0] + ends, ends):
+            errors.append(next((r for r in results[start:end] if isinstance(r, Exception)), None))
+        return errors
+
+    @staticmethod
+    def _set_state(pipe: Any, keys: Dict[str, str], state: Dict[str, Dict[str, Any]]):
+        for scope, values in state.items():
+            if values:
+                pipe.hset(keys[scope], mapping={k: json.dumps(v, default=str) for k, v in values.items()})
+
+    async def load(self, app: str, user: str, session_id: str, config: Optional[GetSessionConfig]):
+        keys = self._keys(app, user, session_id)
+        start = -config.num_recent_events if config is not None and config.num_recent_events else 0
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zscore(keys["index"], session_id)
+        for scope in ("app", "user", "session"):
+            pipe.hgetall(keys[scope])
+        pipe.lrange(keys["events"], start, -1)
+        pipe.lrange(keys["times"], start, -1)
+        update_time, app_state, user_state, session_state, events, times = await pipe.execute()
+        if update_time is None:
+            return None
+        state = {k.decode(): json.loads(v) for scoped_state in (app_state, user_state, session_state)
+                 for k, v in scoped_state.items()}
+        if config is not None and config.after_timestamp:
+            events = recent(events, [float(t) for t in times], GetSessionConfig(after_timestamp=config.after_timestamp))
+        return state, events, float(update_time)
+
+    async def list(self, app: str, user: str) -> List[Tuple[str, float]]:
+        entries = await self.client.zrange(self._keys(app, user, "")["index"], 0, -1, withscores=True)
+        return [(session_id.decode(), score) for session_id, score in entries]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class StoredSessionService(BaseSessionService):
+    """
+    An ADK session service that writes each event as it's appended, in batches.
+
+        service = StoredSessionService(SqliteSessionBackend("./sessions.db"))
+
+    Writes queue up while the backend commits the previous batch, so many
+    concurrent sessions share one commit (group commit) instead of taking
+    turns. With `write_behind`, sessions are served from memory and appends
+    return before their batch is written, every `flush_interval_s` at most;
+    the backend, if any, only matters to sessions this process has not seen
+    since it started, so it can't be one other pods write to as well (Redis).
+    Without it, an append returns once committed.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[Any] = None,
+        write_behind: bool = False,
+        batch_size: int = 512,
+        flush_interval_s: float = 0.0,
+        max_pending: int = 100_000,
+    ):
+        if backend is None and not write_behind:
+            raise ValueError("A session service without a backend must be write-behind")
+        if write_behind and getattr(backend, "shared", False):
+            raise ValueError(f"Can't write behind to {type(backend).__name__}: other pods' changes to a session "
+                             f"would never reach this pod's copy of it")
+        self.backend = backend
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self._pending: List[Tuple[Op, Optional[asyncio.Future]]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Write-behind sessions: (app, user, id) -> (session state, events, event timestamps), and scoped state.
+        self._sessions: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], List[Event], List[float]]] = {}
+        self._app_state: Dict[str, Dict[str, Any]] = {}
+        self._user_state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.appends = 0
+        self.batches = 0
+        self.batched_ops = 0
+        self.write_errors = 0
+
+    async def create_session(
+        self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        if await self._exists(app_name, user_id, session_id):
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+        now = time.time()
+        scopes = scoped(state or {})
+        if self.write_behind:
+            self._sessions[(app_name, user_id, session_id)] = (dict(scopes["session"]), [], [])
+            self._merge_scoped(app_name, user_id, scopes)
+        await self._submit(("create", app_name, user_id, session_id, scopes, now))
+        if self.write_behind:
+            merged = self._state(app_name, user_id, self._sessions[(app_name, user_id, session_id)][0])
+        else:
+            loaded = await self.backend.load(app_name, user_id, session_id, GetSessionConfig(num_recent_events=1))
+            merged = loaded[0]
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=merged, last_update_time=now)
+
+    async def _exists(self, app_name: str, user_id: str, session_id: str) -> bool:
+        if (app_name, user_id, session_id) in self._sessions:
+            return True
+        if self.backend is None:
+            return False
+        config = GetSessionConfig(num_recent_events=1)
+        if await self.backend.load(app_name, user_id, session_id, config) is None:
+            return False
+        if not self.write_behind:
+            return True
+        await self.flush()  # a delete of it may not be written yet
+        return await self.backend.load(app_name, user_id, session_id, config) is not None
+
+    async def get_session(
+        self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        if self.write_behind and key in self._sessions:
+            state, events, timestamps = self._sessions[key]
+            return Session.model_construct(
+                id=session_id, app_name=app_name, user_id=user_id, state=self._state(app_name, user_id, state),
+                events=list(recent(events, timestamps, config)),
+                last_update_time=timestamps[-1] if timestamps else 0.0,
+            )
+        if self.backend is None:
+            return None
+        loaded = await self.backend.load(app_name, user_id, session_id, None if self.write_behind else config)
+        if loaded is None:
+            return None
+        state, data, update_time = loaded
+        events = [Event.model_validate_json(d) for d in data]
+        if self.write_behind:
+            # Served from memory from now on.
+            scopes = scoped(state)
+            self._sessions[key] = (scopes["session"], events, [e.timestamp for e in events])
+            self._merge_scoped(app_name, user_id, scopes)
+            return await self.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        return Session(id=session_id, app_name=app_name, user_id=user_id, state=state, events=events,
+                       last_update_time=update_time)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        if self.write_behind:
+            found = {
+                s: (t[-1] if t else 0.0)
+                for (a, u, s), (_, _, t) in self._sessions.items() if a == app_name and u == user_id
+            }
+        else:
+            found = {}
+        if self.backend is not None:
+            found = {**dict(await self.backend.list(app_name, user_id)), **found}
+        return ListSessionsResponse(sessions=[
+            Session(id=session_id, app_name=app_name, user_id=user_id, last_update_time=update_time)
+            for session_id, update_time in found.items()
+        ])
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._sessions.pop((app_name, user_id, session_id), None)
+        await self._submit(("delete", app_name, user_id, session_id))
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        self.appends += 1
+        delta = scoped(event.actions.state_delta if event.actions and event.actions.state_delta else {})
+        key = (session.app_name, session.user_id, session.id)
+        if self.write_behind and key in self._sessions:
+            state, events, timestamps = self._sessions[key]
+            state.update(delta["session"])
+            events.append(event)
+            timestamps.append(event.timestamp)
+            self._merge_scoped(session.app_name, session.user_id, delta)
+        session.last_update_time = event.timestamp
+        await self._submit(("append", *key, event.model_dump_json(exclude_none=True), event.timestamp, delta))
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "write_behind": self.write_behind,
+            "cached_sessions": len(self._sessions),
+            "appends": self.appends,
+            "batches": self.batches,
+            "mean_batch": round(self.batched_ops / self.batches, 1) if self.batches else None,
+            "pending": len(self._pending),
+            "write_errors": self.write_errors,
+        }
+
+    async def flush(self):
+        """Wait until every write so far is in the backend."""
+        if self._pending:
+            future = asyncio.get_running_loop().create_future()
+            self._pending.append((("flush", None, None, None), future))
+            self._wake.set()
+            await future
+
+    async def close(self):
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+        if self.backend is not None:
+            await self.backend.close()
+
+    def _state(self, app_name: str, user_id: str, session_state: Dict[str, Any]) -> Dict[str, Any]:
+        return {**self._app_state.get(app_name, {}), **self._user_state.get((app_name, user_id), {}), **session_state}
+
+    def _merge_scoped(self, app_name: str, user_id: str, scopes: Dict[str, Dict[str, Any]]):
+        if scopes["app"]:
+            self._app_state.setdefault(app_name, {}).update(scopes["app"])
+        if scopes["user"]:
+            self._user_state.setdefault((app_name, user_id), {}).update(scopes["user"])
+
+    async def _submit(self, op: Op):
+        if self.backend is None:
+            return
+        if self._writer is None or self._writer.done():
+            self._wake = asyncio.Event()
+            self._writer = asyncio.create_task(self._write_batches())
+        wait = not self.write_behind or len(self._pending) >= self.max_pending
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((op, future))
+        self._wake.set()
+        if future is not None:
+            await future
+
+    async def _write_batches(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self.flush_interval_s:
+                await asyncio.sleep(self.flush_interval_s)  # let more writes join the batch
+            while self._pending:
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                ops = [op for op, _ in batch if op[0] != "flush"]
+                retrying = False
+                try:
+                    errors = await self.backend.apply(ops) if ops else []
+                    self.batches += 1
+                    self.batched_ops += len(ops)
+                    for op, error in zip(ops, errors):
+                        if error is not None:
+                            self.write_errors += 1
+                            logger.error(f"Session {op[0]} of {op[3]} failed, dropped it: {error!r}")
+                except Exception as e:
+                    self.write_errors += 1
+                    errors = [e] * len(ops)
+                    retrying = self.write_behind and transient(e)
+                    if retrying:
+                        logger.warning(f"Writing {len(ops)} session changes failed, retrying: {e!r}")
+                        # Nobody is waiting for these, and a flush is waiting for them; keep both and retry.
+                        self._pending = [entry for entry in batch if entry[1] is None or entry[0][0] == "flush"] \
+                            + self._pending
+                        await asyncio.sleep(1.0)
+                    else:
+                        logger.error(f"Writing {len(ops)} session changes failed, dropped them: {e!r}")
+                op_errors = iter(errors)
+                for op, future in batch:
+                    error = None if op[0] == "flush" else next(op_errors)
+                    if future is None or future.done() or (retrying and op[0] == "flush"):
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+
+
+def session_service_from_env(default_store: str = "sqlite") -> Optional[StoredSessionService]:
+    """
+    The session service SESSION_STORE selects, or None to leave sessions to ADK (SESSION_STORE=adk).
+
+    - memory: served from memory, written behind to SESSION_WRITE_BEHIND_TO (sqlite or none)
+    - sqlite: SESSION_SQLITE_PATH in WAL mode, SESSION_SQLITE_POOL_SIZE readers
+    - redis: SESSION_REDIS_URL, shared by every pod
+    """
+    store = os.getenv("SESSION_STORE", default_store).lower()
+    if store == "adk":
+        return None
+
+    def backend(kind: str) -> Optional[Any]:
+        if kind == "sqlite":
+            return SqliteSessionBackend(
+                os.getenv("SESSION_SQLITE_PATH", "./sessions.db"),
+                pool_size=int(os.getenv("SESSION_SQLITE_POOL_SIZE", "4")),
+            )
+        if kind == "redis":
+            return RedisSessionBackend(os.environ["SESSION_REDIS_URL"])
+        if kind == "none":
+            return None
+        raise ValueError(f"Unknown session store: {kind}")
+
+    batch_size = int(os.getenv("SESSION_BATCH_SIZE", "512"))
+    if store == "memory":
+        service = StoredSessionService(
+            backend(os.getenv("SESSION_WRITE_BEHIND_TO", "none").lower()),
+            write_behind=True,
+            batch_size=batch_size,
+            flush_interval_s=float(os.getenv("SESSION_FLUSH_INTERVAL_MS", "50")) / 1000,
+        )
+    else:
+        service = StoredSessionService(backend(store), batch_size=batch_size)
+    logger.info(f"Session store: {store} ({service.stats()['backend']})")
+    return service
+
+
+# Services get_fast_api_app has built through use_session_service.
+_in_use: List[BaseSessionService] = []
+
+
+def use_session_service(service: BaseSessionService):
+    """
+    Make google.adk.cli.fast_api.get_fast_api_app use `service`.
+
+    get_fast_api_app builds its session service itself and has no parameter
+    for one; up to google-adk 1.20 it falls back to an InMemorySessionService
+    when given no session URL, so call it with none after this, then
+    check_session_service. Later versions build it in cli/utils/service_factory.py,
+    where this can't reach, so it raises there.
+    """
+    from google.adk.cli import fast_api
+
+    if not hasattr(fast_api, "InMemorySessionService") or hasattr(fast_api, "create_session_service_from_options"):
+        from google.adk.version import __version__
+
+        raise RuntimeError(f"google-adk {__version__} doesn't build its session service in fast_api.py; "
+                           f"install google-adk<1.21 or set SESSION_STORE=adk")
+
+    def build() -> BaseSessionService:
+        _in_use.append(service)
+        return service
+
+    fast_api.InMemorySessionService = build
+
+
+def check_session_service(service: BaseSessionService):
+    """Raise unless get_fast_api_app took `service` as its session service."""
+    if not any(s is service for s in _in_use):
+        raise RuntimeError(f"get_fast_api_app didn't use {type(service).__name__}; was it given a session URL?")
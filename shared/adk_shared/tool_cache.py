@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCachePolicy:
+    """How long a tool's results stay fresh and which of its arguments may be part of a cache key.
+
+    Calls passing an argument outside `args` are not cached, nor are those
+    `normalize` fails on. `normalize` maps arguments that mean the same (e.g.
+    "Seattle" and "seattle ") to one key. Results matching the regex
+    `error_text` report a failure, for tools that say so in prose.
+    """
+
+    ttl_s: float
+    args: Optional[Sequence[str]] = None
+    normalize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    error_text: Optional[str] = None
+
+
+class LRUBackend:
+    """In-process results, least recently used evicted beyond `max_entries`."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, expires_at: float, value: Any):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Results shared by every agent pod through Redis, which expires them itself."""
+
+    def __init__(self, url: str, prefix: str = "adk-tool-cache:"):
+        import redis.asyncio as redis  # Optional dependency, only needed for a shared cache
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["expires_at"], entry["value"]
+
+    async def set(self, key: str, expires_at: float, value: Any):
+        ttl_ms = int((expires_at - time.time()) * 1000)
+        if ttl_ms > 0:
+            await self.client.set(self.prefix + key, json.dumps({"expires_at": expires_at, "value": value}), px=ttl_ms)
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):  # e.g. an MCP CallToolResult
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+def _texts(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict) and isinstance(value.get("content"), list):  # an MCP CallToolResult
+        return [part["text"] for part in value["content"] if isinstance(part, dict) and part.get("type") == "text"]
+    return []
+
+
+def _reports_error(value: Any) -> bool:
+    """Whether `value`, or one entry of it (a batch's), is an `{"error": ...}` object."""
+    entries = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+    return (isinstance(value, dict) and "error" in value) or any(isinstance(e, dict) and "error" in e for e in entries)
+
+
+def failed(value: Any, error_text: Optional[str] = None) -> bool:
+    """
+    Whether a tool result reports a failure: MCP's `isError`, an `{"error": ...}`
+    object, also as JSON text content, or text matching `error_text`.
+    """
+    if (isinstance(value, dict) and value.get("isError")) or _reports_error(value):
+        return True
+    for text in _texts(value):
+        if error_text is not None and re.search(error_text, text):
+            return True
+        if text.lstrip()[:1] in ("{", "["):
+            try:
+                if _reports_error(json.loads(text)):
+                    return True
+            except ValueError:
+                pass
+    return False
+
+
+class ToolResultCache:
+    """
+    Caches tool results across agent runs, attached through ADK's tool callbacks.
+
+        cache = ToolResultCache({"get_forecast": ToolCachePolicy(ttl_s=600)})
+        Agent(..., before_tool_callback=cache.before_tool, after_tool_callback=cache.after_tool)
+
+    A key is the tool name plus its canonical (normalized, key-sorted JSON)
+    arguments; tools without a policy are never cached, and neither are
+    results that report an error. Results are kept in an in-process LRU and,
+    with a `shared` backend, written through to it so other pods reuse them.
+    """
+
+    def __init__(self, policies: Dict[str, ToolCachePolicy], max_entries: int = 1024, shared: Optional[Any] = None):
+        self.policies = policies
+        self.local = LRUBackend(max_entries)
+        self.shared = shared
+        self._served: set = set()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def key(self, tool_name: str, args: Dict[str, Any]) -> Optional[str]:
+        policy = self.policies.get(tool_name)
+        if policy is None or (policy.args is not None and not set(args) <= set(policy.args)):
+            return None
+        if policy.normalize is not None:
+            try:
+                args = policy.normalize(dict(args))
+            except Exception as e:
+                logger.debug(f"Not caching {tool_name}: can't normalize {args!r}: {e!r}")
+                return None
+        canonical = json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{tool_name}:{hashlib.sha256(canonical.encode()).hexdigest()[:32]}"
+
+    async def before_tool(self, tool: Any, args: Dict[str, Any], tool_context: Any) -> Optional[dict]:
+        """A cached result stands in for the tool call; None lets the tool run."""
+        key = self.key(tool.name, args)
+        if key is None:
+            self._count(tool.name, "uncacheable")
+            return None
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            try:
+                entry = await self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared tool cache lookup failed: {e!r}")
+            if entry is not None and entry[0] > time.time():
+                self.local.set(key, *entry)
+                self._count(tool.name, "shared_hits")
+            else:
+                entry = None
+        if entry is None:
+            self._count(tool.name, "misses")
+            return None
+        self._count(tool.name, "hits")
+        self._served.add(self._call_id(tool_context))
+        return entry[1]
+
+    async def after_tool(self, tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> Optional[dict]:
+        """Store a fresh result; ADK runs this for cached results too, which are left alone."""
+        call_id = self._call_id(tool_context)
+        if call_id in self._served:
+            self._served.discard(call_id)
+            return None
+        key = self.key(tool.name, args)
+        if key is None or tool_response is None:
+            return None
+        value = _jsonable(tool_response)
+        if failed(value, self.policies[tool.name].error_text):
+            self._count(tool.name, "errors")
+            return None
+        # ADK wraps non-dict results the same way before handing them to the model.
+        value = value if isinstance(value, dict) else {"result": value}
+        expires_at = time.time() + self.policies[tool.name].ttl_s
+        self.local.set(key, expires_at, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, expires_at, value)
+            except Exception as e:
+                logger.warning(f"Shared tool cache store failed: {e!r}")
+        self._count(tool.name, "stores")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, counters in self._counters.items():
+            hits = counters.get("hits", 0)
+            lookups = hits + counters.get("misses", 0)
+            tools[name] = {**counters, "hit_ratio": round(hits / lookups, 3) if lookups else None}
+        return {
+            "entries": len(self.local),
+            "max_entries": self.local.max_entries,
+            "evictions": self.local.evictions,
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+            "tools": tools,
+        }
+
+    def _count(self, tool_name: str, counter: str):
+        counters = self._counters.setdefault(tool_name, {})
+        counters[counter] = counters.get(counter, 0) + 1
+
+    @staticmethod
+    def _call_id(tool_context: Any) -> Any:
+        return getattr(tool_context, "function_call_id", None) or id(tool_context)
+
+
+def tool_cache_from_env(policies: Dict[str, ToolCachePolicy]) -> Optional[ToolResultCache]:
+    """The cache configured by the TOOL_CACHE_* variables, or None if TOOL_CACHE_ENABLED is false."""
+    if os.getenv("TOOL_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    shared = None
+    redis_url = os.getenv("TOOL_CACHE_REDIS_URL")
+    if redis_url:
+        try:
+            shared = RedisBackend(redis_url)
+        except ImportError:
+            logger.warning("TOOL_CACHE_REDIS_URL is set but the 'redis' package is not installed; caching per pod only")
+    return ToolResultCache(policies, max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024")), shared=shared)
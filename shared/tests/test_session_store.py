@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.events.event import Event  # noqa: E402
+
+from adk_shared.session_store import (  # noqa: E402
+    AlreadyExistsError,
+    SqliteSessionBackend,
+    StoredSessionService,
+    scoped,
+)
+
+APP, USER = "app", "user"
+
+
+def append(session_id: str, text: str):
+    event = Event(author="user", invocation_id=text)
+    return ("append", APP, USER, session_id, event.model_dump_json(exclude_none=True), event.timestamp, scoped({}))
+
+
+def create(session_id: str):
+    return ("create", APP, USER, session_id, scoped({}), 0.0)
+
+
+def test_a_bad_op_fails_alone(tmp_path):
+    async def run():
+        backend = SqliteSessionBackend(str(tmp_path / "sessions.db"), pool_size=1)
+        await backend.apply([create("a"), create("b")])
+        errors = await backend.apply([append("a", "1"), create("a"), append("b", "2"), append("a", "3")])
+        assert [type(e) for e in errors] == [type(None), sqlite3.IntegrityError, type(None), type(None)]
+        _, events_a, _ = await backend.load(APP, USER, "a", None)
+        _, events_b, _ = await backend.load(APP, USER, "b", None)
+        await backend.close()
+        return len(events_a), len(events_b)
+
+    assert asyncio.run(run()) == (2, 1)
+
+
+def test_duplicate_session_is_rejected_before_the_batch(tmp_path):
+    async def run():
+        service = StoredSessionService(SqliteSessionBackend(str(tmp_path / "sessions.db"), pool_size=2),
+                                       write_behind=True, flush_interval_s=0.01)
+        a = await service.create_session(app_name=APP, user_id=USER, session_id="a")
+        b = await service.create_session(app_name=APP, user_id=USER, session_id="b")
+        await service.flush()
+        with pytest.raises(AlreadyExistsError):
+            await service.create_session(app_name=APP, user_id=USER, session_id="a")
+        for i in range(5):
+            await service.append_event(a, Event(author="user", invocation_id=f"a{i}"))
+            await service.append_event(b, Event(author="user", invocation_id=f"b{i}"))
+        await service.delete_session(app_name=APP, user_id=USER, session_id="b")
+        await service.create_session(app_name=APP, user_id=USER, session_id="b")  # deleted, so free again
+        await service.flush()
+        fresh = StoredSessionService(service.backend)
+        loaded = await fresh.get_session(app_name=APP, user_id=USER, session_id="a")
+        stats = service.stats()
+        await service.close()
+        return len(loaded.events), stats
+
+    events, stats = asyncio.run(run())
+    assert events == 5
+    assert stats["pending"] == 0 and stats["write_errors"] == 0
+
+
+class FailingBackend:
+    def __init__(self, error: Exception, failures: int):
+        self.error = error
+        self.failures = failures
+        self.written = []
+
+    async def apply(self, ops):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.written += ops
+        return [None] * len(ops)
+
+    async def load(self, *args):
+        return None
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.parametrize("error, retried", [
+    (sqlite3.OperationalError("database is locked"), True),
+    (ValueError("not JSON serializable"), False),
+])
+def test_write_behind_retries_only_transient_errors(error, retried):
+    async def run():
+        backend = FailingBackend(error, failures=1)
+        service = StoredSessionService(backend, write_behind=True)
+        session = await service.create_session(app_name=APP, user_id=USER, session_id="a")
+        await service.append_event(session, Event(author="user"))
+        await asyncio.wait_for(service.flush(), timeout=5)
+        return backend, service.stats()
+
+    backend, stats = asyncio.run(run())
+    assert stats["pending"] == 0 and stats["write_errors"] == 1
+    assert [op[0] for op in backend.written] == (["create", "append"] if retried else [])